@@ -0,0 +1,94 @@
+"""Догоняющий опрос после простоя бота.
+
+При запуске курсоры from_date восстанавливаются из CheckpointStore,
+но обычный опрос доходит до аккаунта только в его фазе расписания,
+то есть в течение целого интервала опроса, а смены статусов за
+время простоя все это время лежат неотправленными. Backfill до
+начала обычного опроса сразу опрашивает аккаунты, курсор которых
+отстал больше чем на min_gap секунд: не больше parallel запросов
+одновременно, начиная с самых давних курсоров.
+
+API принимает только нижнюю границу from_date, поэтому один запрос
+с сохраненным курсором уже возвращает все работы, изменившиеся за
+простой: окна внутри пропуска вернули бы те же работы повторно.
+Ответ сверяется с HomeworkIndex так же, как при обычном опросе,
+и работа, сменившая за простой несколько статусов, дает одно
+уведомление с последним из них.
+
+Время догоняния ограничено deadline: после него новые запросы
+не начинаются, начатые доходят до конца, а оставшиеся аккаунты
+догонит обычный опрос с их курсоров.
+"""
+import asyncio
+import logging
+from collections import Counter, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд может занять догоняние и сколько запросов идет разом.
+BACKFILL_DEADLINE = 60.0
+BACKFILL_PARALLEL = 16
+
+BackfillReport = namedtuple(
+    'BackfillReport', ['lagging', 'polled', 'changed', 'failed', 'elapsed'])
+
+
+class Backfill:
+    """Опрос отставших аккаунтов перед запуском обычного опроса.
+
+    Если min_gap не задан, отставшим считается курсор старше
+    базового интервала опроса движка.
+    """
+
+    def __init__(self, deadline=BACKFILL_DEADLINE,
+                 parallel=BACKFILL_PARALLEL, min_gap=None):
+        """Параметры догоняния, движок передается в run()."""
+        self.deadline = deadline
+        self.parallel = parallel
+        self.min_gap = min_gap
+        self.report = None
+
+    def lagging(self, engine):
+        """Имена отставших аккаунтов, от самых давних курсоров."""
+        now = engine.clock.time()
+        min_gap = engine.retry_time if self.min_gap is None else self.min_gap
+        lagging = []
+        for name in engine.tenants:
+            state = engine.states.get(name)
+            # Без сохраненного курсора догонять не от чего.
+            if state is not None and now - state.from_date > min_gap:
+                lagging.append((state.from_date, name))
+        return [name for _, name in sorted(lagging)]
+
+    async def run(self, engine):
+        """Догоняем отставшие аккаунты, возвращаем BackfillReport."""
+        names = self.lagging(engine)
+        started = engine.clock.monotonic()
+        stop_at = started + self.deadline
+        outcomes = Counter()
+        queue = iter(names)
+
+        async def worker():
+            for name in queue:
+                if engine.clock.monotonic() >= stop_at:
+                    break
+                tenant = engine.tenants.get(name)
+                if tenant is not None:
+                    outcomes[await engine.poll_now(tenant)] += 1
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.parallel, len(names)))))
+        if engine.checkpoints is not None:
+            engine.checkpoints.flush()
+        self.report = BackfillReport(
+            len(names), sum(outcomes.values()), outcomes['changed'],
+            outcomes['error'] + outcomes['shed'],
+            engine.clock.monotonic() - started)
+        if names:
+            logger.info(
+                f'Пропущенное за простой догнано за '
+                f'{self.report.elapsed:.1f} с: опрошено '
+                f'{self.report.polled} из {len(names)} аккаунтов, '
+                f'с изменениями {self.report.changed}, '
+                f'с ошибками {self.report.failed}')
+        return self.report
@@ -0,0 +1,91 @@
+"""Догоняние пропущенного после простоя для парка аккаунтов.
+
+Курсоры всех аккаунтов сохранены сутки назад, а за простой у каждой
+работы дважды сменился статус. Бенчмарк запускает Backfill против
+локального фейкового API с задержкой ответа и печатает, сколько
+аккаунтов догнано за отведенное время и сколько оно заняло.
+
+Запуск: python benchmarks/bench_backfill.py --tenants 2000 --parallel 32
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from backfill import Backfill  # noqa: E402
+from checkpoint import CheckpointStore  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from fake_api import FakePracticumAPI  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from transport import configure_transport  # noqa: E402
+
+HOUR = 3600
+
+
+class CountingBot:
+    """Бот-заглушка, считает отправленные сообщения."""
+
+    def __init__(self):
+        """Счетчик сообщений с нуля."""
+        self.sent = 0
+
+    def send_message(self, chat_id, text):
+        """Считаем сообщение отправленным."""
+        self.sent += 1
+
+
+async def catch_up(engine, backfill):
+    """Догоняние без обычного опроса."""
+    async with engine.started():
+        return await backfill.run(engine)
+
+
+def main():
+    """Догоняем парк аккаунтов и печатаем отчет."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=2000)
+    parser.add_argument('--parallel', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--deadline', type=float, default=60)
+    args = parser.parse_args()
+
+    tokens = [f'token{i}' for i in range(args.tenants)]
+    api = FakePracticumAPI(latency=args.latency, events={
+        token: [(-5 * HOUR, 1, 'reviewing'), (-2 * HOUR, 1, 'approved')]
+        for token in tokens}).start()
+    homework.ENDPOINT = api.endpoint
+    homework.logger.disabled = True
+    configure_transport(pool_size=args.parallel)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CheckpointStore(os.path.join(directory, 'state.sqlite3'))
+        downtime_started = int(time.time()) - 24 * HOUR
+        for i in range(args.tenants):
+            store.save_cursor(f't{i}', downtime_started)
+        store.flush()
+        bot = CountingBot()
+        engine = PollingEngine(
+            [Tenant(f't{i}', token, [i]) for i, token in enumerate(tokens)],
+            bot, checkpoints=store, max_in_flight=args.parallel,
+            chat_rate=math.inf, send_rate=math.inf)
+        backfill = Backfill(deadline=args.deadline, parallel=args.parallel)
+        report = asyncio.run(catch_up(engine, backfill))
+        store.close()
+    api.stop()
+
+    bound = math.ceil(args.tenants / args.parallel) * args.latency
+    print(f'lagging tenants: {report.lagging}, caught up: {report.polled}, '
+          f'failed: {report.failed}')
+    print(f'notifications:   {bot.sent}')
+    print(f'catch-up time:   {report.elapsed:.2f} s '
+          f'(latency bound {bound:.2f} s, deadline {args.deadline:g} s)')
+
+
+if __name__ == '__main__':
+    main()
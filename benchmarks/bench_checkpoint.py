@@ -0,0 +1,44 @@
+"""Время теплого старта из хранилища чекпоинтов.
+
+Запуск: python benchmarks/bench_checkpoint.py --tenants 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint import CheckpointStore  # noqa: E402
+
+
+def main():
+    """Заполняем базу и замеряем запись и загрузку."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument('--homeworks', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'checkpoints.sqlite3')
+        store = CheckpointStore(path, max_pending=10 ** 9)
+        started = time.perf_counter()
+        for tenant in range(args.tenants):
+            store.save_cursor(f't{tenant}', 1000000000)
+            for homework in range(args.homeworks):
+                store.save_status(f't{tenant}', homework, 'approved')
+        store.close()
+        written = time.perf_counter() - started
+
+        started = time.perf_counter()
+        states = CheckpointStore(path).load()
+        loaded = time.perf_counter() - started
+
+    print(f'tenants:    {len(states)}')
+    print(f'write+sync: {written * 1000:.1f} ms')
+    print(f'warm start: {loaded * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Сравнение декодеров JSON на ответе с длинной историей работ.
+
+Запуск: python benchmarks/bench_decoder.py --homeworks 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from decoder import BACKENDS  # noqa: E402
+
+
+def make_body(homeworks):
+    """Ответ API с заданным числом работ."""
+    return json.dumps({
+        'homeworks': [{
+            'id': i,
+            'status': 'approved',
+            'homework_name': f'student__hw{i:03}.zip',
+            'reviewer_comment': 'Хорошая работа, замечаний нет. ' * 20,
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': f'Спринт {i}',
+        } for i in range(homeworks)],
+        'current_date': 1581604970,
+    }, ensure_ascii=False).encode()
+
+
+def main():
+    """Замеряем время и память каждого декодера."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--homeworks', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    body = make_body(args.homeworks)
+    print(f'body: {len(body) / 1024:.0f} KiB')
+    for name, backend in BACKENDS.items():
+        try:
+            decoder = backend()
+        except ImportError:
+            print(f'{name:>10}: не установлен')
+            continue
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            decoder.loads(body)
+        elapsed = (time.perf_counter() - started) / args.runs
+        tracemalloc.start()
+        answer = decoder.loads(body)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del answer
+        print(f'{name:>10}: {elapsed * 1000:7.3f} ms/response, '
+              f'retained {retained / 1024:6.0f} KiB, '
+              f'peak {peak / 1024:6.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
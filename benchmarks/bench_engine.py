@@ -0,0 +1,69 @@
+"""Бенчмарк движка опроса против локального фейкового API.
+
+Запуск: python benchmarks/bench_engine.py --tenants 2000 --cycles 2
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from fake_api import FakePracticumAPI  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from transport import configure_transport  # noqa: E402
+
+
+class CountingBot:
+    """Бот-заглушка, считает отправленные сообщения."""
+
+    def __init__(self):
+        """Счетчик сообщений с нуля."""
+        self.sent = 0
+
+    def send_message(self, chat_id, text):
+        """Считаем сообщение отправленным."""
+        self.sent += 1
+
+
+def main():
+    """Запускаем движок на N аккаунтах и печатаем результаты."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=1)
+    parser.add_argument('--in-flight', type=int, default=32)
+    args = parser.parse_args()
+
+    api = FakePracticumAPI().start()
+    homework.ENDPOINT = api.endpoint
+    homework.logger.disabled = True
+
+    transport = configure_transport(pool_size=args.in_flight)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tenants = [Tenant(f't{i}', f'token{i}', [i]) for i in range(args.tenants)]
+    engine = PollingEngine(
+        tenants, CountingBot(), retry_time=0, max_in_flight=args.in_flight)
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    asyncio.run(engine.run(cycles=args.cycles))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    api.stop()
+
+    print(f'tenants:        {args.tenants}')
+    print(f'polls:          {engine.polls}')
+    print(f'wall time:      {elapsed:.2f} s')
+    print(f'cpu time:       {cpu:.2f} s')
+    print(f'polls/s:        {engine.polls / elapsed:.0f}')
+    timings = [t.elapsed for t in transport.timings]
+    print(f'mean request:   {1000 * sum(timings) / len(timings):.2f} ms')
+    print(f'max rss growth: {(rss_after - rss_before) / 1024:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Время импорта модуля homework относительно пустого интерпретатора.
+
+Завершается с кодом 1, если импорт не укладывается в бюджет.
+Запуск: python benchmarks/bench_import.py --budget-ms 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    """Время запуска python -c code в миллисекундах."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(runs):
+    """Медианы пустого запуска и разницы с импортом homework.
+
+    Запуски идут парами, чтобы колебания нагрузки на машине
+    одинаково сказывались на обоих замерах пары.
+    """
+    baselines, costs = [], []
+    for _ in range(runs):
+        baseline = run('pass')
+        baselines.append(baseline)
+        costs.append(run('import homework') - baseline)
+    return statistics.median(baselines), statistics.median(costs)
+
+
+def main():
+    """Сравниваем импорт homework с пустым запуском."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    baseline, cost = measure(args.runs)
+    print(f'interpreter:     {baseline:.1f} ms')
+    print(f'import homework: {cost:.1f} ms (budget {args.budget_ms:.0f} ms)')
+    if cost > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
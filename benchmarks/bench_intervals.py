@@ -0,0 +1,104 @@
+"""Сравнение фиксированного и адаптивного интервалов опроса.
+
+Моделирует неделю работы N аккаунтов: студенты отправляют работы,
+ревьюеры берут их на проверку и возвращают вердикт. Считаем число
+запросов к API и задержку уведомлений.
+
+Запуск: python benchmarks/bench_intervals.py --tenants 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intervals import IDLE_RATIO, AdaptivePolicy  # noqa: E402
+
+WEEK = 7 * 24 * 3600
+RETRY_TIME = 600
+
+
+def make_events(rnd):
+    """События одного аккаунта: (время, новый статус)."""
+    events = []
+    t = rnd.uniform(0, 2 * 24 * 3600)
+    while t < WEEK:
+        t += rnd.uniform(600, 6 * 3600)
+        events.append((t, 'reviewing'))
+        t += rnd.uniform(1800, 4 * 3600)
+        events.append((t, rnd.choice(('approved', 'rejected'))))
+        t += rnd.uniform(24 * 3600, 4 * 24 * 3600)
+    return [event for event in events if event[0] < WEEK]
+
+
+def simulate(events, policy):
+    """Возвращаем число опросов, задержки вердиктов и число пропусков.
+
+    Пропуск - вердикт, статус reviewing перед которым бот не застал.
+    Задержка считается для каждого вердикта: от его появления в API
+    до опроса, который его заметил.
+    """
+    polls = 0
+    delays = []
+    missed = 0
+    now = 0.0
+    seen = 0
+    last_status = None
+    last_change_at = 0.0
+    while now < WEEK:
+        polls += 1
+        observed = last_status
+        while seen < len(events) and events[seen][0] <= now:
+            changed_at, status = events[seen]
+            if status != 'reviewing':
+                delays.append(now - changed_at)
+                if observed != 'reviewing':
+                    missed += 1
+            last_status = status
+            last_change_at = now
+            seen += 1
+        if policy is None:
+            now += RETRY_TIME
+            continue
+        now += policy.next_interval(last_status, now - last_change_at)
+    return polls, delays, missed
+
+
+def main():
+    """Печатаем результаты для обеих стратегий."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--min-interval', type=int)
+    parser.add_argument('--max-interval', type=int)
+    parser.add_argument('--idle-ratio', type=float, default=IDLE_RATIO)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    fleet = [make_events(rnd) for _ in range(args.tenants)]
+    strategies = (
+        ('fixed', None),
+        ('adaptive', AdaptivePolicy(
+            RETRY_TIME, min_interval=args.min_interval,
+            max_interval=args.max_interval, idle_ratio=args.idle_ratio)),
+    )
+    for name, policy in strategies:
+        polls = 0
+        missed = 0
+        delays = []
+        for events in fleet:
+            tenant_polls, tenant_delays, tenant_missed = simulate(
+                events, policy)
+            polls += tenant_polls
+            missed += tenant_missed
+            delays.extend(tenant_delays)
+        print(f'{name:>9}: {polls:>9} polls, '
+              f'verdict delay mean {statistics.mean(delays):5.0f} s, '
+              f'p99 {statistics.quantiles(delays, n=100)[98]:5.0f} s, '
+              f'reviewing not seen {missed} of {len(delays)}')
+
+
+if __name__ == '__main__':
+    main()
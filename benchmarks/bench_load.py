@@ -0,0 +1,110 @@
+"""Нагрузочный бенчмарк всего конвейера опроса.
+
+Поднимает заглушки API Практикума и Bot API, запускает движок
+на N аккаунтах с настоящим telegram.Bot и печатает число опросов
+в секунду, p50/p99 времени опроса и запроса к API и память
+на аккаунт. Заглушки работают в том же процессе и делят с движком
+GIL, поэтому результаты - оценка снизу.
+
+При --period 0 все аккаунты опрашиваются сразу, и время опроса
+включает ожидание в очереди; с ненулевым периодом планировщик
+распределяет опросы равномерно.
+
+Запуск: python benchmarks/bench_load.py --tenants 1000 --cycles 3
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telegram  # noqa: E402
+
+import homework  # noqa: E402
+from cache import ResponseCache  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from fake_api import FakePracticumAPI, FakeTelegramAPI  # noqa: E402
+from tenants import Tenant  # noqa: E402
+from transport import configure_transport  # noqa: E402
+
+
+def current_rss():
+    """Текущий RSS процесса в байтах (только Linux)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def percentile(samples, percent):
+    """Перцентиль выборки."""
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+def main():
+    """Запускаем заглушки и движок, печатаем результаты."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--in-flight', type=int, default=32)
+    parser.add_argument('--period', type=float, default=0)
+    parser.add_argument('--api-latency', type=float, default=0.005)
+    parser.add_argument('--api-errors', type=float, default=0.01)
+    parser.add_argument('--change-interval', type=float, default=60.0)
+    parser.add_argument('--tg-latency', type=float, default=0.005)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    api = FakePracticumAPI(
+        latency=args.api_latency, error_rate=args.api_errors,
+        change_interval=args.change_interval).start()
+    tg = FakeTelegramAPI(latency=args.tg_latency).start()
+    homework.ENDPOINT = api.endpoint
+    transport = configure_transport(pool_size=args.in_flight)
+
+    rss_before = current_rss()
+    tenants = [
+        Tenant(f't{i}', f'token{i}', [100000 + i])
+        for i in range(args.tenants)]
+    bot = telegram.Bot('123456:fake', base_url=tg.base_url)
+    engine = PollingEngine(
+        tenants, bot, retry_time=args.period, max_in_flight=args.in_flight,
+        cache=ResponseCache())
+
+    latencies = []
+    poll = engine.poll
+
+    async def timed_poll(tenant):
+        started = time.perf_counter()
+        await poll(tenant)
+        latencies.append(time.perf_counter() - started)
+
+    engine.poll = timed_poll
+    started = time.perf_counter()
+    asyncio.run(engine.run(cycles=args.cycles))
+    elapsed = time.perf_counter() - started
+    rss_after = current_rss()
+    api.stop()
+    tg.stop()
+
+    print(f'tenants:          {args.tenants}')
+    print(f'polls:            {engine.polls} in {elapsed:.2f} s')
+    print(f'polls/s:          {engine.polls / elapsed:.0f}')
+    print(f'poll p50:         {percentile(latencies, 50) * 1000:.1f} ms')
+    print(f'poll p99:         {percentile(latencies, 99) * 1000:.1f} ms')
+    requests = [timing.elapsed for timing in transport.timings]
+    print(f'request p50:      {percentile(requests, 50) * 1000:.1f} ms')
+    print(f'request p99:      {percentile(requests, 99) * 1000:.1f} ms')
+    print(f'api errors:       {api.errors}')
+    print(f'messages sent:    {len(tg.messages)}')
+    print(f'memory/tenant:    '
+          f'{(rss_after - rss_before) / args.tenants / 1024:.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
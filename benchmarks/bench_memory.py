@@ -0,0 +1,127 @@
+"""Память на состояние одного аккаунта: словари против TenantTable.
+
+"До" - прежнее устройство: объект с __dict__, статусы строками
+из ответа API, словарь имен и история в deque у каждого аккаунта.
+"После" - колонки TenantTable, статусы кодами, история и имена
+только у аккаунтов, у которых статусы менялись.
+
+Запуск: python benchmarks/bench_memory.py --tenants 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import StatusRecord  # noqa: E402
+from state import HomeworkIndex  # noqa: E402
+from tenants import HISTORY_SIZE, TenantTable  # noqa: E402
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+class DictState:
+    """Состояние аккаунта в прежнем виде."""
+
+    def __init__(self, from_date):
+        """Курсор from_date, остальное пусто."""
+        self.from_date = from_date
+        self.homeworks = {}
+        self.last_status = None
+        self.last_change_at = None
+        self.interval = None
+        self.checked_at = None
+        self.names = {}
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+
+def responses(tenants, homeworks, changed_share):
+    """Ответы API: свежие строки на каждый аккаунт, как после json.loads."""
+    for tenant in range(tenants):
+        body = json.dumps({'homeworks': [{
+            'id': tenant * 100 + number,
+            'homework_name': f'student{tenant}__hw{number}.zip',
+            'status': STATUSES[(tenant + number) % 3],
+        } for number in range(homeworks)], 'current_date': 1650000000})
+        yield tenant, json.loads(body), tenant % 100 < changed_share * 100
+
+
+def fill_dicts(tenants, homeworks, changed_share):
+    """Заполняем состояние в прежнем виде."""
+    states = {}
+    for tenant, answer, changed in responses(
+            tenants, homeworks, changed_share):
+        state = states[f't{tenant}'] = DictState(answer['current_date'])
+        state.last_change_at = time.monotonic()
+        state.interval = 600.0
+        state.checked_at = time.time()
+        for item in answer['homeworks']:
+            state.homeworks[item['id']] = item['status']
+            state.last_status = item['status']
+            if changed:
+                state.names[item['id']] = item['homework_name']
+                state.history.append(
+                    (time.time(), item['homework_name'], item['status']))
+    return states
+
+
+def fill_table(tenants, homeworks, changed_share):
+    """Заполняем TenantTable."""
+    table = TenantTable()
+    for tenant, answer, changed in responses(
+            tenants, homeworks, changed_share):
+        state = table.add(f't{tenant}', answer['current_date'])
+        state.last_change_at = time.monotonic()
+        state.interval = 600.0
+        state.checked_at = time.time()
+        state.homeworks = HomeworkIndex(
+            {item['id']: item['status'] for item in answer['homeworks']})
+        state.last_status = answer['homeworks'][-1]['status']
+        if changed:
+            for item in answer['homeworks']:
+                state.names[item['id']] = item['homework_name']
+                state.history.append(StatusRecord(
+                    time.time(), item['homework_name'], item['status']))
+    return table
+
+
+def measure(fill, *args):
+    """Сколько байт занимает результат fill."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fill(*args)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, used
+
+
+def main():
+    """Сравниваем память двух представлений."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=100000)
+    parser.add_argument('--homeworks', type=int, default=5)
+    parser.add_argument(
+        '--changed-share', type=float, default=0.1,
+        help='доля аккаунтов, у которых при работе бота менялись статусы')
+    args = parser.parse_args()
+    params = (args.tenants, args.homeworks, args.changed_share)
+
+    _, dicts = measure(fill_dicts, *params)
+    _, table = measure(fill_table, *params)
+    print(f'tenants: {args.tenants}, homeworks: {args.homeworks}')
+    print(f'dicts: {dicts / args.tenants:8.0f} B/tenant '
+          f'({dicts / 2 ** 20:.1f} MiB)')
+    print(f'table: {table / args.tenants:8.0f} B/tenant '
+          f'({table / 2 ** 20:.1f} MiB)')
+    print(f'ratio: {dicts / table:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
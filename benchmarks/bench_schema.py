@@ -0,0 +1,110 @@
+"""Проверка ответов многих аккаунтов: прежние проверки против схемы.
+
+"До" - прежний check_response с цепочкой isinstance и .get,
+затем проверки parse_status для каждой работы и HomeworkIndex.diff
+по словарям. "После" - скомпилированная схема, которая в том же
+проходе собирает строки работ, и diff по готовым строкам.
+
+Запуск: python benchmarks/bench_schema.py --tenants 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from state import HomeworkIndex  # noqa: E402
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def old_check_response(response):
+    """check_response до перехода на схему."""
+    if not isinstance(response, dict):
+        raise TypeError('ответ сервера не является словарем JSON.')
+    if response.get('homeworks') is None:
+        raise KeyError('Нет ключа "homeworks" в словаре response')
+    if response.get('current_date') is None:
+        raise KeyError('Нет ключа "current_date" в словаре response')
+    if not isinstance(response['homeworks'], list):
+        raise TypeError('Значение словаря "homeworks" не является списком.')
+    if not isinstance(response['current_date'], int):
+        raise KeyError('Значение "current_date" не является целым числом.')
+    return response['homeworks']
+
+
+def old_check_homework(item):
+    """Проверки работы из parse_status."""
+    if not item.get('homework_name'):
+        raise KeyError('Нет ключа "homework_name" в словаре homework')
+    if homework.HOMEWORK_VERDICTS.get(item.get('status')) is None:
+        raise KeyError(item.get('status'))
+
+
+def responses(tenants, homeworks):
+    """Ответы API, как после json.loads."""
+    return [json.loads(json.dumps({'homeworks': [{
+        'id': tenant * 100 + number,
+        'homework_name': f'student{tenant}__hw{number}.zip',
+        'status': STATUSES[(tenant + number) % 3],
+        'date_updated': '2020-02-13T14:40:57Z',
+    } for number in range(homeworks)], 'current_date': 1650000000}))
+        for tenant in range(tenants)]
+
+
+def before(batch, indexes):
+    """Прежняя цепочка проверок."""
+    for response, index in zip(batch, indexes):
+        items = old_check_response(response)
+        for item in items:
+            old_check_homework(item)
+        index.diff(items)
+
+
+def after(batch, indexes):
+    """Проверка по схеме и diff по строкам."""
+    for response, index in zip(batch, indexes):
+        index.diff(homework.check_response(response))
+
+
+def measure(func, batch, runs):
+    """Лучшее время одного прохода по пачке ответов.
+
+    Индексы заполнены теми же статусами: обычный опрос, в котором
+    ничего не изменилось.
+    """
+    indexes = [HomeworkIndex({
+        item['id']: item['status'] for item in response['homeworks']})
+        for response in batch]
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(batch, indexes)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Сравниваем время проверки пачки ответов."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=10000)
+    parser.add_argument('--homeworks', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    batch = responses(args.tenants, args.homeworks)
+    homework.check_response(batch[0])
+    old = measure(before, batch, args.runs)
+    new = measure(after, batch, args.runs)
+    print(f'tenants: {args.tenants}, homeworks: {args.homeworks}')
+    print(f'before: {old / args.tenants * 1e6:7.2f} us/response')
+    print(f' after: {new / args.tenants * 1e6:7.2f} us/response')
+    print(f' ratio: {old / new:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Недели опроса тысяч аккаунтов в виртуальном времени.
+
+Каждый аккаунт сдает работы в случайные моменты: работа берется
+на ревью через несколько часов, проверяется от десяти минут до
+трех часов и принимается или возвращается на доработку. Движок
+опрашивает симулированный API по VirtualClock, а бенчмарк считает
+опросы, долю опросов с изменениями и задержку уведомлений: от смены
+статуса в API до отправки сообщения.
+
+Запуск: python benchmarks/bench_simulation.py --tenants 2000 --days 7
+"""
+import argparse
+import asyncio
+import bisect
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from dispatcher import SEPARATOR  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+HOUR = 3600
+DAY = 24 * HOUR
+NAME = re.compile(r'работы "([^"]+)"')
+
+
+def timeline(rng, duration):
+    """События одного аккаунта: (время, id работы, статус)."""
+    events = []
+    homework_id = 0
+    moment = rng.uniform(0, 2 * DAY)
+    while moment < duration:
+        review = moment + rng.uniform(HOUR, 24 * HOUR)
+        events.append((review, homework_id, 'reviewing'))
+        done = review + rng.uniform(600, 3 * HOUR)
+        approved = rng.random() < 0.6
+        events.append(
+            (done, homework_id, 'approved' if approved else 'rejected'))
+        if approved:
+            homework_id += 1
+        moment = done + rng.expovariate(1 / (2 * DAY))
+    return [event for event in events if event[0] < duration]
+
+
+class SimulatedAPI:
+    """API Практикума, статусы которого меняются по расписанию."""
+
+    def __init__(self, clock, tenants, duration, seed):
+        """Расписание смен для tenants аккаунтов на duration секунд."""
+        rng = random.Random(seed)
+        self.clock = clock
+        self.timelines = {
+            tenant: timeline(rng, duration) for tenant in range(tenants)}
+        self.moments = {
+            tenant: [event[0] for event in events]
+            for tenant, events in self.timelines.items()}
+        self.changes = sum(map(len, self.timelines.values()))
+
+    def request(self, token, from_date, cache=None):
+        """Ответ для токена "token<номер аккаунта>"."""
+        tenant = int(token[5:])
+        now = self.clock.time() - self.clock.start
+        seen = bisect.bisect_right(self.moments[tenant], now)
+        latest = {}
+        for moment, homework_id, status in self.timelines[tenant][:seen]:
+            latest[homework_id] = (moment, status)
+        homeworks = [{
+            'id': homework_id,
+            'homework_name': f't{tenant}_hw{homework_id}.zip',
+            'status': status,
+            'date_updated': moment,
+        } for homework_id, (moment, status) in latest.items()
+            if moment + self.clock.start >= from_date]
+        homeworks.sort(key=lambda item: item['date_updated'], reverse=True)
+        return {'homeworks': homeworks, 'current_date': int(self.clock.time())}
+
+    def changed_at(self, name):
+        """Когда работа получила текущий статус."""
+        tenant, homework_id = re.match(r't(\d+)_hw(\d+)', name).groups()
+        now = self.clock.time() - self.clock.start
+        moment = None
+        for event_moment, event_id, _ in self.timelines[int(tenant)]:
+            if event_moment > now:
+                break
+            if event_id == int(homework_id):
+                moment = event_moment
+        return moment + self.clock.start
+
+
+class LatencyBot:
+    """Бот, который считает задержку каждого уведомления."""
+
+    def __init__(self, api):
+        """Моменты смен статусов берем у api."""
+        self.api = api
+        self.latencies = []
+
+    def send_message(self, chat_id, text):
+        """Задержка по каждому сообщению в склеенном тексте."""
+        now = self.api.clock.time()
+        for message in text.split(SEPARATOR):
+            name = NAME.search(message).group(1)
+            self.latencies.append(now - self.api.changed_at(name))
+
+
+async def simulate(engine, duration):
+    """Опрос в течение duration секунд виртуального времени."""
+    task = asyncio.ensure_future(engine.run())
+    await asyncio.sleep(duration)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированному списку."""
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    """Гоняем опрос в виртуальном времени и печатаем итоги."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=2000)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    clock = VirtualClock()
+    duration = args.days * DAY
+    api = SimulatedAPI(clock, args.tenants, duration, args.seed)
+    bot = LatencyBot(api)
+    tenants = [
+        Tenant(f't{i}', f'token{i}', [i]) for i in range(args.tenants)]
+    engine = PollingEngine(
+        tenants, bot, retry_time=homework.RETRY_TIME, clock=clock)
+    engine.request = api.request
+    started = time.perf_counter()
+    clock.run(simulate(engine, duration))
+    elapsed = time.perf_counter() - started
+
+    counts = engine.metrics.snapshot()
+    changed = sum(counts.get(('poll', 'changed'), ([0], 0))[0])
+    latencies = sorted(bot.latencies)
+    print(f'simulated: {args.tenants} tenants x {args.days:g} days '
+          f'in {elapsed:.1f} s')
+    rate = engine.polls / args.tenants / args.days
+    print(f'polls: {engine.polls} ({rate:.1f} per tenant per day), '
+          f'with changes: {changed}')
+    print(f'status changes: {api.changes}, notifications: {len(latencies)}')
+    if latencies:
+        print('latency: p50 {:.0f} s, p95 {:.0f} s, max {:.0f} s'.format(
+            percentile(latencies, 0.5), percentile(latencies, 0.95),
+            latencies[-1]))
+
+
+if __name__ == '__main__':
+    main()
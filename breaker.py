@@ -0,0 +1,103 @@
+import threading
+import time
+from http import HTTPStatus
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Сколько ошибок подряд размыкает цепь.
+FAILURE_THRESHOLD = 5
+# Через сколько секунд после размыкания пробуем снова, и предел
+# для удвоения этой паузы после неудачных проб.
+RESET_TIMEOUT = 30
+MAX_RESET_TIMEOUT = 600
+# Сколько пробных запросов одновременно пропускается в half_open.
+PROBES = 3
+
+
+class CircuitBreaker:
+    """Предохранитель API Практикума, общий для всех аккаунтов.
+
+    Получает RequestTiming каждого запроса через слушатель транспорта.
+    Ответ 5xx или ошибка соединения (таймаут, обрыв) считаются сбоем,
+    остальные ответы - успехом: 401 одного аккаунта не значит, что API
+    лежит. После failure_threshold сбоев подряд цепь размыкается,
+    и allow() перестает пропускать запросы. Через reset_timeout секунд
+    пропускается до probes пробных запросов: успешная проба замыкает
+    цепь, неудачная снова размыкает ее с удвоенной паузой.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, probes=PROBES,
+                 clock=time.monotonic):
+        """Цепь замкнута, счетчик неудач пуст."""
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probes = probes
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self.trips = 0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Можно ли сейчас делать запрос."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if (self.state == OPEN
+                    and self.clock() - self.opened_at >= self.reset_timeout):
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+            if (self.state == HALF_OPEN
+                    and self._probes_in_flight < self.probes):
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    @staticmethod
+    def is_failure(timing):
+        """Сбой ли это сервера, а не ошибка конкретного запроса."""
+        return (timing.error is not None
+                or timing.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def observe(self, timing):
+        """Слушатель HttpTransport: учитываем результат запроса."""
+        if self.is_failure(timing):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self):
+        """Запрос прошел, замыкаем цепь."""
+        with self._lock:
+            self.failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        """Сбой сервера, при необходимости размыкаем цепь."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(
+                    self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif (self.state == CLOSED
+                    and self.failures >= self.failure_threshold):
+                self.reset_timeout = self.base_reset_timeout
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.trips += 1
@@ -0,0 +1,75 @@
+import re
+
+# Возвращается вместо ответа, если он не изменился с прошлого опроса.
+NOT_MODIFIED = object()
+
+# current_date меняется каждую секунду, в хэш тела он не входит.
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*-?\d+')
+
+
+class ResponseCache:
+    """Кэш ответов API для условных запросов.
+
+    Для каждого ключа (обычно токена аккаунта) хранит ETag,
+    Last-Modified и хэш тела последнего ответа без current_date.
+    Если сервер ответил 304 или прислал те же работы, ответ считается
+    неизменным, и check_response с parse_status можно не вызывать.
+    Если изменения из ответа не удалось обработать, данные ключа
+    нужно удалить через forget(), иначе повтор запроса вернет
+    NOT_MODIFIED, и изменения будут потеряны.
+    """
+
+    def __init__(self):
+        """Кеш пуст, счетчики попаданий обнулены."""
+        self._validators = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Число ключей с сохраненными валидаторами."""
+        return len(self._validators)
+
+    def headers_for(self, key):
+        """Заголовки условного запроса для ключа."""
+        etag, last_modified, _ = self._validators.get(key, (None,) * 3)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def not_modified(self, key):
+        """Сервер ответил 304."""
+        self.hits += 1
+
+    def store(self, key, response):
+        """Запоминаем ответ 200, возвращаем True, если тело не изменилось."""
+        # hashlib грузит OpenSSL, импортируем его при первом ответе.
+        import hashlib
+
+        digest = hashlib.blake2b(
+            CURRENT_DATE.sub(b'', response.content), digest_size=16).digest()
+        previous = self._validators.get(key)
+        self._validators[key] = (
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            digest)
+        if previous is not None and previous[2] == digest:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def forget(self, key):
+        """Удаляем данные ключа после смены токена или сбоя обработки."""
+        self._validators.pop(key, None)
+
+    def stats(self):
+        """Число попаданий и промахов кэша."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
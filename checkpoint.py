@@ -0,0 +1,107 @@
+import sqlite3
+import time
+
+# Как часто сбрасываем накопленные изменения на диск, в секундах,
+# и сколько изменений можем накопить до принудительного сброса.
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cursors (
+    tenant TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework NOT NULL,
+    status TEXT,
+    PRIMARY KEY (tenant, homework)
+);
+'''
+
+
+class CheckpointStore:
+    """Хранилище курсоров from_date и статусов работ в SQLite.
+
+    База работает в режиме WAL. Изменения копятся в памяти и пишутся
+    одной транзакцией раз в flush_interval секунд или при накоплении
+    max_pending изменений, поэтому после сбоя теряется не больше
+    одного интервала. synchronous=FULL нужен для этого обещания:
+    с NORMAL в режиме WAL закоммиченная транзакция может пропасть
+    при отключении питания. fsync делается раз на транзакцию,
+    а не на каждое изменение.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING):
+        """Открываем базу path и создаем таблицы, если их нет."""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=FULL')
+        self._connection.executescript(SCHEMA)
+        self._cursors = {}
+        self._statuses = {}
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self):
+        """Сколько изменений ждет записи на диск."""
+        return len(self._cursors) + len(self._statuses)
+
+    def load(self):
+        """Загружаем сохраненное состояние всех аккаунтов.
+
+        Возвращаем словарь {аккаунт: (from_date, {работа: статус})}.
+        """
+        states = {}
+        for tenant, from_date in self._connection.execute(
+                'SELECT tenant, from_date FROM cursors'):
+            states[tenant] = (from_date, {})
+        for tenant, homework, status in self._connection.execute(
+                'SELECT tenant, homework, status FROM statuses'):
+            if tenant in states:
+                states[tenant][1][homework] = status
+        return states
+
+    def save_cursor(self, tenant, from_date):
+        """Запоминаем новый курсор аккаунта."""
+        self._cursors[tenant] = from_date
+        self.maybe_flush()
+
+    def save_status(self, tenant, homework, status):
+        """Запоминаем подтвержденный статус работы."""
+        # Колонка без типа: числовые id и названия хранятся как есть.
+        self._statuses[(tenant, homework)] = status
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """Сбрасываем изменения, если пора по времени или по объему."""
+        if not self.pending:
+            return
+        if (self.pending >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Пишем все накопленные изменения одной транзакцией."""
+        self._last_flush = time.monotonic()
+        if not self.pending:
+            return
+        with self._connection:
+            self._connection.execute('BEGIN')
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                self._cursors.items())
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                [key + (status,) for key, status in self._statuses.items()])
+        self._cursors.clear()
+        self._statuses.clear()
+
+    def close(self):
+        """Сбрасываем остаток изменений и закрываем базу."""
+        self.flush()
+        self._connection.close()
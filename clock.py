@@ -0,0 +1,130 @@
+"""Часы движка опроса: настоящие и виртуальные.
+
+Движок, планировщик, диспетчер, предохранитель и подавление
+ошибок берут время у одного объекта часов: clock.time() для
+отметок в состоянии аккаунтов и clock.monotonic() для сроков
+и интервалов. SystemClock - обычное время.
+
+VirtualClock - время, которое идет только в его цикле событий.
+Цикл из VirtualClock.run() не ждет таймеров: если готовых задач
+нет, часы сразу переводятся на срок ближайшего таймера. Так
+asyncio.sleep, wait_for и все сроки внутри цикла выполняются
+мгновенно, и недели опроса проходят за секунды. Блокирующие
+вызовы движка (clock.call) выполняются сразу, без пула потоков;
+пока в пуле есть вызовы через run_in_executor, время не
+переводится. В обоих случаях вызов занимает ноль виртуального
+времени.
+"""
+import asyncio
+import selectors
+import time
+
+# 2021-01-01 00:00:00 UTC: начало виртуального времени по умолчанию.
+VIRTUAL_EPOCH = 1609459200.0
+
+
+class SystemClock:
+    """Настоящее время."""
+
+    def time(self):
+        """Время Unix, секунды."""
+        return time.time()
+
+    def monotonic(self):
+        """Монотонное время для сроков и интервалов."""
+        return time.monotonic()
+
+    async def call(self, executor, func, *args):
+        """Выполняем блокирующую функцию в пуле потоков executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, *args)
+
+    def run(self, coro):
+        """Выполняем корутину в обычном цикле событий."""
+        return asyncio.run(coro)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock(SystemClock):
+    """Виртуальное время, которое переводится циклом событий."""
+
+    def __init__(self, start=VIRTUAL_EPOCH):
+        """Виртуальное время Unix начинается со start."""
+        self.start = start
+        self.elapsed = 0.0
+        self.pending_calls = 0
+
+    def time(self):
+        """Виртуальное время Unix."""
+        return self.start + self.elapsed
+
+    def monotonic(self):
+        """Секунды виртуального времени с создания часов."""
+        return self.elapsed
+
+    def advance(self, seconds):
+        """Переводим часы вперед."""
+        if seconds > 0:
+            self.elapsed += seconds
+
+    async def call(self, executor, func, *args):
+        """Выполняем функцию сразу, в потоке цикла.
+
+        Виртуальное время за вызов все равно не идет, а передача
+        в поток и обратно стоила бы больше самого вызова.
+        """
+        return func(*args)
+
+    def run(self, coro):
+        """Выполняем корутину в цикле с виртуальным временем."""
+        loop = _VirtualLoop(self)
+        try:
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(coro)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+
+class _WarpSelector:
+    """Селектор, который вместо ожидания переводит часы."""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if self._clock.pending_calls or timeout is None:
+            # Ждем по-настоящему результата из потока.
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class _VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        super().__init__(_WarpSelector(selectors.DefaultSelector(), clock))
+        self._virtual_clock = clock
+        # Сроки таймеров сравниваются точно, без допуска по разрешению.
+        self._clock_resolution = 1e-9
+
+    def time(self):
+        return self._virtual_clock.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self._virtual_clock.pending_calls += 1
+        future.add_done_callback(self._call_done)
+        return future
+
+    def _call_done(self, _):
+        self._virtual_clock.pending_calls -= 1
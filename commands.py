@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from records import verdict
+
+logger = logging.getLogger(__name__)
+
+# Long polling getUpdates: сколько секунд телеграм держит запрос
+# и сколько ждать после ошибки.
+POLL_TIMEOUT = 30
+ERROR_DELAY = 5
+
+HELP = ('Команды: /status - текущие статусы работ, '
+        '/history - последние изменения статусов.')
+UNKNOWN_CHAT = 'Этот чат не привязан ни к одному аккаунту.'
+
+
+def _ago(seconds):
+    if seconds < 60:
+        return f'{int(seconds)} сек. назад'
+    return f'{int(seconds // 60)} мин. назад'
+
+
+class CommandResponder:
+    """Отвечает на команды из уже известного состояния движка.
+
+    Запросов к API не делает: статусы берутся из индекса работ
+    аккаунта, а в ответе указывается, насколько давно был
+    последний успешный опрос.
+    """
+
+    def __init__(self, engine, clock=None):
+        """Ответы собираются по состоянию engine."""
+        self.engine = engine
+        # Отметки checked_at ставятся по часам движка.
+        self.clock = engine.clock.time if clock is None else clock
+
+    def reply(self, chat_id, text):
+        """Текст ответа на сообщение или None, если это не команда."""
+        if not text or not text.startswith('/'):
+            return None
+        # /status@имя_бота в группах.
+        command = text.split()[0].split('@')[0]
+        render = {
+            '/status': self._status,
+            '/history': self._history,
+        }.get(command)
+        if render is None:
+            return HELP
+        tenants = self.engine.tenants_for_chat(chat_id)
+        if not tenants:
+            return UNKNOWN_CHAT
+        sections = []
+        for tenant in tenants:
+            lines = render(self.engine.states.get(tenant.name))
+            if len(tenants) > 1:
+                lines.insert(0, f'{tenant.name}:')
+            sections.append('\n'.join(lines))
+        return '\n\n'.join(sections)
+
+    def _freshness(self, state):
+        if state is None or state.checked_at is None:
+            return 'Бот еще не получил ответ от API.'
+        return (
+            'Данные обновлены '
+            f'{_ago(self.clock() - state.checked_at)}.')
+
+    def _status(self, state):
+        lines = [self._freshness(state)]
+        if state is None or not len(state.homeworks):
+            lines.append('Работ на проверке нет.')
+            return lines
+        for key, status in state.homeworks.items():
+            name = state.names.get(key, key)
+            lines.append(f'"{name}": {verdict(status)}')
+        return lines
+
+    def _history(self, state):
+        lines = [self._freshness(state)]
+        if state is None or not state.has_history:
+            lines.append('Изменений статусов пока не было.')
+            return lines
+        for record in reversed(state.history):
+            moment = datetime.fromtimestamp(record.changed_at).strftime(
+                '%d.%m %H:%M')
+            lines.append(f'{moment} "{record.name}": {verdict(record.status)}')
+        return lines
+
+
+class UpdatePoller:
+    """Забирает входящие сообщения через getUpdates.
+
+    Работает задачей в цикле событий движка, ответы уходят через
+    его диспетчер. Long polling выполняется в отдельном потоке,
+    чтобы не занимать пул и семафор запросов к API.
+    """
+
+    def __init__(self, bot, responder, timeout=POLL_TIMEOUT):
+        """Каждый getUpdates ждет новых сообщений до timeout секунд."""
+        self.bot = bot
+        self.responder = responder
+        self.timeout = timeout
+        self.offset = None
+        self.answered = 0
+        self._handling = set()
+
+    def _fetch(self):
+        return self.bot.get_updates(
+            offset=self.offset, timeout=self.timeout,
+            allowed_updates=['message'])
+
+    async def handle(self, update, send):
+        """Отвечаем на одно обновление."""
+        message = update.message
+        if message is None:
+            return
+        started = time.perf_counter()
+        text = self.responder.reply(message.chat_id, message.text)
+        if text is None:
+            return
+        logger.info(
+            f'Команда {message.text!r} из чата {message.chat_id}, '
+            f'ответ за {(time.perf_counter() - started) * 1000:.1f} мс')
+        self.answered += 1
+        await send(message.chat_id, text)
+
+    async def run(self, send):
+        """Цикл опроса getUpdates, работает до отмены задачи."""
+        from telegram.error import TelegramError
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(1, thread_name_prefix='updates')
+        try:
+            while True:
+                try:
+                    updates = await loop.run_in_executor(
+                        executor, self._fetch)
+                except TelegramError as error:
+                    logger.error(f'Не удалось получить сообщения: {error}')
+                    await asyncio.sleep(ERROR_DELAY)
+                    continue
+                for update in updates:
+                    self.offset = update.update_id + 1
+                    task = asyncio.ensure_future(self.handle(update, send))
+                    self._handling.add(task)
+                    task.add_done_callback(self._handling.discard)
+        finally:
+            executor.shutdown(wait=False)
@@ -0,0 +1,194 @@
+import json
+import os
+
+# Поля домашней работы, которые использует бот. С декодером streaming
+# остальные поля (например, reviewer_comment) не сохраняются.
+HOMEWORK_FIELDS = ('id', 'homework_name', 'status', 'date_updated')
+ANSWER_KEYS = ('homeworks', 'current_date')
+
+_WHITESPACE = ' \t\n\r'
+
+
+class StdlibDecoder:
+    """Декодирование стандартным json через response.json()."""
+
+    name = 'json'
+
+    def loads(self, body):
+        """Разбираем строку или байты целиком."""
+        return json.loads(body)
+
+    def decode(self, response):
+        """Разбираем тело ответа requests целиком."""
+        return response.json()
+
+
+class OrjsonDecoder(StdlibDecoder):
+    """Декодирование через orjson, если он установлен.
+
+    Библиотека импортируется при создании декодера, а не при импорте
+    модуля, чтобы не замедлять импорт homework. Если ее нет,
+    конструктор выбрасывает ImportError.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        """Импортируем orjson, ImportError - если его нет."""
+        import orjson
+
+        self._loads = orjson.loads
+
+    def loads(self, body):
+        """Разбираем строку или байты целиком."""
+        return self._loads(body)
+
+    def decode(self, response):
+        """Разбираем байты тела ответа без промежуточной строки."""
+        return self._loads(response.content)
+
+
+class UjsonDecoder(OrjsonDecoder):
+    """Декодирование через ujson, если он установлен."""
+
+    name = 'ujson'
+
+    def __init__(self):
+        """Импортируем ujson, ImportError - если его нет."""
+        import ujson
+
+        self._loads = ujson.loads
+
+
+class StreamingDecoder(StdlibDecoder):
+    """Разбор ответа API с отбрасыванием лишних полей.
+
+    Из объекта верхнего уровня достаются только current_date
+    и элементы homeworks, у работ остаются только HOMEWORK_FIELDS.
+    Разбор не потоковый: тело ответа читается в строку целиком,
+    и каждая работа разбирается полностью, прежде чем лишние поля
+    будут отброшены. Поэтому пиковая память та же, что у json,
+    а разбор медленнее (см. benchmarks/bench_decoder.py). Меньше
+    только память, которая остается занятой разобранным ответом.
+    """
+
+    name = 'streaming'
+
+    def __init__(self):
+        """Значения разбирает стандартный JSONDecoder."""
+        self._decoder = json.JSONDecoder()
+
+    def decode(self, response):
+        """Разбираем текст тела ответа."""
+        return self.loads(response.text)
+
+    def _skip_spaces(self, text, index):
+        while index < len(text) and text[index] in _WHITESPACE:
+            index += 1
+        return index
+
+    def _expect(self, text, index, char):
+        index = self._skip_spaces(text, index)
+        if index >= len(text) or text[index] != char:
+            raise ValueError(f'Ожидался символ {char!r} в позиции {index}')
+        return index + 1
+
+    def iter_array(self, text, index):
+        """Перебираем элементы массива, начинающегося с позиции index.
+
+        Последним значением возвращается позиция после массива.
+        """
+        index = self._expect(text, index, '[')
+        index = self._skip_spaces(text, index)
+        if text[index] == ']':
+            return index + 1
+        while True:
+            item, index = self._decoder.raw_decode(
+                text, self._skip_spaces(text, index))
+            yield item
+            index = self._skip_spaces(text, index)
+            if text[index] == ']':
+                return index + 1
+            index = self._expect(text, index, ',')
+
+    def _read_homeworks(self, text, index):
+        homeworks = []
+        items = self.iter_array(text, index)
+        while True:
+            try:
+                item = next(items)
+            except StopIteration as stop:
+                return homeworks, stop.value
+            if isinstance(item, dict):
+                item = {
+                    key: item[key] for key in HOMEWORK_FIELDS if key in item}
+            homeworks.append(item)
+
+    def loads(self, body):
+        """Достаем из ответа только нужные ключи."""
+        text = body.decode('utf-8') if isinstance(body, bytes) else body
+        index = self._skip_spaces(text, 0)
+        if not text.startswith('{', index):
+            # Не объект: отдаем как есть, check_response сообщит об ошибке.
+            return self._decoder.decode(text)
+        answer = {}
+        index = self._skip_spaces(text, index + 1)
+        if text[index] == '}':
+            return answer
+        while True:
+            key, index = self._decoder.raw_decode(
+                text, self._skip_spaces(text, index))
+            index = self._expect(text, index, ':')
+            index = self._skip_spaces(text, index)
+            if key == 'homeworks' and text[index] == '[':
+                answer[key], index = self._read_homeworks(text, index)
+            else:
+                value, index = self._decoder.raw_decode(text, index)
+                if key in ANSWER_KEYS:
+                    answer[key] = value
+            index = self._skip_spaces(text, index)
+            if text[index] == '}':
+                return answer
+            index = self._expect(text, index, ',')
+
+
+BACKENDS = {
+    'json': StdlibDecoder,
+    'orjson': OrjsonDecoder,
+    'ujson': UjsonDecoder,
+    'streaming': StreamingDecoder,
+}
+
+_decoder = None
+
+
+def make_decoder(backend='auto'):
+    """Создаем декодер: самый быстрый из установленных или заданный."""
+    if backend == 'auto':
+        for name in ('orjson', 'ujson'):
+            try:
+                return BACKENDS[name]()
+            except ImportError:
+                pass
+        return StdlibDecoder()
+    if backend not in BACKENDS:
+        raise KeyError(f'Неизвестный декодер JSON: {backend}')
+    try:
+        return BACKENDS[backend]()
+    except ImportError:
+        raise ImportError(f'Декодер JSON {backend} не установлен')
+
+
+def get_decoder():
+    """Декодер процесса, выбирается по переменной JSON_BACKEND."""
+    global _decoder
+    if _decoder is None:
+        _decoder = make_decoder(os.getenv('JSON_BACKEND', 'auto'))
+    return _decoder
+
+
+def configure_decoder(backend):
+    """Меняем декодер процесса."""
+    global _decoder
+    _decoder = make_decoder(backend)
+    return _decoder
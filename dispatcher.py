@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import homework
+from exceptions import NotSendingMessageException
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Bot API: около 30 сообщений в секунду всего и 1 в секунду в чат.
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+MAX_PENDING = 10000
+MAX_MESSAGE_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+
+class TokenBucket:
+    """Классическое ведро токенов с пополнением rate токенов в секунду."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Ведро сразу полное, по умолчанию вмещает rate токенов."""
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(
+                self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, now=None):
+        """Через сколько секунд будет доступен токен."""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now=None):
+        """Забираем токен, если он есть."""
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class MessageDispatcher:
+    """Очередь исходящих сообщений с ограничением скорости.
+
+    Сообщения отправляются с учетом общего лимита бота и лимита
+    на каждый чат. Если в чат накопилось несколько сообщений, они
+    склеиваются в одно. Когда очередь переполнена, send() ждет,
+    пока она освободится, вместо того чтобы получать 429 от телеграма.
+    """
+
+    def __init__(self, bot, call, global_rate=GLOBAL_RATE,
+                 chat_rate=CHAT_RATE, max_pending=MAX_PENDING,
+                 clock=time.monotonic, metrics=None):
+        """Блокирующую отправку запускает call в пуле потоков движка."""
+        self.bot = bot
+        self.call = call
+        self.chat_rate = chat_rate
+        self.max_pending = max_pending
+        self.clock = clock
+        self.metrics = metrics
+        self.global_bucket = TokenBucket(global_rate, clock=clock)
+        self.chat_buckets = {}
+        self.sent = 0
+        self.coalesced = 0
+        self._pending = OrderedDict()
+        self._size = 0
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        self._sending = set()
+
+    @property
+    def pending(self):
+        """Сколько сообщений ждет отправки."""
+        return self._size
+
+    async def send(self, chat_id, message):
+        """Ставим сообщение в очередь и ждем результата отправки.
+
+        Возвращаем True, если сообщение доставлено.
+        """
+        async with self._space:
+            await self._space.wait_for(
+                lambda: self._size < self.max_pending)
+            future = asyncio.get_running_loop().create_future()
+            self._pending.setdefault(chat_id, []).append((message, future))
+            self._size += 1
+        self._wakeup.set()
+        return await future
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate, capacity=1, clock=self.clock)
+        return bucket
+
+    def _take_batch(self, chat_id):
+        """Забираем из очереди чата сообщения, влезающие в одно."""
+        queue = self._pending[chat_id]
+        batch = [queue.pop(0)]
+        length = len(batch[0][0])
+        while queue and (length + len(SEPARATOR) + len(queue[0][0])
+                         <= MAX_MESSAGE_LENGTH):
+            length += len(SEPARATOR) + len(queue[0][0])
+            batch.append(queue.pop(0))
+        if not queue:
+            del self._pending[chat_id]
+        self._size -= len(batch)
+        return batch
+
+    async def _deliver(self, chat_id, batch):
+        text = SEPARATOR.join(message for message, _ in batch)
+        started = time.perf_counter()
+        delivered = False
+        try:
+            await self.call(homework.send_to_chat, self.bot, chat_id, text)
+            delivered = True
+        except NotSendingMessageException as e:
+            logger.error(f'Сообщение не отправлено, ошибка : {e}')
+        except Exception as e:
+            logger.error(f'Сообщение не отправлено, сбой: {e!r}')
+        finally:
+            # Иначе send() ждал бы вечно, даже если отправку отменили.
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(delivered)
+        if self.metrics is not None:
+            self.metrics.observe(
+                'send', 'ok' if delivered else 'error',
+                time.perf_counter() - started)
+        self.sent += 1
+        self.coalesced += len(batch) - 1
+
+    def _dispatch_ready(self):
+        """Отправляем все, что позволяют лимиты.
+
+        Возвращаем время ожидания до следующей возможной отправки.
+        """
+        wait = None
+        now = self.clock()
+        for chat_id in list(self._pending):
+            if chat_id in self._sending:
+                continue
+            delay = max(
+                self._chat_bucket(chat_id).delay(now),
+                self.global_bucket.delay(now))
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            self._chat_bucket(chat_id).take(now)
+            self.global_bucket.take(now)
+            batch = self._take_batch(chat_id)
+            self._sending.add(chat_id)
+            task = asyncio.ensure_future(self._deliver(chat_id, batch))
+            task.add_done_callback(
+                lambda _, chat_id=chat_id: self._sent_to(chat_id))
+        return wait
+
+    def _sent_to(self, chat_id):
+        self._sending.discard(chat_id)
+        self._wakeup.set()
+
+    async def run(self):
+        """Основной цикл отправки, работает до отмены задачи."""
+        while True:
+            self._wakeup.clear()
+            size = self._size
+            wait = self._dispatch_ready()
+            if self._size < size:
+                async with self._space:
+                    self._space.notify_all()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,546 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import homework
+from breaker import CLOSED, HALF_OPEN, CircuitBreaker
+from cache import NOT_MODIFIED
+from clock import SYSTEM_CLOCK
+from dispatcher import CHAT_RATE, GLOBAL_RATE, MessageDispatcher
+from exceptions import CircuitOpenException, NotSendingMessageException
+from incidents import ErrorSuppressor
+from intervals import AdaptivePolicy
+from metrics import Metrics
+from records import StatusRecord
+from scheduler import PollScheduler
+from state import HomeworkIndex
+from tenants import TenantTable
+from tracing import Tracer, span
+from transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Частые однотипные записи пишутся в лог выборочно, см. log_pipeline.
+SAMPLED = {'sampled': True}
+
+# Сколько запросов к API и телеграму может выполняться одновременно.
+MAX_IN_FLIGHT = 32
+
+# Итоги опроса, при которых API не ответил.
+FAILED = ('error', 'shed')
+BREAKER_STATES = {CLOSED: 0, HALF_OPEN: 1}
+
+
+class PollingEngine:
+    """Опрос множества аккаунтов в одном цикле событий.
+
+    Каждый аккаунт проходит те же шаги, что и раньше в main():
+    get_api_answer -> check_response -> parse_status -> send_message.
+    Сообщения уходят через MessageDispatcher с учетом лимитов телеграма.
+    Блокирующие вызовы выполняются в пуле потоков, а число
+    одновременных запросов ограничено семафором. Очередность
+    опросов определяет PollScheduler, а интервал до следующего
+    опроса каждого аккаунта - AdaptivePolicy. Доля опросов,
+    заданная в tracer, записывается трассами с этапами, а profiler
+    профилирует первые итерации. Повторяющиеся ошибки отправляются
+    в чат один раз, см. ErrorSuppressor. Пока разомкнут общий
+    предохранитель CircuitBreaker, запросы к API не выполняются.
+    Если задан commands (UpdatePoller), бот отвечает на команды
+    из чатов аккаунтов. Если задан shard (ShardCoordinator), набор
+    аккаунтов меняется на ходу по арендам воркера, а если задан
+    watcher (ConfigWatcher) - по изменениям файлов настроек.
+    Если задан recorder (recording.Recorder), ответы API пишутся
+    в файл записи; request подменяет функцию запроса к API.
+    Если задан backfill (backfill.Backfill), отставшие после простоя
+    аккаунты опрашиваются до начала обычного опроса.
+    Время берется у clock (clock.SystemClock или VirtualClock).
+    """
+
+    def __init__(self, tenants, bot, retry_time=homework.RETRY_TIME,
+                 max_in_flight=MAX_IN_FLIGHT, policy=None, checkpoints=None,
+                 cache=None, metrics=None, tracer=None, profiler=None,
+                 errors=None, breaker=None, send_rate=GLOBAL_RATE,
+                 chat_rate=CHAT_RATE, clock=None):
+        """Движок для аккаунтов tenants с базовым интервалом retry_time.
+
+        Остальные параметры задают ограничения нагрузки, хранение
+        состояния и наблюдение; без них берутся значения по умолчанию.
+        """
+        self.clock = SYSTEM_CLOCK if clock is None else clock
+        self.tenants = {tenant.name: tenant for tenant in tenants}
+        self.bot = bot
+        self.retry_time = retry_time
+        self.max_in_flight = max_in_flight
+        self.states = TenantTable()
+        self.scheduler = PollScheduler(retry_time, clock=self.clock.monotonic)
+        self.policy = policy or AdaptivePolicy(retry_time)
+        self.checkpoints = checkpoints
+        self.cache = cache
+        self.dispatcher = None
+        self.metrics = Metrics() if metrics is None else metrics
+        self._register_gauges()
+        self.tracer = Tracer() if tracer is None else tracer
+        self.profiler = profiler
+        self.errors = (
+            ErrorSuppressor(clock=self.clock.monotonic)
+            if errors is None else errors)
+        self.breaker = (
+            CircuitBreaker(clock=self.clock.monotonic)
+            if breaker is None else breaker)
+        # Лимит отправки на весь бот; процессы-воркеры делят его между собой.
+        self.send_rate = send_rate
+        self.chat_rate = chat_rate
+        self.commands = None
+        self.shard = None
+        self.watcher = None
+        self.recorder = None
+        self.request = None
+        self.backfill = None
+        self._chat_index = None
+        self.polls = 0
+        self._executor = None
+        self._semaphore = None
+        self._wakeup = None
+        self._running = {}
+        self._cycles_done = {}
+
+    def _register_gauges(self):
+        gauges = (
+            ('tenants', 'Число опрашиваемых аккаунтов.',
+             lambda: len(self.tenants)),
+            ('scheduler_depth', 'Аккаунтов в очереди планировщика.',
+             lambda: self.scheduler.depth),
+            ('scheduler_max_lateness_seconds',
+             'Максимальное опоздание опроса.',
+             lambda: self.scheduler.max_lateness),
+            ('dispatcher_pending', 'Сообщений в очереди отправки.',
+             lambda: self.dispatcher.pending if self.dispatcher else 0),
+            ('cache_hits', 'Неизменных ответов API.',
+             lambda: self.cache.hits if self.cache else 0),
+            ('cache_misses', 'Новых ответов API.',
+             lambda: self.cache.misses if self.cache else 0),
+            ('errors_active', 'Неустраненных ошибок аккаунтов.',
+             lambda: len(self.errors)),
+            ('errors_suppressed', 'Повторов ошибок, не отправленных в чат.',
+             lambda: self.errors.suppressed),
+            ('breaker_state',
+             'Предохранитель API: 0 - замкнут, 1 - проба, 2 - разомкнут.',
+             lambda: BREAKER_STATES.get(self.breaker.state, 2)),
+            ('breaker_rejected', 'Запросов, отброшенных предохранителем.',
+             lambda: self.breaker.rejected),
+        )
+        for name, help_text, getter in gauges:
+            self.metrics.add_gauge(name, help_text, getter)
+
+    def state_for(self, tenant):
+        """Возвращаем состояние аккаунта, создавая его при первом опросе."""
+        state = self.states.get(tenant.name)
+        if state is None:
+            state = self.states.add(tenant.name, int(self.clock.time()))
+            # Простой считается с начала отслеживания аккаунта.
+            state.last_change_at = self.scheduler.clock()
+        return state
+
+    def tenants_for_chat(self, chat_id):
+        """Аккаунты, уведомления которых приходят в чат chat_id."""
+        if self._chat_index is None:
+            index = {}
+            for tenant in self.tenants.values():
+                for chat in tenant.chat_ids:
+                    # В переменных окружения id чата - строка.
+                    index.setdefault(str(chat), []).append(tenant)
+            self._chat_index = index
+        return self._chat_index.get(str(chat_id), [])
+
+    def restore(self, names=None):
+        """Восстанавливаем курсоры и статусы из хранилища.
+
+        Аккаунты продолжают опрос с того from_date, на котором
+        остановились до перезапуска. names ограничивает набор аккаунтов.
+        """
+        if self.checkpoints is None:
+            return 0
+        restored = 0
+        for name, (from_date, statuses) in self.checkpoints.load().items():
+            if name not in self.tenants:
+                continue
+            if names is not None and name not in names:
+                continue
+            state = self.state_for(self.tenants[name])
+            state.from_date = from_date
+            state.homeworks = HomeworkIndex(statuses)
+            restored += 1
+        logger.info(f'Восстановлено состояние аккаунтов: {restored}')
+        return restored
+
+    def add_tenants(self, tenants):
+        """Начинаем опрашивать аккаунты на ходу.
+
+        Состояние берется из хранилища, если аккаунт раньше
+        опрашивался, в том числе другим воркером.
+        """
+        tenants = [
+            tenant for tenant in tenants if tenant.name not in self.tenants]
+        for tenant in tenants:
+            self.tenants[tenant.name] = tenant
+        self._chat_index = None
+        self.restore({tenant.name for tenant in tenants})
+        for tenant in tenants:
+            self.scheduler.add(tenant.name)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def update_tenants(self, tenants):
+        """Подменяем токены и чаты уже опрашиваемых аккаунтов.
+
+        Начатый опрос доходит со старым токеном, следующий идет
+        с новым. Расписание и состояние аккаунтов не меняются.
+        """
+        for tenant in tenants:
+            previous = self.tenants.get(tenant.name)
+            if previous is None:
+                continue
+            self.tenants[tenant.name] = tenant
+            if (self.cache is not None
+                    and previous.practicum_token != tenant.practicum_token):
+                # Условные заголовки старого токена к новому не относятся.
+                self.cache.forget(previous.practicum_token)
+        self._chat_index = None
+
+    def set_retry_time(self, retry_time):
+        """Меняем базовый интервал опроса на ходу.
+
+        Уже назначенные сроки не сдвигаются, новый интервал
+        действует с очередного перепланирования каждого аккаунта.
+        Границы политики масштабируются вместе с интервалом.
+        """
+        self.retry_time = retry_time
+        self.scheduler.period = retry_time
+        self.policy = self.policy.rescaled(retry_time)
+
+    async def remove_tenants(self, names):
+        """Перестаем опрашивать аккаунты.
+
+        Дожидаемся уже начатых опросов и сбрасываем курсоры на диск,
+        чтобы следующий владелец аккаунта продолжил с того же места.
+        """
+        for name in names:
+            self.tenants.pop(name, None)
+            self.scheduler.remove(name)
+        self._chat_index = None
+        polling = [
+            self._running[name] for name in names if name in self._running]
+        if polling:
+            await asyncio.gather(*polling, return_exceptions=True)
+        for name in names:
+            self.states.discard(name)
+        if self.checkpoints is not None:
+            self.checkpoints.flush()
+
+    def _advance(self, tenant, state, from_date):
+        state.from_date = from_date
+        if self.checkpoints is not None:
+            self.checkpoints.save_cursor(tenant.name, from_date)
+
+    async def _call(self, func, *args, admit=None):
+        """Выполняем блокирующую функцию в пуле потоков.
+
+        Контекст копируется, чтобы этапы из потока попали в трассу.
+        admit проверяется уже после ожидания семафора, чтобы вызовы,
+        стоявшие в очереди, тоже отбрасывались при отказе.
+        """
+        async with self._semaphore:
+            if admit is not None and not admit():
+                raise CircuitOpenException('Предохранитель API разомкнут')
+            return await self.clock.call(
+                self._executor, contextvars.copy_context().run, func, *args)
+
+    async def notify(self, tenant, message):
+        """Отправляем сообщение во все чаты аккаунта через диспетчер.
+
+        Возвращаем число чатов, в которые сообщение доставлено.
+        """
+        results = await asyncio.gather(*(
+            self.dispatcher.send(chat_id, message)
+            for chat_id in tenant.chat_ids))
+        return sum(results)
+
+    async def _deliver_changes(self, tenant, state, changes):
+        """Отправляем изменения и запоминаем доставленные.
+
+        Сообщения ставятся в очередь разом, чтобы диспетчер мог
+        склеить их в одно. Работа, для которой parse_status не смог
+        составить сообщение, пропускается и не держит курсор: иначе
+        каждый опрос получал бы ее снова. Возвращаем True, если
+        доставлено все, что удалось составить.
+        """
+        with self.metrics.stage('parse'), span('parse'):
+            rendered = []
+            for change in changes:
+                try:
+                    rendered.append(
+                        (change, homework.parse_status(change.homework)))
+                except KeyError as error:
+                    logger.error(
+                        f'{tenant.name}: Работа {change.key} пропущена: '
+                        f'{error}')
+            changes = [change for change, _ in rendered]
+            messages = [message for _, message in rendered]
+        with span('send'):
+            results = await asyncio.gather(*(
+                self.notify(tenant, message) for message in messages))
+        for change, delivered in zip(changes, results):
+            if not delivered:
+                continue
+            state.homeworks.commit(change)
+            name = change.homework.get('homework_name', change.key)
+            state.names[change.key] = name
+            state.history.append(
+                StatusRecord(self.clock.time(), name, change.new_status))
+            if self.checkpoints is not None:
+                self.checkpoints.save_status(
+                    tenant.name, change.key, change.new_status)
+        return all(results)
+
+    async def poll(self, tenant):
+        """Один цикл опроса аккаунта, возвращает итог для метрик."""
+        started = time.perf_counter()
+        with self.tracer.trace('poll', tenant=tenant.name) as trace:
+            outcome = await self._poll(tenant)
+            if trace is not None:
+                trace.attributes['outcome'] = outcome
+        self.metrics.observe('poll', outcome, time.perf_counter() - started)
+        if outcome not in FAILED:
+            self.metrics.poll_succeeded()
+            self.states[tenant.name].checked_at = self.clock.time()
+            for summary in self.errors.resolve(tenant.name):
+                await self.notify(tenant, summary)
+        return outcome
+
+    async def _request(self, tenant, state):
+        """Запрос к API; ответ или ошибка попадают в запись, если она идет.
+
+        Пишем уже в цикле событий, поэтому порядок записей совпадает
+        с порядком, в котором ответы обрабатываются дальше.
+        """
+        request = self.request or homework.request_api_answer
+        try:
+            response = await self._call(
+                request, tenant.practicum_token, state.from_date, self.cache,
+                admit=self.breaker.allow)
+        except CircuitOpenException:
+            raise
+        except Exception as error:
+            if self.recorder is not None:
+                self.recorder.api(tenant, state.from_date, error=error)
+            raise
+        if self.recorder is not None:
+            self.recorder.api(tenant, state.from_date, response)
+        return response
+
+    def _forget_response(self, tenant):
+        """Следующий запрос аккаунта пойдет без условных заголовков.
+
+        Ответ, изменения из которого не дошли до чатов, запомнен
+        в кэше; без этого повтор вернул бы NOT_MODIFIED.
+        """
+        if self.cache is not None:
+            self.cache.forget(tenant.practicum_token)
+
+    async def _apply(self, tenant, state, homeworks, current_date):
+        """Отправляем изменения из непустого ответа и двигаем курсор."""
+        state.last_change_at = self.scheduler.clock()
+        changes = state.homeworks.diff(homeworks)
+        if not changes:
+            logger.info(f'{tenant.name}: Статус не изменился', extra=SAMPLED)
+        if await self._deliver_changes(tenant, state, changes):
+            # Иначе следующий опрос вернет неотправленные работы снова.
+            self._advance(tenant, state, current_date)
+        else:
+            self._forget_response(tenant)
+        state.last_status = next(
+            (status for status in state.homeworks.statuses()
+             if status in self.policy.active_statuses),
+            homeworks[0].get('status'))
+        return 'changed' if changes else 'unchanged'
+
+    async def _poll(self, tenant):
+        """Опрос без замеров, возвращает итог для метрик."""
+        state = self.state_for(tenant)
+        self.polls += 1
+        response = None
+        try:
+            with self.metrics.stage('request'), span('request'):
+                response = await self._request(tenant, state)
+            if response is NOT_MODIFIED:
+                logger.info(
+                    f'{tenant.name}: Ответ не изменился', extra=SAMPLED)
+                return 'not_modified'
+            with self.metrics.stage('check'), span('check'):
+                homeworks = homework.check_response(response)
+            if not homeworks:
+                self._advance(tenant, state, response['current_date'])
+                logger.info(
+                    f'{tenant.name}: Статус не изменился', extra=SAMPLED)
+                return 'unchanged'
+            return await self._apply(
+                tenant, state, homeworks, response['current_date'])
+        except CircuitOpenException:
+            logger.info(
+                f'{tenant.name}: Опрос пропущен, API недоступен',
+                extra=SAMPLED)
+            return 'shed'
+        except NotSendingMessageException as error:
+            logger.error(f'{tenant.name}: Сбой в работе программы: {error}')
+            self._forget_response(tenant)
+        except Exception as error:
+            logger.error(f'{tenant.name}: Сбой в работе программы: {error}')
+            if response is not None:
+                self._forget_response(tenant)
+            message = self.errors.record(tenant.name, error)
+            if message is not None:
+                await self.notify(tenant, message)
+        return 'error'
+
+    async def _poll_and_reschedule(self, tenant, cycles):
+        await self.poll(tenant)
+        if self.profiler is not None:
+            self.profiler.cycle_finished()
+        done = self._cycles_done[tenant.name] = (
+            self._cycles_done.get(tenant.name, 0) + 1)
+        if tenant.name not in self.tenants:
+            return
+        if cycles is not None and done >= cycles:
+            self.scheduler.remove(tenant.name)
+            return
+        state = self.states[tenant.name]
+        idle_for = self.scheduler.clock() - state.last_change_at
+        state.interval = self.policy.next_interval(state.last_status, idle_for)
+        self.scheduler.reschedule(tenant.name, state.interval)
+
+    def _track(self, name, coro):
+        """Запускаем опрос аккаунта задачей, которую ждет remove_tenants."""
+        task = asyncio.ensure_future(coro)
+        self._running[name] = task
+        task.add_done_callback(
+            lambda task, name=name: self._task_done(name, task))
+        return task
+
+    async def poll_now(self, tenant):
+        """Опрос вне расписания, например догоняющий.
+
+        Удаление аккаунта дождется этого опроса так же, как опроса
+        по расписанию. Возвращаем итог опроса.
+        """
+        return await self._track(tenant.name, self.poll(tenant))
+
+    def _task_done(self, name, task):
+        # Аккаунт с нулевым интервалом мог уже уйти на следующий опрос.
+        if self._running.get(name) is task:
+            del self._running[name]
+        self._wakeup.set()
+
+    def _start(self):
+        """Готовим пул, диспетчер и очередь, возвращаем фоновые задачи."""
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix='poll')
+        self._wakeup = asyncio.Event()
+        self._cycles_done = {}
+        self.dispatcher = MessageDispatcher(
+            self.bot, self._call, global_rate=self.send_rate,
+            chat_rate=self.chat_rate, clock=self.clock.monotonic,
+            metrics=self.metrics)
+        background = [asyncio.ensure_future(self.dispatcher.run())]
+        if self.commands is not None:
+            background.append(asyncio.ensure_future(
+                self.commands.run(self._reply_sender())))
+        if self.shard is not None:
+            background.append(asyncio.ensure_future(self.shard.run(self)))
+        if self.watcher is not None:
+            background.append(asyncio.ensure_future(self.watcher.run(self)))
+        get_transport().add_listener(self.breaker.observe)
+        self.restore()
+        for name in self.tenants:
+            self.scheduler.add(name)
+        self._running = {}
+        if self.profiler is not None and self.profiler.active:
+            self.profiler.start()
+        return background
+
+    def _reply_sender(self):
+        """Функция отправки ответов на команды.
+
+        При записи трафика ответы помечаются отдельно: воспроизведение
+        не повторяет входящие команды и сверяет только уведомления.
+        """
+        if self.recorder is None:
+            return self.dispatcher.send
+        return self.recorder.wrap_replies(self.dispatcher.send)
+
+    def _stop(self, background):
+        for task in background:
+            task.cancel()
+        get_transport().remove_listener(self.breaker.observe)
+        self._executor.shutdown(wait=False)
+        if self.profiler is not None:
+            # Опрос закончился раньше, чем набралось нужное число итераций.
+            self.profiler.finish()
+        if self.checkpoints is not None:
+            self.checkpoints.flush()
+
+    @contextlib.asynccontextmanager
+    async def started(self):
+        """Пул, диспетчер и фоновые задачи на время блока.
+
+        Внутри блока опросы запускаются вызовом poll(), без
+        планировщика; так, например, воспроизводится запись.
+        """
+        background = self._start()
+        try:
+            yield self
+        finally:
+            self._stop(background)
+
+    async def run(self, cycles=None):
+        """Запускаем опрос всех аккаунтов.
+
+        Аккаунты забираются из очереди планировщика по мере наступления
+        их сроков. Если cycles не задан, опрос идет бесконечно.
+        """
+        # Воркеру шарда или из файла настроек аккаунты могут достаться позже.
+        keep_alive = cycles is None and (
+            self.shard is not None or self.watcher is not None)
+        async with self.started():
+            if self.backfill is not None:
+                await self.backfill.run(self)
+            while len(self.scheduler) or self._running or keep_alive:
+                for name in self.scheduler.pop_due():
+                    self._track(name, self._poll_and_reschedule(
+                        self.tenants[name], cycles))
+                next_due = self.scheduler.next_due()
+                timeout = None
+                if next_due is not None:
+                    timeout = max(0.0, next_due - self.scheduler.clock())
+                if self.checkpoints is not None:
+                    self.checkpoints.maybe_flush()
+                    if self.checkpoints.pending:
+                        timeout = min(
+                            timeout if timeout is not None else math.inf,
+                            self.checkpoints.flush_interval)
+                self._wakeup.clear()
+                # Таймер дешевле wait_for: тот создает задачу на каждом шаге.
+                timer = None
+                if timeout is not None:
+                    timer = asyncio.get_running_loop().call_later(
+                        timeout, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    if timer is not None:
+                        timer.cancel()
@@ -13,3 +13,22 @@ class RequestAPIException(Exception):
     """Логируются ошибки и отпраляются в телеграм."""
 
     pass
+
+
+class CircuitOpenException(RequestAPIException):
+    """Запрос не выполнялся: предохранитель API разомкнут."""
+
+    pass
+
+
+class ResponseSchemaError(TypeError):
+    """Ответ API не соответствует схеме.
+
+    В violations - все найденные нарушения с путями.
+    """
+
+    def __init__(self, violations):
+        """Текст ошибки собирается из всех нарушений."""
+        self.violations = violations
+        super().__init__('; '.join(
+            f'{path or "ответ"}: {message}' for path, message in violations))
@@ -0,0 +1,300 @@
+"""Локальные заглушки API Практикума и Bot API телеграма.
+
+Нужны для бенчмарков и тестов: позволяют прогнать весь конвейер
+опроса без внешней сети, с заданной задержкой, долей ошибок
+и расписанием смены статусов.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = '/api/user_api/homework_statuses/'
+
+
+class TenantTimeline:
+    """Расписание смены статусов работ одного аккаунта.
+
+    Смены происходят в среднем раз в change_interval секунд:
+    новая работа уходит на ревью, работа на ревью получает вердикт,
+    отклоненная работа снова уходит на ревью.
+    """
+
+    def __init__(self, seed, start, change_interval=None, events=()):
+        """Смены статусов: заданные events и случайные с change_interval."""
+        self.random = random.Random(seed)
+        self.change_interval = change_interval
+        self.homeworks = {}
+        self.events = sorted(events)
+        self.next_change = None
+        if change_interval:
+            self.next_change = start + self.random.expovariate(
+                1 / change_interval)
+        self._start = start
+        self._lock = threading.Lock()
+
+    def _set(self, key, status, at):
+        self.homeworks[key] = {
+            'id': key,
+            'homework_name': f'hw{key}.zip',
+            'status': status,
+            'reviewer_comment': '',
+            'lesson_name': f'Спринт {key}',
+            'updated': at,
+        }
+
+    def _random_change(self, at):
+        reviewing = [
+            key for key, item in self.homeworks.items()
+            if item['status'] == 'reviewing']
+        rejected = [
+            key for key, item in self.homeworks.items()
+            if item['status'] == 'rejected']
+        if reviewing:
+            self._set(reviewing[0], self.random.choice(
+                ('approved', 'rejected')), at)
+        elif rejected:
+            self._set(rejected[0], 'reviewing', at)
+        else:
+            self._set(len(self.homeworks) + 1, 'reviewing', at)
+
+    def advance(self, now):
+        """Применяем все смены статусов, наступившие к моменту now."""
+        with self._lock:
+            while self.events and self._start + self.events[0][0] <= now:
+                offset, key, status = self.events.pop(0)
+                self._set(key, status, self._start + offset)
+            while self.next_change is not None and self.next_change <= now:
+                self._random_change(self.next_change)
+                self.next_change += self.random.expovariate(
+                    1 / self.change_interval)
+
+    def updated_since(self, from_date):
+        """Работы, изменившиеся не раньше from_date, от новых к старым."""
+        with self._lock:
+            items = [
+                item for item in self.homeworks.values()
+                if item['updated'] >= from_date]
+        items.sort(key=lambda item: item['updated'], reverse=True)
+        return [{
+            **{key: value for key, value in item.items() if key != 'updated'},
+            'date_updated': datetime.fromtimestamp(
+                item['updated'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        } for item in items]
+
+
+class _FakeServer:
+    """Общая часть заглушек: HTTP-сервер в фоновом потоке."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._server = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """Адрес запущенного сервера."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        raise NotImplementedError
+
+    def start(self, host='127.0.0.1', port=0):
+        """Запускаем сервер в фоновом потоке."""
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name=type(self).__name__,
+            daemon=True).start()
+        return self
+
+    def stop(self):
+        """Останавливаем сервер."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _should_fail(self):
+        """Учитываем запрос и решаем, ответить ли ошибкой."""
+        with self._lock:
+            self.requests += 1
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return fail
+
+
+def _handler(owner, respond):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def _reply(self):
+            if owner.latency:
+                time.sleep(owner.latency)
+            status, payload = respond(self)
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _reply
+        do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class FakePracticumAPI(_FakeServer):
+    """Заглушка эндпоинта homework_statuses.
+
+    Для каждого токена ведется свое расписание TenantTimeline.
+    events - словарь {токен: [(секунды от старта, id работы, статус)]}
+    для заранее заданных смен статусов.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, change_interval=None,
+                 events=None, seed=0):
+        """Заданные смены статусов events - по токенам аккаунтов."""
+        super().__init__(latency, error_rate, seed)
+        self.change_interval = change_interval
+        self.events = events or {}
+        self.started = time.time()
+        self.timelines = {}
+
+    @property
+    def endpoint(self):
+        """Значение для homework.ENDPOINT."""
+        return self.url + API_PATH
+
+    def timeline(self, token):
+        """Расписание аккаунта, создается при первом запросе."""
+        timeline = self.timelines.get(token)
+        if timeline is None:
+            with self._lock:
+                timeline = self.timelines.setdefault(token, TenantTimeline(
+                    f'{self.random.random()}:{token}', self.started,
+                    self.change_interval, self.events.get(token, ())))
+        return timeline
+
+    def _respond(self, request):
+        url = urlparse(request.path)
+        if url.path != API_PATH:
+            return HTTPStatus.NOT_FOUND, {'message': 'Not found'}
+        authorization = request.headers.get('Authorization', '')
+        if not authorization.startswith('OAuth '):
+            return HTTPStatus.UNAUTHORIZED, {
+                'code': 'not_authenticated',
+                'message': 'Учетные данные не были предоставлены.'}
+        if self._should_fail():
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'message': 'Ошибка'}
+        try:
+            from_date = int(float(parse_qs(url.query)['from_date'][0]))
+        except (KeyError, ValueError):
+            return HTTPStatus.BAD_REQUEST, {
+                'code': 'UnknownError',
+                'error': {'error': 'Wrong from_date format'}}
+        now = time.time()
+        timeline = self.timeline(authorization[len('OAuth '):])
+        timeline.advance(now)
+        return HTTPStatus.OK, {
+            'homeworks': timeline.updated_since(from_date),
+            'current_date': int(now),
+        }
+
+    def _make_handler(self):
+        return _handler(self, self._respond)
+
+
+class FakeTelegramAPI(_FakeServer):
+    """Заглушка методов sendMessage и getUpdates Bot API.
+
+    Боту нужно передать base_url=FakeTelegramAPI.base_url.
+    При ошибке sendMessage отвечает 429, как при превышении лимитов.
+    Входящие сообщения для getUpdates добавляются через push_message().
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        """Сообщения копятся в messages, входящие - в updates."""
+        super().__init__(latency, error_rate, seed)
+        self.messages = []
+        self.updates = []
+        self._new_update = threading.Condition(self._lock)
+
+    def push_message(self, chat_id, text):
+        """Входящее сообщение от пользователя."""
+        with self._new_update:
+            update_id = len(self.updates) + 1
+            self.updates.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'text': text,
+                },
+            })
+            self._new_update.notify_all()
+
+    def _get_updates(self, data):
+        offset = int(data.get('offset') or 0)
+        with self._new_update:
+            # Long polling: ждем новых сообщений до timeout секунд.
+            self._new_update.wait_for(
+                lambda: self.updates and self.updates[-1]['update_id']
+                >= offset, timeout=float(data.get('timeout') or 0))
+            result = [
+                update for update in self.updates
+                if update['update_id'] >= offset]
+        return HTTPStatus.OK, {'ok': True, 'result': result}
+
+    @property
+    def base_url(self):
+        """Значение для telegram.Bot(base_url=...)."""
+        return self.url + '/bot'
+
+    def _respond(self, request):
+        length = int(request.headers.get('Content-Length', 0))
+        data = json.loads(request.rfile.read(length) or b'{}')
+        if request.path.endswith('/getUpdates'):
+            return self._get_updates(data)
+        if not request.path.endswith('/sendMessage'):
+            return HTTPStatus.NOT_FOUND, {
+                'ok': False, 'error_code': 404, 'description': 'Not Found'}
+        if self._should_fail():
+            return HTTPStatus.TOO_MANY_REQUESTS, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1}}
+        with self._lock:
+            self.messages.append((data.get('chat_id'), data.get('text')))
+            message_id = len(self.messages)
+        return HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }}
+
+    def _make_handler(self):
+        return _handler(self, self._respond)
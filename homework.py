@@ -1,38 +1,35 @@
 from http import HTTPStatus
+import json
 import os
 import sys
-import time
 import logging
-from logging.handlers import RotatingFileHandler
-from urllib.error import HTTPError
 
-import telegram
-import requests
-from dotenv import load_dotenv
+from cache import NOT_MODIFIED
+from decoder import get_decoder
+from exceptions import (NotSendingMessageException, RequestAPIException,
+                        ResponseSchemaError)
+from records import Homeworks
+from schema import Array, Choice, Int, Object, Str, compile_schema
 
-from exceptions import NotSendingMessageException, RequestAPIException
-
-load_dotenv()
+# telegram, requests, dotenv, транспорт, трассы, список аккаунтов
+# и настройка логов подключаются лениво, при первом использовании
+# или в main(), чтобы импорт был быстрым.
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-handler = RotatingFileHandler(
-    os.getcwd() + '/program.log',
-    maxBytes=50000000,
-    backupCount=5)
-logger.addHandler(handler)
-formatter = logging.Formatter(
-    '%(asctime)s, %(levelname)s,%(funcName)s,\
-                %(lineno)d, %(message)s, %(name)s'
-)
-handler.setFormatter(formatter)
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_TIME = 600
+CHECKPOINT_PATH = os.getenv(
+    'CHECKPOINT_PATH', os.getcwd() + '/checkpoints.sqlite3')
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+# Изменения в .env, TENANTS_FILE и CONFIG_FILE применяются на ходу,
+# см. watcher.ConfigWatcher. Путь к .env находится при запуске.
+ENV_FILE = os.getenv('ENV_FILE')
+# Строки .env при последнем чтении и токен, с которым создан бот.
+_env_values = {}
+_bot_token = None
 
 
 HOMEWORK_VERDICTS = {
@@ -41,15 +38,42 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+# Схема ответа homework_statuses. Choice держит ссылку на
+# HOMEWORK_VERDICTS, а не копию ключей.
+RESPONSE_SCHEMA = Object({
+    'homeworks': Array(Object(
+        {
+            'id': Int(),
+            'homework_name': Str(),
+            'status': Choice(HOMEWORK_VERDICTS),
+        },
+        required=('homework_name', 'status'),
+        soft=('homework_name', 'status'),
+        record=True)),
+    'current_date': Int(),
+}, required=('homeworks', 'current_date'))
+# Компилируется при первой проверке ответа.
+_validate_response = None
+
 
 def send_message(bot, message):
     """Отправка сообщения в чат.
 
     Отправляем заранее сформированное сообщение через чат-бот.
     """
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot, chat_id, message):
+    """Отправка сообщения в конкретный чат.
+
+    Используется движком опроса, у каждого аккаунта свои чаты.
+    """
+    from telegram.error import TelegramError
+
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-    except telegram.error.TelegramError as e:
+        bot.send_message(chat_id, message)
+    except TelegramError as e:
         raise NotSendingMessageException(
             f'Сообщение не отправлено: {message}.',
             f'Ошибка telegram-bot: {e}')
@@ -64,18 +88,47 @@ def get_api_answer(current_timestamp):
     Если статут ответа 200, то отпраляем в качестве
     значения функции словарь из json
     """
+    return request_api_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_api_answer(token, current_timestamp, cache=None):
+    """Запрос к API от имени конкретного аккаунта.
+
+    Токен передаем явно, чтобы один процесс
+    мог опрашивать сразу несколько аккаунтов.
+    Если передан cache, запрос делается условным, и для
+    неизменного ответа возвращается cache.NOT_MODIFIED.
+    """
+    from requests.exceptions import RequestException
+
+    from tracing import span
+    from transport import get_transport
+
+    headers = {'Authorization': f'OAuth {token}'}
+    if cache is not None:
+        headers.update(cache.headers_for(token))
     params = {'from_date': current_timestamp}
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = get_transport().get(
+            ENDPOINT, headers=headers, params=params)
+        if cache is not None:
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                cache.not_modified(token)
+                return NOT_MODIFIED
+            if (response.status_code == HTTPStatus.OK
+                    and cache.store(token, response)):
+                return NOT_MODIFIED
         if response.status_code != HTTPStatus.OK:
-            raise HTTPError('Ошибка при получении ответа с сервера.',
-                            f'Код ответа: {response.status_code}')
-        answer = response.json()
-
-    except requests.exceptions.RequestException as e:
+            raise RequestAPIException(
+                'Ошибка при получении ответа с сервера.',
+                f'Код ответа: {response.status_code}')
+        with span('decode'):
+            answer = get_decoder().decode(response)
+
+    except RequestException as e:
+        # При таймауте или обрыве соединения ответа нет вовсе.
         raise RequestAPIException(
-            'Ошибка при обращении к серверу.'
-            f'Код ответа сервера: {response.status_code}.',
+            'Ошибка при обращении к серверу.',
             f'Ошибка: {e}')
     else:
         logger.info(
@@ -87,27 +140,21 @@ def get_api_answer(current_timestamp):
 def check_response(response):
     """Проверяем ответ от API.
 
-    Проверяем что данные полученные в ответе API корректны:
-        - словарь ответа не пустой
-        - в словаре есть нужные ключи: "homeworks"
-    В случае некорректности логируем ошибки.
+    Ответ проверяется по схеме RESPONSE_SCHEMA за один проход:
+    конверт и все работы сразу. Если ответ негоден, выбрасываем
+    ResponseSchemaError со всеми нарушениями. Работы с неизвестным
+    статусом или без названия остаются в списке: о них сообщит
+    parse_status. Возвращаем список работ (records.Homeworks).
     """
-    if not isinstance(response, dict):
-        raise TypeError(
-            'ответ сервера не является словарем JSON.')
-    if response.get('homeworks') is None:
-        raise KeyError(
-            'Нет ключа "homeworks" в словаре response')
-    if response.get('current_date') is None:
-        raise NotSendingMessageException(
-            'Нет ключа "current_date" в словаре response')
-    if not isinstance(response['homeworks'], list):
-        raise TypeError(
-            'Значение словаря "homeworks" не является списком.')
-    if not isinstance(response['current_date'], int):
-        raise KeyError(
-            'Значение словаря "current_date" не является целым числом.')
-    return response['homeworks']
+    global _validate_response
+    if _validate_response is None:
+        _validate_response = compile_schema(RESPONSE_SCHEMA)
+    rows, errors, warnings = _validate_response(response)
+    if errors:
+        raise ResponseSchemaError(errors)
+    for path, message in warnings:
+        logger.warning(f'Ответ API: {path}: {message}')
+    return Homeworks(response['homeworks'], rows)
 
 
 def parse_status(homework):
@@ -131,52 +178,282 @@ def parse_status(homework):
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def load_environment():
+    """Подгружаем .env и перечитываем настройки из окружения.
+
+    Вызывается при запуске бота, а не при импорте модуля.
+    """
+    global ENV_FILE, _env_values
+    from dotenv import dotenv_values, find_dotenv, load_dotenv
+
+    ENV_FILE = ENV_FILE or find_dotenv()
+    if ENV_FILE:
+        load_dotenv(ENV_FILE)
+        _env_values = dotenv_values(ENV_FILE)
+    _read_environment()
+    load_settings()
+
+
+def _read_env_file():
+    """Строки .env и те из них, что изменились с прошлого чтения.
+
+    Применяем только измененные строки: переменные, заданные
+    в окружении процесса, .env при запуске не перекрывает,
+    и при перечитывании это не меняется.
+    """
+    from dotenv import dotenv_values
+
+    values = dotenv_values(ENV_FILE) if ENV_FILE else {}
+    changed = {
+        key: value for key, value in values.items()
+        if value is not None and _env_values.get(key) != value}
+    return values, changed
+
+
+def _apply_env_file(values, changed):
+    global _env_values
+    os.environ.update(changed)
+    _env_values = values
+    _read_environment()
+
+
+def _read_environment():
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, CHECKPOINT_PATH
+    PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+    CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', CHECKPOINT_PATH)
+
+
+def read_settings(config_file):
+    """Читаем retry_time и homework_verdicts из CONFIG_FILE.
+
+    Файл - JSON-объект с необязательными ключами "retry_time"
+    и "homework_verdicts". Возвращаем пару (retry_time, verdicts),
+    для отсутствующих ключей - текущие значения. Глобальные
+    настройки не меняются, см. apply_settings.
+    """
+    if not config_file:
+        return RETRY_TIME, HOMEWORK_VERDICTS
+    with open(config_file, encoding='utf-8') as file:
+        settings = json.load(file)
+    if not isinstance(settings, dict):
+        raise TypeError(f'Файл {config_file} должен содержать объект.')
+    retry_time = settings.get('retry_time', RETRY_TIME)
+    if not isinstance(retry_time, (int, float)) or retry_time <= 0:
+        raise ValueError(f'Некорректный retry_time: {retry_time!r}')
+    verdicts = settings.get('homework_verdicts', HOMEWORK_VERDICTS)
+    if not isinstance(verdicts, dict) or not all(
+            isinstance(text, str) for text in verdicts.values()):
+        raise TypeError('homework_verdicts должен быть словарем строк.')
+    return retry_time, verdicts
+
+
+def apply_settings(retry_time, verdicts):
+    """Меняем RETRY_TIME и HOMEWORK_VERDICTS.
+
+    HOMEWORK_VERDICTS меняется на месте: на этот словарь ссылается
+    схема ответа. Новые вердикты добавляются раньше, чем удаляются
+    старые, поэтому словарь ни в какой момент не бывает пустым.
+    """
+    global RETRY_TIME
+    RETRY_TIME = retry_time
+    if verdicts is not HOMEWORK_VERDICTS:
+        HOMEWORK_VERDICTS.update(verdicts)
+        for status in set(HOMEWORK_VERDICTS) - set(verdicts):
+            del HOMEWORK_VERDICTS[status]
+
+
+def load_settings():
+    """Применяем настройки из CONFIG_FILE, если он задан."""
+    apply_settings(*read_settings(os.getenv('CONFIG_FILE')))
+
+
+def load_config():
+    """Читаем .env, CONFIG_FILE и список аккаунтов, ничего не меняя.
+
+    Вызывается из ConfigWatcher в пуле потоков при изменении файлов
+    настроек. Окружение, RETRY_TIME и HOMEWORK_VERDICTS, которые
+    читают опросы, меняет Config.apply уже в потоке цикла событий.
+    """
+    from watcher import Config
+
+    values, changed = _read_env_file()
+    env = dict(os.environ, **changed)
+    retry_time, verdicts = read_settings(env.get('CONFIG_FILE'))
+    if _bot_token is not None and env.get('TELEGRAM_TOKEN') != _bot_token:
+        logger.warning('TELEGRAM_TOKEN изменится только после перезапуска.')
+
+    def apply():
+        _apply_env_file(values, changed)
+        apply_settings(retry_time, verdicts)
+
+    return Config(read_tenants(env), retry_time, apply)
+
+
+def configure_logging():
+    """Запускаем фоновую запись логов в program.log."""
+    from log_pipeline import setup_logging
+
+    setup_logging(
+        os.getcwd() + '/program.log',
+        json_output=os.getenv('LOG_JSON') == '1',
+        sample_rates={
+            logging.INFO: float(os.getenv('LOG_SAMPLE_RATE', 0.01))})
+
+
 def check_tokens():
     """Проверяем переменные в окружении."""
     env_tokens = (PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
     return all(env_tokens)
 
 
+def read_tenants(env=None):
+    """Аккаунты для опроса.
+
+    Если задана переменная TENANTS_FILE, опрашиваем все аккаунты
+    из файла, иначе единственный аккаунт из переменных окружения.
+    env - окружение, по умолчанию os.environ. Если переменных
+    не хватает, выбрасываем ValueError.
+    """
+    from tenants import Tenant, load_tenants
+
+    env = os.environ if env is None else env
+    tenants_file = env.get('TENANTS_FILE')
+    if tenants_file:
+        if not env.get('TELEGRAM_TOKEN'):
+            raise ValueError('Отсутствуют переменные окружения')
+        return load_tenants(tenants_file)
+    practicum_token, telegram_token, chat_id = (
+        env.get(name) for name in
+        ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID'))
+    if not (practicum_token and telegram_token and chat_id):
+        raise ValueError('Отсутствуют переменные окружения')
+    return [Tenant('default', practicum_token, [chat_id])]
+
+
+def get_tenants():
+    """Аккаунты для опроса; без нужных переменных завершаем работу."""
+    try:
+        return read_tenants()
+    except ValueError as error:
+        logging.critical(str(error))
+        raise sys.exit(1)
+
+
+def health_max_age():
+    """Сколько секунд /healthz терпит без успешного опроса.
+
+    Берем HEALTH_MAX_AGE, а по умолчанию самый длинный интервал
+    опроса без изменений и еще RETRY_TIME на опоздание планировщика
+    и сам запрос.
+    """
+    from intervals import MAX_INTERVAL_FACTOR
+
+    default = (MAX_INTERVAL_FACTOR + 1) * RETRY_TIME
+    return float(os.getenv('HEALTH_MAX_AGE', default))
+
+
+def build_engine(tenants, bot, checkpoints):
+    """Собираем движок опроса по настройкам из окружения."""
+    from cache import ResponseCache
+    from engine import PollingEngine
+    from incidents import SUPPRESS_WINDOW, ErrorSuppressor
+    from tracing import CycleProfiler, Tracer
+
+    tracer = Tracer(
+        sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', 0)),
+        path=os.getenv('TRACE_FILE'))
+    profiler = None
+    if os.getenv('PROFILE_MODE'):
+        profiler = CycleProfiler(
+            os.getenv('PROFILE_MODE'),
+            cycles=int(os.getenv('PROFILE_CYCLES', 100)),
+            path=os.getenv('PROFILE_PATH', os.getcwd() + '/profile.out'))
+    shard = None
+    if os.getenv('SHARD_DB'):
+        from sharding import LeaseRegistry, ShardCoordinator
+
+        # Аккаунты достанутся воркеру по арендам.
+        shard = ShardCoordinator(
+            LeaseRegistry(os.getenv('SHARD_DB'), os.getenv('WORKER_ID')),
+            tenants)
+        tenants = []
+    engine = PollingEngine(
+        tenants, bot, retry_time=RETRY_TIME, checkpoints=checkpoints,
+        cache=ResponseCache(), tracer=tracer, profiler=profiler,
+        errors=ErrorSuppressor(
+            window=float(os.getenv('ERROR_WINDOW', SUPPRESS_WINDOW))))
+    engine.shard = shard
+    from backfill import BACKFILL_DEADLINE, BACKFILL_PARALLEL, Backfill
+
+    backfill_deadline = float(
+        os.getenv('BACKFILL_DEADLINE', BACKFILL_DEADLINE))
+    if backfill_deadline > 0:
+        engine.backfill = Backfill(
+            deadline=backfill_deadline,
+            parallel=int(os.getenv('BACKFILL_PARALLEL', BACKFILL_PARALLEL)))
+    if os.getenv('RECORD_FILE'):
+        from recording import Recorder
+
+        engine.recorder = Recorder(os.getenv('RECORD_FILE'))
+        engine.bot = engine.recorder.wrap_bot(bot)
+    from watcher import RELOAD_INTERVAL, ConfigWatcher
+
+    reload_interval = float(os.getenv('RELOAD_INTERVAL', RELOAD_INTERVAL))
+    if reload_interval > 0:
+        engine.watcher = ConfigWatcher(
+            [ENV_FILE, os.getenv('TENANTS_FILE'), os.getenv('CONFIG_FILE')],
+            load_config, interval=reload_interval)
+    # getUpdates может вызывать только один процесс на токен бота,
+    # а воркер шарда знает лишь арендованные им аккаунты.
+    if shard is None and os.getenv('BOT_COMMANDS', '1') == '1':
+        from commands import CommandResponder, UpdatePoller
+
+        engine.commands = UpdatePoller(bot, CommandResponder(engine))
+    return engine
+
+
 def main():
     """Основная логика работы бота."""
-    if not check_tokens():
-        logging.critical("Отсутствуют переменные окружения")
-        raise sys.exit(1)
+    load_environment()
+    configure_logging()
+
+    import asyncio
 
+    import telegram
+
+    from checkpoint import CheckpointStore
+
+    global _bot_token
+    tenants = get_tenants()
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    previouse_status = ''
-
-    while True:
-
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            current_timestamp = response['current_date']
-            if homeworks:
-                current_status = parse_status(homeworks[0])
-                if current_status != previouse_status:
-                    try:
-                        send_message(bot, current_status)
-
-                        previouse_status = current_status
-                    except NotSendingMessageException as e:
-                        logger.error(f'Сообщение не отправлено, ошибка : {e}')
-                else:
-                    logger.info('Статус не изменился')
-
-            else:
-                send_message(bot, 'Статус домашней работы не изменился!')
-
-        except NotSendingMessageException as error:
-            logger.error(f'Сбой в работе программы: {error}')
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.error(f'Сбой в работе программы: {error}')
-            send_message(bot, message)
-        finally:
-            time.sleep(RETRY_TIME)
+    _bot_token = TELEGRAM_TOKEN
+    checkpoints = CheckpointStore(CHECKPOINT_PATH)
+    engine = build_engine(tenants, bot, checkpoints)
+    metrics_server = None
+    if os.getenv('METRICS_PORT'):
+        from metrics import MetricsServer
+
+        metrics_server = MetricsServer(
+            engine.metrics, max_age=health_max_age(),
+            host=os.getenv('METRICS_HOST', '127.0.0.1'),
+            port=int(os.getenv('METRICS_PORT'))).start()
+    try:
+        asyncio.run(engine.run())
+    finally:
+        checkpoints.close()
+        if engine.recorder is not None:
+            engine.recorder.close()
+        if engine.shard is not None:
+            # Курсоры уже на диске, аккаунты можно сразу отдать другим.
+            engine.shard.registry.leave()
+            engine.shard.registry.close()
+        if metrics_server is not None:
+            metrics_server.stop()
 
 
 if __name__ == '__main__':
+    # Движок импортирует модуль как homework, не создаем вторую копию.
+    sys.modules.setdefault('homework', sys.modules[__name__])
     main()
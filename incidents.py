@@ -0,0 +1,88 @@
+import re
+import time
+
+# Через сколько секунд повторяющейся ошибки отправляется сводка.
+SUPPRESS_WINDOW = 3600
+
+# Длинные числа и адреса объектов меняются от раза к разу
+# (метки времени, id), но ошибку не меняют.
+_VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d{5,}')
+
+
+def fingerprint(error):
+    """Отпечаток ошибки: класс и сообщение без изменчивых чисел."""
+    return f'{type(error).__name__}: {_VOLATILE.sub("#", str(error))}'
+
+
+def _minutes(seconds):
+    return f'{max(1, round(seconds / 60))} мин.'
+
+
+class Incident:
+    """Одна ошибка аккаунта, повторяющаяся от опроса к опросу."""
+
+    __slots__ = ('message', 'started', 'window_started', 'repeats')
+
+    def __init__(self, message, now):
+        """Инцидент с первой ошибкой в момент now."""
+        self.message = message
+        self.started = now
+        self.window_started = now
+        self.repeats = 0
+
+
+class ErrorSuppressor:
+    """Отправляет сообщение об ошибке один раз вместо каждого опроса.
+
+    Первая ошибка с новым отпечатком объявляется сразу, повторы
+    только считаются. Раз в window секунд, пока ошибка держится,
+    и после первого успешного опроса отправляется сводка.
+    """
+
+    def __init__(self, window=SUPPRESS_WINDOW, clock=time.monotonic):
+        """Повторы ошибки подавляются window секунд."""
+        self.window = window
+        self.clock = clock
+        self.suppressed = 0
+        self._incidents = {}
+
+    def __len__(self):
+        """Число открытых инцидентов по всем аккаунтам."""
+        return sum(len(incidents) for incidents in self._incidents.values())
+
+    def record(self, key, error):
+        """Учитываем ошибку аккаунта key.
+
+        Возвращаем текст для отправки или None, если ошибка уже
+        объявлена и окно еще не истекло.
+        """
+        now = self.clock()
+        incidents = self._incidents.setdefault(key, {})
+        mark = fingerprint(error)
+        incident = incidents.get(mark)
+        if incident is None:
+            incidents[mark] = Incident(str(error), now)
+            return f'Сбой в работе программы: {error}'
+        incident.repeats += 1
+        if now - incident.window_started < self.window:
+            self.suppressed += 1
+            return None
+        message = (
+            f'Сбой в работе программы продолжается: {incident.message}. '
+            f'Повторов за {_minutes(now - incident.window_started)}: '
+            f'{incident.repeats}')
+        incident.window_started = now
+        incident.repeats = 0
+        return message
+
+    def resolve(self, key):
+        """Опрос аккаунта прошел успешно, возвращаем сводки по ошибкам."""
+        incidents = self._incidents.pop(key, None)
+        if not incidents:
+            return []
+        now = self.clock()
+        return [
+            f'Сбой устранен: {incident.message}. '
+            f'Длился {_minutes(now - incident.started)}, '
+            f'повторов после последнего сообщения: {incident.repeats}'
+            for incident in incidents.values()]
@@ -0,0 +1,79 @@
+import homework
+
+# Статусы, при которых ревью идет прямо сейчас и ответ может прийти скоро.
+ACTIVE_STATUSES = frozenset({'reviewing'})
+
+# Доля времени простоя, на которую увеличивается интервал опроса.
+IDLE_RATIO = 0.5
+
+# Во сколько раз интервал простаивающего аккаунта может превысить
+# базовый. Ревью начинается без предупреждения, и если бот его
+# не застал, вердикт замечается только на следующем опросе. При
+# базовых 10 минутах предел - полчаса, не дольше самых коротких
+# ревью, поэтому вердикты приходят не позже, чем при опросе
+# с постоянным интервалом (см. benchmarks/bench_intervals.py).
+MAX_INTERVAL_FACTOR = 3
+
+
+class AdaptivePolicy:
+    """Интервал опроса в зависимости от статуса и давности изменений.
+
+    Работы на ревью опрашиваются с минимальным интервалом. Чем дольше
+    у аккаунта ничего не менялось, тем реже он опрашивается, но не
+    реже max_interval. Любая смена статуса сбрасывает отсчет простоя.
+    Для только что запущенных аккаунтов используется базовый интервал.
+    """
+
+    def __init__(self, base_interval=homework.RETRY_TIME, min_interval=None,
+                 max_interval=None, idle_ratio=IDLE_RATIO,
+                 active_statuses=ACTIVE_STATUSES):
+        """Границы интервала по умолчанию зависят от базового.
+
+        Без явных значений min_interval - пятая часть базового
+        интервала, max_interval - MAX_INTERVAL_FACTOR базовых.
+        """
+        self.base_interval = base_interval
+        self.min_interval = (
+            base_interval / 5 if min_interval is None else min_interval)
+        self.max_interval = (
+            base_interval * MAX_INTERVAL_FACTOR if max_interval is None
+            else max_interval)
+        if self.min_interval > self.max_interval:
+            raise ValueError(
+                'min_interval не может быть больше max_interval.')
+        self.idle_ratio = idle_ratio
+        self.active_statuses = active_statuses
+
+    def rescaled(self, base_interval):
+        """Та же политика для другого базового интервала.
+
+        Границы меняются в той же пропорции, что и базовый интервал,
+        так что заданные явно min_interval и max_interval сохраняют
+        свое отношение к нему. От нулевого базового интервала
+        пропорции нет, тогда границы берутся по умолчанию.
+        """
+        if not self.base_interval:
+            return AdaptivePolicy(
+                base_interval, idle_ratio=self.idle_ratio,
+                active_statuses=self.active_statuses)
+        scale = base_interval / self.base_interval
+        return AdaptivePolicy(
+            base_interval, self.min_interval * scale,
+            self.max_interval * scale, self.idle_ratio, self.active_statuses)
+
+    def clamp(self, interval):
+        """Ограничиваем интервал заданными границами."""
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def next_interval(self, last_status, idle_for):
+        """Интервал до следующего опроса в секундах.
+
+        last_status - последний известный статус работы аккаунта,
+        idle_for - сколько секунд назад менялся статус или None,
+        если изменений еще не было.
+        """
+        if last_status in self.active_statuses:
+            return self.min_interval
+        if idle_for is None:
+            return self.clamp(self.base_interval)
+        return self.clamp(max(self.base_interval, idle_for * self.idle_ratio))
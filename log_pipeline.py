@@ -0,0 +1,127 @@
+import atexit
+import gzip
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+MAX_BYTES = 50000000
+BACKUP_COUNT = 5
+QUEUE_SIZE = 100000
+LOG_FORMAT = (
+    '%(asctime)s, %(levelname)s,%(funcName)s,'
+    '%(lineno)d, %(message)s, %(name)s')
+
+_listener = None
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только часть однотипных записей.
+
+    Записи, помеченные extra={'sampled': True}, пропускаются с долей
+    rates[level] (каждая N-я запись). Остальные записи не трогаем.
+    """
+
+    def __init__(self, rates):
+        """Доли записей, попадающих в лог, по уровням берем из rates."""
+        super().__init__()
+        self.every = {
+            level: max(1, round(1 / rate)) for level, rate in rates.items()
+            if rate > 0}
+        self.muted = {level for level, rate in rates.items() if rate <= 0}
+        self._counters = {level: itertools.count() for level in self.every}
+
+    def filter(self, record):
+        """Решаем, пропускать ли запись."""
+        if not getattr(record, 'sampled', False):
+            return True
+        if record.levelno in self.muted:
+            return False
+        every = self.every.get(record.levelno)
+        if every is None:
+            return True
+        return next(self._counters[record.levelno]) % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись в одну строку JSON."""
+
+    def format(self, record):
+        """Собираем словарь полей записи."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'name': record.name,
+            'func': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _compress(path):
+    with open(path, 'rb') as source, gzip.open(path[:-4], 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.remove(path)
+
+
+def gzip_rotator(source, dest):
+    """Переименовываем файл и сжимаем его в отдельном потоке."""
+    temporary = dest + '.tmp'
+    os.rename(source, temporary)
+    threading.Thread(
+        target=_compress, args=(temporary,), name='log-gzip',
+        daemon=True).start()
+
+
+def make_file_handler(path, json_output=False, compress=True):
+    """Файловый обработчик с ротацией и сжатием старых файлов."""
+    handler = RotatingFileHandler(
+        path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+        encoding='utf-8')
+    if compress:
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = gzip_rotator
+    handler.setFormatter(
+        JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def setup_logging(path, level=logging.INFO, json_output=False,
+                  sample_rates=None):
+    """Настраиваем запись логов через очередь и фоновый поток.
+
+    В потоке опроса запись только кладется в очередь, файловый вывод,
+    ротация и сжатие выполняются в фоне. Повторный вызов ничего
+    не делает.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    log_queue = queue.Queue(QUEUE_SIZE)
+    queue_handler = QueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+    _listener = QueueListener(
+        log_queue, make_file_handler(path, json_output),
+        respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Дописываем очередь и останавливаем фоновый поток."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
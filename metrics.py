@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Границы корзин гистограммы длительностей, в секундах.
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+    10.0, 30.0)
+# Сколько наблюдений копится до свертки в корзины.
+FOLD_THRESHOLD = 10000
+PREFIX = 'homework_bot'
+
+
+class Metrics:
+    """Счетчики и гистограммы этапов опроса.
+
+    Наблюдения записываются в deque без блокировок: append атомарен
+    в CPython. В корзины гистограмм они сворачиваются при выдаче
+    /metrics или когда накопилось FOLD_THRESHOLD наблюдений.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """Верхние границы корзин гистограмм buckets - в секундах."""
+        self.buckets = buckets
+        self._observations = deque()
+        self._histograms = {}
+        self._gauges = {}
+        self._sources = {}
+        self._fold_lock = threading.Lock()
+        self.last_success = None
+
+    def observe(self, stage, outcome, seconds):
+        """Записываем длительность этапа stage с результатом outcome."""
+        self._observations.append((stage, outcome, seconds))
+        if (len(self._observations) > FOLD_THRESHOLD
+                and self._fold_lock.acquire(blocking=False)):
+            try:
+                self._fold()
+            finally:
+                self._fold_lock.release()
+
+    @contextmanager
+    def stage(self, stage):
+        """Замеряем блок кода, outcome - ok или error по исключению."""
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.observe(stage, outcome, time.perf_counter() - started)
+
+    def poll_succeeded(self):
+        """Отмечаем время последнего успешного опроса."""
+        self.last_success = time.time()
+
+    def set_source(self, source, histograms, last_success=None):
+        """Гистограммы другого процесса, полученные через snapshot().
+
+        Каждый источник присылает накопленные значения целиком,
+        при выдаче они складываются с собственными. Последние
+        значения завершившегося источника продолжают учитываться.
+        """
+        with self._fold_lock:
+            self._sources[source] = histograms
+        if last_success is not None:
+            self.last_success = max(self.last_success or 0, last_success)
+
+    def add_gauge(self, name, help_text, getter):
+        """Показатель, значение которого читается при выдаче метрик."""
+        self._gauges[name] = (help_text, getter)
+
+    def _fold(self):
+        while True:
+            try:
+                stage, outcome, seconds = self._observations.popleft()
+            except IndexError:
+                return
+            histogram = self._histograms.get((stage, outcome))
+            if histogram is None:
+                histogram = self._histograms[(stage, outcome)] = [
+                    [0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+
+    def snapshot(self):
+        """Свернутые гистограммы: {(stage, outcome): (корзины, сумма)}."""
+        with self._fold_lock:
+            self._fold()
+            merged = {}
+            for histograms in (self._histograms, *self._sources.values()):
+                _merge(merged, histograms)
+            return merged
+
+    def render(self):
+        """Текст в формате Prometheus."""
+        name = f'{PREFIX}_stage_duration_seconds'
+        lines = [
+            f'# HELP {name} Длительность этапов опроса.',
+            f'# TYPE {name} histogram',
+        ]
+        for (stage, outcome), (counts, total) in sorted(
+                self.snapshot().items()):
+            labels = f'stage="{stage}",outcome="{outcome}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {total}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        for gauge, (help_text, getter) in sorted(self._gauges.items()):
+            lines.append(f'# HELP {PREFIX}_{gauge} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{gauge} gauge')
+            lines.append(f'{PREFIX}_{gauge} {getter()}')
+        if self.last_success is not None:
+            lines.append(
+                f'# TYPE {PREFIX}_last_success_timestamp_seconds gauge')
+            lines.append(
+                f'{PREFIX}_last_success_timestamp_seconds {self.last_success}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(into, histograms):
+    for key, (counts, total) in histograms.items():
+        if key not in into:
+            into[key] = (list(counts), total)
+            continue
+        merged_counts, merged_total = into[key]
+        into[key] = (
+            [a + b for a, b in zip(merged_counts, counts)],
+            merged_total + total)
+
+
+class MetricsServer:
+    """HTTP-сервер с /metrics и /healthz в фоновом потоке.
+
+    /healthz отвечает 200, если последний успешный опрос был
+    не раньше max_age секунд назад, и 503 в противном случае.
+    """
+
+    def __init__(self, metrics, max_age, host='127.0.0.1', port=9100):
+        """Сервер слушает host:port, запускается в start()."""
+        self.metrics = metrics
+        self.max_age = max_age
+        self.started = time.time()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def port(self):
+        """Порт, на котором слушает сервер."""
+        return self._server.server_address[1]
+
+    def healthy(self):
+        """Достаточно ли свежим был последний успешный опрос."""
+        last = self.metrics.last_success
+        if last is None:
+            # Сразу после старта даем время на первый опрос.
+            last = self.started
+        return time.time() - last <= self.max_age
+
+    def _handler(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Отдает метрики и состояние здоровья."""
+
+            def do_GET(self):
+                """Обрабатываем /metrics и /healthz."""
+                if self.path == '/metrics':
+                    status = HTTPStatus.OK
+                    body = owner.metrics.render()
+                elif self.path == '/healthz':
+                    healthy = owner.healthy()
+                    status = (HTTPStatus.OK if healthy
+                              else HTTPStatus.SERVICE_UNAVAILABLE)
+                    body = 'ok\n' if healthy else 'stale\n'
+                else:
+                    status = HTTPStatus.NOT_FOUND
+                    body = 'not found\n'
+                data = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                """Не пишем access-лог."""
+
+        return Handler
+
+    def start(self):
+        """Запускаем сервер."""
+        threading.Thread(
+            target=self._server.serve_forever, name='metrics',
+            daemon=True).start()
+        return self
+
+    def stop(self):
+        """Останавливаем сервер."""
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,287 @@
+"""Запись трафика бота и воспроизведение записи.
+
+Recorder дописывает в NDJSON-файл по строке на событие:
+    {"t": ..., "type": "tenant", "tenant": имя, "chat_ids": [...]}
+    {"t": ..., "type": "api", "tenant": имя, "from_date": ...,
+     "answer": {...} | "not_modified": true | "error": класс, "args": [...]}
+    {"t": ..., "type": "send", "chat_id": ..., "text": ..., "ok": true}
+    {"t": ..., "type": "reply", "chat_id": ..., "text": ...}
+Токены в запись не попадают, аккаунт определяется по имени. reply -
+ответ на команду из чата, поставленный в очередь отправки; в send
+он может уйти склеенным с уведомлениями.
+
+Replayer прогоняет записанные ответы API через тот же движок
+опроса в записанном порядке, в реальном темпе (speed=1) или
+так быстро, как получится (speed=None), и сравнивает отправленные
+сообщения с записанными. Склеивание сообщений диспетчером зависит
+от темпа, а сообщения аккаунтов с общим чатом при записи
+перемешиваются параллельными опросами, поэтому сравниваются наборы
+отдельных сообщений в каждом чате. Входящие команды не
+воспроизводятся, поэтому ответы на них (события reply) из сверки
+исключаются.
+
+Запуск: python recording.py traffic.ndjson --speed 1
+"""
+import argparse
+import asyncio
+import builtins
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+import exceptions
+from cache import NOT_MODIFIED
+from dispatcher import SEPARATOR
+
+ReplayResult = namedtuple(
+    'ReplayResult', ['polls', 'elapsed', 'expected', 'actual'])
+
+
+class Recorder:
+    """Дописывает события в NDJSON-файл, из любого потока."""
+
+    def __init__(self, path, clock=time.time):
+        """Файл path открывается на дозапись."""
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tenants = set()
+        # Построчная буферизация: каждая строка сразу уходит в файл.
+        self._file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def _write(self, event):
+        event['t'] = self.clock()
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def api(self, tenant, from_date, answer=None, error=None):
+        """Ответ API (или ошибка запроса) для аккаунта."""
+        if tenant.name not in self._tenants:
+            self._tenants.add(tenant.name)
+            self._write({
+                'type': 'tenant', 'tenant': tenant.name,
+                'chat_ids': list(tenant.chat_ids)})
+        event = {'type': 'api', 'tenant': tenant.name, 'from_date': from_date}
+        if error is not None:
+            event['error'] = type(error).__name__
+            event['args'] = [str(arg) for arg in error.args]
+        elif answer is NOT_MODIFIED:
+            event['not_modified'] = True
+        else:
+            event['answer'] = answer
+        self._write(event)
+
+    def send(self, chat_id, text, ok=True):
+        """Вызов send_message и его итог."""
+        self._write({'type': 'send', 'chat_id': chat_id, 'text': text,
+                     'ok': ok})
+
+    def reply(self, chat_id, text):
+        """Ответ на команду, поставленный в очередь отправки."""
+        self._write({'type': 'reply', 'chat_id': chat_id, 'text': text})
+
+    def wrap_replies(self, send):
+        """Функция отправки, которая помечает ответы на команды."""
+        async def send_reply(chat_id, text):
+            self.reply(chat_id, text)
+            return await send(chat_id, text)
+
+        return send_reply
+
+    def wrap_bot(self, bot):
+        """Бот, вызовы send_message которого попадают в запись."""
+        return RecordingBot(bot, self)
+
+    def close(self):
+        """Закрываем файл записи."""
+        with self._lock:
+            self._file.close()
+
+
+class RecordingBot:
+    """Обертка над telegram.Bot, записывающая отправку сообщений."""
+
+    def __init__(self, bot, recorder):
+        """Отправки bot записываются в recorder."""
+        self._bot = bot
+        self._recorder = recorder
+
+    def send_message(self, chat_id, text, *args, **kwargs):
+        """Отправляем сообщение и записываем итог."""
+        try:
+            result = self._bot.send_message(chat_id, text, *args, **kwargs)
+        except Exception:
+            self._recorder.send(chat_id, text, ok=False)
+            raise
+        self._recorder.send(chat_id, text)
+        return result
+
+    def __getattr__(self, name):
+        """Остальные методы берем у настоящего бота."""
+        return getattr(self._bot, name)
+
+
+def read_events(path):
+    """События записи по порядку."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def split_messages(sends):
+    """Отдельные сообщения по чатам из вызовов send_message.
+
+    Сообщения каждого чата отсортированы, см. описание модуля.
+    """
+    chats = {}
+    for chat_id, text in sends:
+        chats.setdefault(str(chat_id), []).extend(text.split(SEPARATOR))
+    return {chat: sorted(messages) for chat, messages in chats.items()}
+
+
+def _error(event):
+    """Исключение того же класса и с тем же текстом, что в записи."""
+    name = event['error']
+    cls = getattr(exceptions, name, None) or getattr(builtins, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Exception)):
+        cls = type(name, (Exception,), {})
+    return cls(*event['args'])
+
+
+class ReplayBot:
+    """Бот для воспроизведения: запоминает сообщения.
+
+    Сообщения, которые при записи не удалось отправить, и сейчас
+    завершаются ошибкой телеграма.
+    """
+
+    def __init__(self, failed=()):
+        """Отправка пар (чат, текст) из failed завершится ошибкой."""
+        self.sent = []
+        self._failed = Counter(failed)
+
+    def send_message(self, chat_id, text):
+        """Отправка или записанная ошибка отправки."""
+        from telegram.error import TelegramError
+
+        parts = [(str(chat_id), part) for part in text.split(SEPARATOR)]
+        if any(self._failed[part] > 0 for part in parts):
+            self._failed.subtract(parts)
+            raise TelegramError('Ошибка из записи')
+        self.sent.append((chat_id, text))
+
+
+class Replayer:
+    """Воспроизведение записи через PollingEngine.
+
+    Опросы идут по одному в записанном порядке ответов API, поэтому
+    сообщения каждого аккаунта идут в том же порядке. Часы
+    ErrorSuppressor показывают записанное время, поэтому повторы
+    ошибок подавляются так же, как при записи.
+    """
+
+    def __init__(self, path, speed=None):
+        """Без speed запись прогоняется без пауз."""
+        self.events = read_events(path)
+        self.speed = speed
+        self.now = self.events[0]['t'] if self.events else 0.0
+        self._event = None
+
+    def _request(self, token, current_timestamp, cache=None):
+        event = self._event
+        if 'error' in event:
+            raise _error(event)
+        if event.get('not_modified'):
+            return NOT_MODIFIED
+        return event['answer']
+
+    def expected(self):
+        """Уведомления по чатам, доставленные при записи.
+
+        Ответы на команды вычитаются из отправленных сообщений.
+        """
+        chats = split_messages(
+            (event['chat_id'], event['text']) for event in self.events
+            if event['type'] == 'send' and event['ok'])
+        replies = {}
+        for event in self.events:
+            if event['type'] == 'reply':
+                replies.setdefault(str(event['chat_id']), Counter())[
+                    event['text']] += 1
+        expected = {}
+        for chat, messages in chats.items():
+            kept = Counter(messages) - replies.get(chat, Counter())
+            if kept:
+                expected[chat] = sorted(kept.elements())
+        return expected
+
+    def build_engine(self, bot):
+        """Движок без кэша, планировщика и лимитов отправки."""
+        from engine import PollingEngine
+        from incidents import ErrorSuppressor
+        from tenants import Tenant
+
+        tenants = [
+            Tenant(event['tenant'], event['tenant'], event['chat_ids'])
+            for event in self.events if event['type'] == 'tenant']
+        engine = PollingEngine(
+            tenants, bot, errors=ErrorSuppressor(clock=lambda: self.now),
+            send_rate=math.inf, chat_rate=math.inf)
+        engine.request = self._request
+        return engine
+
+    async def run(self):
+        """Воспроизводим запись, возвращаем ReplayResult."""
+        failed = [
+            (str(event['chat_id']), part) for event in self.events
+            if event['type'] == 'send' and not event['ok']
+            for part in event['text'].split(SEPARATOR)]
+        bot = ReplayBot(failed)
+        engine = self.build_engine(bot)
+        polls = 0
+        first = self.now
+        started = time.perf_counter()
+        async with engine.started():
+            for event in self.events:
+                if event['type'] != 'api':
+                    continue
+                if self.speed:
+                    # Ждем момента события по записанному времени.
+                    delay = (event['t'] - first) / self.speed - (
+                        time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                self.now = event['t']
+                self._event = event
+                await engine.poll(engine.tenants[event['tenant']])
+                polls += 1
+        return ReplayResult(
+            polls, time.perf_counter() - started,
+            self.expected(), split_messages(bot.sent))
+
+
+def main():
+    """Воспроизводим запись и сравниваем сообщения."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    parser.add_argument(
+        '--speed', type=float, default=None,
+        help='1 - в реальном темпе; по умолчанию без пауз')
+    args = parser.parse_args()
+    result = asyncio.run(Replayer(args.path, args.speed).run())
+    print(f'polls: {result.polls}, {result.elapsed:.2f} s, '
+          f'{result.polls / max(result.elapsed, 1e-9):.0f} polls/s')
+    if result.actual != result.expected:
+        for chat in sorted(set(result.expected) | set(result.actual)):
+            if result.expected.get(chat) != result.actual.get(chat):
+                print(f'чат {chat}: ожидалось {result.expected.get(chat)}, '
+                      f'получено {result.actual.get(chat)}')
+        sys.exit(1)
+    print('сообщения совпадают с записью')
+
+
+if __name__ == '__main__':
+    main()
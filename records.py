@@ -0,0 +1,82 @@
+"""Компактное представление статусов и записей о работах.
+
+Статус работы хранится не строкой из ответа API, а маленьким
+целым кодом: строки из JSON у каждого ответа свои, а коды - общие
+для всего процесса. Коды известных статусов совпадают с порядком
+ключей HOMEWORK_VERDICTS, незнакомые статусы получают новые коды
+при первой встрече.
+"""
+import sys
+import threading
+
+# Коды 0, 1, 2 - статусы из HOMEWORK_VERDICTS.
+_statuses = ['approved', 'reviewing', 'rejected']
+_codes = {status: code for code, status in enumerate(_statuses)}
+_lock = threading.Lock()
+
+
+def status_code(status):
+    """Код статуса; None остается None."""
+    if status is None:
+        return None
+    code = _codes.get(status)
+    if code is None:
+        # Список только растет, поэтому читать его можно без блокировки.
+        with _lock:
+            code = _codes.get(status)
+            if code is None:
+                code = len(_statuses)
+                _statuses.append(sys.intern(status))
+                _codes[_statuses[code]] = code
+    return code
+
+
+def status_name(code):
+    """Строка статуса по коду, одна на весь процесс."""
+    if code is None:
+        return None
+    return _statuses[code]
+
+
+def verdict(status):
+    """Текст вердикта для статуса, как в parse_status."""
+    import homework
+
+    return homework.HOMEWORK_VERDICTS.get(status, status)
+
+
+class StatusRecord:
+    """Смена статуса работы в истории аккаунта."""
+
+    __slots__ = ('changed_at', 'name', 'code')
+
+    def __init__(self, changed_at, name, status):
+        """Статус хранится кодом, строка восстанавливается по запросу."""
+        self.changed_at = changed_at
+        self.name = name
+        self.code = status_code(status)
+
+    @property
+    def status(self):
+        """Строка статуса."""
+        return status_name(self.code)
+
+    def __repr__(self):
+        """Имя и статус работы для отладки."""
+        return f'StatusRecord({self.name!r}, {self.status!r})'
+
+
+class Homeworks(list):
+    """Работы из ответа API после проверки схемы.
+
+    Элементы - исходные словари работ, как в ответе. В rows те же
+    работы кортежами (словарь, id, homework_name, status), которые
+    собраны при проверке, чтобы diff не доставал поля повторно.
+    """
+
+    __slots__ = ('rows',)
+
+    def __init__(self, homeworks, rows):
+        """Работы ответа и готовые строки rows для них."""
+        super().__init__(homeworks)
+        self.rows = rows
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import math
+import time
+import zlib
+
+# Доля периода, на которую может сдвигаться отдельный опрос.
+JITTER = 0.05
+
+
+def stable_fraction(key):
+    """Детерминированное число в [0, 1) для строки key.
+
+    Не зависит от PYTHONHASHSEED, поэтому расписание
+    одинаково при каждом запуске процесса.
+    """
+    return zlib.crc32(key.encode('utf-8')) / 2 ** 32
+
+
+class PollScheduler:
+    """Очередь опросов на куче, упорядоченная по времени следующего опроса.
+
+    Каждому аккаунту назначается своя фаза внутри периода, поэтому
+    опросы равномерно распределены во времени. Следующий срок
+    считается от предыдущего срока, а не от момента окончания опроса,
+    и расписание не дрейфует.
+    """
+
+    def __init__(self, period, jitter=JITTER, clock=time.monotonic):
+        """Сроки назначаются с шагом period и случайным сдвигом jitter."""
+        self.period = period
+        self.jitter = jitter
+        self.clock = clock
+        self._heap = []
+        self._entries = {}
+        self._base = {}
+        self._cycle = {}
+        self._counter = itertools.count()
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self._lateness_total = 0.0
+        self._popped = 0
+
+    def __len__(self):
+        """Число аккаунтов в очереди."""
+        return len(self._entries)
+
+    def __contains__(self, key):
+        """Есть ли аккаунт в расписании."""
+        return key in self._base
+
+    @property
+    def depth(self):
+        """Сколько аккаунтов ждет своей очереди."""
+        return len(self._entries)
+
+    def _jitter(self, key, cycle, interval):
+        if not self.jitter:
+            return 0.0
+        shift = stable_fraction(f'{key}:{cycle}') - 0.5
+        return shift * self.jitter * interval
+
+    def _push(self, key, base, interval):
+        deadline = base + self._jitter(key, self._cycle[key], interval)
+        entry = [deadline, next(self._counter), key]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def add(self, key, start=None):
+        """Добавляем аккаунт, первый опрос приходится на его фазу."""
+        if key in self._base:
+            return
+        now = self.clock() if start is None else start
+        base = now + stable_fraction(key) * self.period
+        self._base[key] = base
+        self._cycle[key] = 0
+        self._push(key, base, self.period)
+
+    def remove(self, key):
+        """Убираем аккаунт из расписания."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            # Из кучи не удаляем, запись просто помечается пустой.
+            entry[-1] = None
+        self._base.pop(key, None)
+        self._cycle.pop(key, None)
+
+    def next_due(self):
+        """Время ближайшего опроса или None, если очередь пуста."""
+        while self._heap and self._heap[0][-1] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Забираем из очереди все аккаунты, срок которых наступил."""
+        now = self.clock() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            if key is None:
+                continue
+            del self._entries[key]
+            lateness = now - deadline
+            self.last_lateness = lateness
+            self.max_lateness = max(self.max_lateness, lateness)
+            self._lateness_total += lateness
+            self._popped += 1
+            due.append(key)
+        return due
+
+    def reschedule(self, key, interval=None, now=None):
+        """Ставим аккаунт на следующий опрос через interval секунд.
+
+        Если опрос сильно опоздал, пропущенные сроки не догоняются
+        пачкой, а расписание сдвигается на ближайший будущий срок.
+        """
+        if key not in self._base or key in self._entries:
+            return
+        interval = self.period if interval is None else interval
+        now = self.clock() if now is None else now
+        base = self._base[key] + interval
+        if base <= now and interval > 0:
+            base += math.ceil((now - base) / interval) * interval
+        self._base[key] = base
+        self._cycle[key] += 1
+        self._push(key, base, interval)
+
+    def stats(self):
+        """Глубина очереди и опоздания опросов."""
+        return {
+            'depth': self.depth,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness,
+            'mean_lateness': (
+                self._lateness_total / self._popped if self._popped else 0.0),
+        }
@@ -0,0 +1,180 @@
+"""Схема ответа homework_statuses и ее компиляция в проверку.
+
+Схема описывается декларативно узлами Object, Array, Int, Str
+и Choice. compile_schema() один раз превращает ее в исходный код
+функции, которая за один проход по ответу проверяет конверт и все
+работы, собирает все нарушения с путями вида "homeworks[3].status"
+и тут же собирает записи работ: кортежи из нужных полей.
+
+Нарушения в полях из soft не делают ответ негодным: такие работы
+все равно попадают в результат, а сообщение о них формирует
+parse_status, когда до них дойдет очередь.
+"""
+import itertools
+from collections import namedtuple
+
+Violation = namedtuple('Violation', ['path', 'message'])
+
+
+class Node:
+    """Узел схемы: умеет выписать код проверки значения."""
+
+    def emit(self, compiler, value, path, sink, depth):
+        """Строки кода, проверяющие переменную value.
+
+        path - выражение, дающее путь до значения; вычисляется
+        только при нарушении. sink - список, куда пишем нарушения.
+        """
+        raise NotImplementedError
+
+
+class _Scalar(Node):
+    check = message = None
+
+    def emit(self, compiler, value, path, sink, depth):
+        """Проверяем тип одной строкой."""
+        compiler.line(depth, f'if {self.check.format(value)}:')
+        compiler.line(depth + 1, f'{sink}.append(({path}, {self.message!r}))')
+
+
+class Int(_Scalar):
+    """Целое число; bool не подходит."""
+
+    check = 'type({}) is not int'
+    message = 'ожидалось целое число'
+
+
+class Str(_Scalar):
+    """Строка."""
+
+    check = 'type({}) is not str'
+    message = 'ожидалась строка'
+
+
+class Choice(Node):
+    """Строка из заданного набора.
+
+    Набор хранится по ссылке: если это словарь, который меняется
+    на ходу, проверка видит новые ключи без перекомпиляции.
+    """
+
+    def __init__(self, values):
+        """Допустимые значения values можно менять на ходу."""
+        self.values = values
+
+    def emit(self, compiler, value, path, sink, depth):
+        """Проверяем тип и вхождение в набор."""
+        values = compiler.constant(self.values)
+        compiler.line(
+            depth, f'if type({value}) is not str or {value} not in {values}:')
+        compiler.line(
+            depth + 1, f"{sink}.append(({path}, 'неизвестное значение ' "
+            f'+ repr({value})))')
+
+
+class Array(Node):
+    """Список однотипных элементов."""
+
+    def __init__(self, item):
+        """Каждый элемент проверяется по схеме item."""
+        self.item = item
+
+    def emit(self, compiler, value, path, sink, depth):
+        """Проверяем тип и каждый элемент в том же цикле."""
+        index, item = compiler.name('i'), compiler.name('item')
+        compiler.line(depth, f'if not isinstance({value}, list):')
+        compiler.line(depth + 1, f"{sink}.append(({path}, 'ожидался список'))")
+        compiler.line(depth, 'else:')
+        compiler.line(
+            depth + 1, f'for {index}, {item} in enumerate({value}):')
+        self.item.emit(
+            compiler, item, f"{path} + '[' + str({index}) + ']'",
+            sink, depth + 2)
+
+
+class Object(Node):
+    """Словарь с известными полями; лишние ключи допускаются.
+
+    Отсутствующий ключ и null считаются одинаково. Если record
+    истинно, для каждого словаря в список записей, который
+    возвращает проверка, попадает кортеж (словарь, *поля) с полями
+    в порядке объявления. Кортеж, а не объект: его сборка почти
+    ничего не стоит по сравнению с вызовом конструктора.
+    """
+
+    def __init__(self, fields, required=(), soft=(), record=False):
+        """Схемы полей fields - по именам полей."""
+        self.fields = fields
+        self.required = frozenset(required)
+        self.soft = frozenset(soft)
+        self.record = record
+
+    def emit(self, compiler, value, path, sink, depth):
+        """Проверяем тип, затем каждое поле."""
+        compiler.line(depth, f'if not isinstance({value}, dict):')
+        compiler.line(depth + 1, f"{sink}.append(({path}, 'ожидался объект'))")
+        compiler.line(depth, 'else:')
+        depth += 1
+        names = []
+        for key, node in self.fields.items():
+            field = compiler.name('f')
+            names.append(field)
+            field_path = (
+                repr(key) if path == "''" else f'{path} + {"." + key!r}')
+            field_sink = 'warnings' if key in self.soft else sink
+            compiler.line(depth, f'{field} = {value}.get({key!r})')
+            if key in self.required:
+                compiler.line(depth, f'if {field} is None:')
+                compiler.line(
+                    depth + 1,
+                    f"{field_sink}.append(({field_path}, 'нет ключа'))")
+                compiler.line(depth, 'else:')
+            else:
+                compiler.line(depth, f'if {field} is not None:')
+            node.emit(compiler, field, field_path, field_sink, depth + 1)
+        if self.record:
+            compiler.line(
+                depth, f'records.append(({value}, {", ".join(names)}))')
+
+
+class _Compiler:
+    def __init__(self):
+        self.lines = []
+        self.namespace = {}
+        self._counter = itertools.count()
+
+    def name(self, prefix):
+        return f'{prefix}{next(self._counter)}'
+
+    def constant(self, value):
+        name = self.name('c')
+        self.namespace[name] = value
+        return name
+
+    def line(self, depth, text):
+        self.lines.append('    ' * depth + text)
+
+
+def compile_schema(schema):
+    """Компилируем схему в функцию validate(value).
+
+    validate возвращает (records, errors, warnings): записи,
+    построенные узлами с record, нарушения, из-за которых ответ
+    негоден, и нарушения в полях soft. Нарушения - Violation.
+    """
+    compiler = _Compiler()
+    compiler.line(0, 'def validate(value):')
+    compiler.line(1, 'records = []')
+    compiler.line(1, 'errors = []')
+    compiler.line(1, 'warnings = []')
+    schema.emit(compiler, 'value', "''", 'errors', 1)
+    compiler.line(1, 'if errors or warnings:')
+    compiler.line(2, 'errors = [Violation(*error) for error in errors]')
+    compiler.line(2, 'warnings = [Violation(*item) for item in warnings]')
+    compiler.line(1, 'return records, errors, warnings')
+    source = '\n'.join(compiler.lines)
+    namespace = dict(compiler.namespace, Violation=Violation)
+    exec(compile(source, '<schema>', 'exec'), namespace)
+    validate = namespace['validate']
+    validate.source = source
+    return validate
@@ -0,0 +1,202 @@
+"""Распределение аккаунтов между процессами и машинами.
+
+Каждый воркер регистрируется в общей базе SQLite и раз в
+ttl/3 секунд продлевает свою запись. Живые воркеры образуют
+кольцо консистентного хэширования, по нему каждый аккаунт
+закреплен ровно за одним воркером. Опрашивать аккаунт можно только
+под арендой (lease) в той же базе, поэтому даже пока воркеры видят
+разный состав кольца, один аккаунт не опрашивается дважды. Аренда
+упавшего воркера истекает через ttl секунд и переходит к новому
+владельцу по кольцу.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# Время жизни записи воркера и аренды аккаунта, в секундах.
+LEASE_TTL = 30
+# Сколько точек на кольце у каждого воркера.
+REPLICAS = 100
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    tenant TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+'''
+
+
+def _hash(value):
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def default_worker_id():
+    """Имя воркера по умолчанию: хост и pid."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class HashRing:
+    """Кольцо консистентного хэширования.
+
+    При добавлении или удалении воркера переезжает только
+    примерно 1/N аккаунтов.
+    """
+
+    def __init__(self, members, replicas=REPLICAS):
+        """Каждый участник занимает replicas точек на кольце."""
+        self.members = sorted(members)
+        points = sorted(
+            (_hash(f'{member}#{replica}'), member)
+            for member in self.members for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key):
+        """Воркер, за которым закреплен ключ, или None для пустого кольца."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class LeaseRegistry:
+    """Реестр воркеров и аренд аккаунтов в SQLite.
+
+    Базу можно положить на общий диск, если воркеры работают
+    на разных машинах; часы машин должны быть синхронизированы
+    с точностью много меньше ttl.
+    """
+
+    def __init__(self, path, worker_id=None, ttl=LEASE_TTL,
+                 clock=time.time):
+        """Аренды хранятся в SQLite по пути path и живут ttl секунд."""
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.clock = clock
+        # Вызывается из пула потоков, но всегда из одного места.
+        self._connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False,
+            timeout=ttl / 3)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+
+    def rebalance(self, names):
+        """Продлеваем регистрацию и аренды, захватываем свои аккаунты.
+
+        Возвращаем пару множеств: аккаунты, которые держит этот
+        воркер, и те из них, что по кольцу теперь принадлежат другим.
+        Вторые нужно перестать опрашивать и отпустить через release().
+        """
+        now = self.clock()
+        expires_at = now + self.ttl
+        db = self._connection
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker_id, expires_at))
+            db.execute('DELETE FROM workers WHERE expires_at < ?', (now,))
+            ring = HashRing(
+                worker for worker, in db.execute('SELECT worker FROM workers'))
+            wanted = [
+                name for name in names if ring.owner(name) == self.worker_id]
+            db.executemany(
+                'INSERT INTO leases VALUES (?, ?, ?) '
+                'ON CONFLICT (tenant) DO UPDATE SET '
+                'worker = excluded.worker, expires_at = excluded.expires_at '
+                'WHERE leases.worker = excluded.worker '
+                'OR leases.expires_at < ?',
+                [(name, self.worker_id, expires_at, now) for name in wanted])
+            held = {
+                tenant for tenant, in db.execute(
+                    'SELECT tenant FROM leases WHERE worker = ? '
+                    'AND expires_at >= ?', (self.worker_id, now))}
+        return held, held - set(wanted)
+
+    def release(self, names):
+        """Отпускаем аренды аккаунтов."""
+        with self._connection:
+            self._connection.executemany(
+                'DELETE FROM leases WHERE tenant = ? AND worker = ?',
+                [(name, self.worker_id) for name in names])
+
+    def workers(self):
+        """Живые воркеры."""
+        return [worker for worker, in self._connection.execute(
+            'SELECT worker FROM workers WHERE expires_at >= ? ORDER BY worker',
+            (self.clock(),))]
+
+    def leave(self):
+        """Снимаем регистрацию и все аренды воркера."""
+        with self._connection:
+            self._connection.execute(
+                'DELETE FROM leases WHERE worker = ?', (self.worker_id,))
+            self._connection.execute(
+                'DELETE FROM workers WHERE worker = ?', (self.worker_id,))
+
+    def close(self):
+        """Закрываем базу."""
+        self._connection.close()
+
+
+class ShardCoordinator:
+    """Держит набор аккаунтов движка в соответствии с арендами.
+
+    tenants - полный список аккаунтов, одинаковый у всех воркеров.
+    Раз в interval секунд аренды продлеваются, новые аккаунты
+    добавляются в движок, а переехавшие к другим воркерам снимаются
+    с опроса и только потом отпускаются.
+    """
+
+    def __init__(self, registry, tenants, interval=None):
+        """По умолчанию аренды продлеваются трижды за ttl."""
+        self.registry = registry
+        self.tenants = {tenant.name: tenant for tenant in tenants}
+        self.interval = registry.ttl / 3 if interval is None else interval
+        self.rebalances = 0
+
+    async def rebalance(self, engine):
+        """Один шаг: продлеваем аренды и приводим движок к ним."""
+        loop = asyncio.get_running_loop()
+        try:
+            held, moved = await loop.run_in_executor(
+                None, self.registry.rebalance, list(self.tenants))
+        except sqlite3.Error as error:
+            # Без продления аренд их могут забрать другие воркеры.
+            logger.error(f'Не удалось продлить аренды: {error}')
+            held, moved = set(), set()
+        stale = set(engine.tenants) - (held - moved)
+        if stale:
+            await engine.remove_tenants(stale)
+        if moved:
+            await loop.run_in_executor(None, self.registry.release, moved)
+        added = [
+            self.tenants[name] for name in held - moved
+            if name not in engine.tenants]
+        if added:
+            engine.add_tenants(added)
+        if added or stale:
+            logger.info(
+                f'Аккаунтов на воркере {self.registry.worker_id}: '
+                f'{len(engine.tenants)} (+{len(added)}, -{len(stale)})')
+        self.rebalances += 1
+
+    async def run(self, engine):
+        """Цикл перебалансировки, работает до отмены задачи."""
+        while True:
+            await self.rebalance(engine)
+            await asyncio.sleep(self.interval)
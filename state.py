@@ -0,0 +1,82 @@
+import logging
+from collections import namedtuple
+
+from records import status_code, status_name
+
+StatusChange = namedtuple(
+    'StatusChange', ['key', 'homework', 'old_status', 'new_status'])
+
+logger = logging.getLogger(__name__)
+
+
+class HomeworkIndex:
+    """Последние известные статусы домашних работ одного аккаунта.
+
+    Ключ работы - id, а если его нет - название. Статусы хранятся
+    кодами из records, наружу отдаются строками.
+    """
+
+    __slots__ = ('_statuses',)
+
+    def __init__(self, statuses=None):
+        """Начинаем с известных статусов statuses по ключам работ."""
+        self._statuses = {
+            key: status_code(status)
+            for key, status in (statuses or {}).items()}
+
+    def __len__(self):
+        """Число известных работ."""
+        return len(self._statuses)
+
+    def get(self, key):
+        """Последний известный статус работы или None."""
+        return status_name(self._statuses.get(key))
+
+    def statuses(self):
+        """Все известные статусы."""
+        return map(status_name, self._statuses.values())
+
+    def items(self):
+        """Пары (ключ работы, статус)."""
+        return ((key, status_name(code))
+                for key, code in self._statuses.items())
+
+    def diff(self, homeworks):
+        """Сравниваем список работ из ответа API с индексом за один проход.
+
+        Возвращаем список StatusChange только для работ, статус которых
+        изменился. Индекс не меняется, пока изменение не подтверждено
+        через commit(). Для списка из check_response поля работ берем
+        из готовых строк rows, для обычного списка словарей достаем их.
+        Работа без id и названия пропускается с ошибкой в логе: из-за
+        нее не должны теряться изменения остальных работ.
+        """
+        changes = []
+        seen = set()
+        rows = getattr(homeworks, 'rows', None)
+        if rows is None:
+            rows = [(homework, homework.get('id'),
+                     homework.get('homework_name'), homework.get('status'))
+                    for homework in homeworks]
+        for homework, homework_id, name, status in rows:
+            key = name if homework_id is None else homework_id
+            if key is None:
+                logger.error(
+                    'Работа пропущена: нет ключей "id" и "homework_name" '
+                    'в словаре homework')
+                continue
+            if key in seen:
+                # API отдает работы от новых к старым, берем первую.
+                continue
+            seen.add(key)
+            old_code = self._statuses.get(key)
+            new_code = status_code(status)
+            if old_code != new_code:
+                changes.append(StatusChange(
+                    key, homework, status_name(old_code),
+                    status_name(new_code)))
+        return changes
+
+    def commit(self, change):
+        """Запоминаем статус после успешной отправки уведомления."""
+        self._statuses[change.key] = status_code(change.new_status)
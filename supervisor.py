@@ -0,0 +1,236 @@
+"""Запуск опроса в нескольких процессах, по одному на ядро.
+
+Супервизор делит аккаунты между воркерами консистентным
+хэшированием по номеру слота, перезапускает упавшие воркеры
+с теми же аккаунтами и собирает их логи и метрики через общую
+очередь. Логи пишутся в program.log супервизора, метрики
+отдаются одним /metrics.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
+
+from dispatcher import GLOBAL_RATE
+from metrics import Metrics
+from sharding import HashRing
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер присылает метрики и супервизор проверяет воркеры.
+REPORT_INTERVAL = 5.0
+CHECK_INTERVAL = 0.5
+# Пауза перед перезапуском удваивается при падениях подряд.
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 60.0
+STOP_TIMEOUT = 10.0
+
+
+def partition(tenants, workers):
+    """Делим аккаунты между слотами 0..workers-1."""
+    ring = HashRing(str(slot) for slot in range(workers))
+    slots = [[] for _ in range(workers)]
+    for tenant in tenants:
+        slots[int(ring.owner(tenant.name))].append(tenant)
+    return slots
+
+
+def setup_worker_logging(log_queue):
+    """В воркере все записи логов уходят в очередь супервизора."""
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+
+
+def report_metrics(log_queue, metrics):
+    """Отправляем супервизору накопленные метрики воркера."""
+    # Источник - pid: у перезапущенного воркера счетчики свои.
+    log_queue.put(
+        ('metrics', os.getpid(), metrics.snapshot(), metrics.last_success))
+
+
+def _reporter(log_queue, metrics, stop):
+    while not stop.wait(REPORT_INTERVAL):
+        report_metrics(log_queue, metrics)
+
+
+def worker_main(slot, tenants, log_queue, send_rate):
+    """Процесс-воркер: тот же движок, что и в homework.main()."""
+    import asyncio
+
+    import telegram
+
+    import homework
+    from checkpoint import CheckpointStore
+
+    setup_worker_logging(log_queue)
+    # SIGTERM от супервизора завершает опрос с сохранением курсоров.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    homework.load_environment()
+    # getUpdates может вызывать только один процесс на токен бота.
+    os.environ['BOT_COMMANDS'] = '0'
+    # Список аккаунтов воркеру задает супервизор, а не файл настроек.
+    os.environ['RELOAD_INTERVAL'] = '0'
+    bot = telegram.Bot(token=homework.TELEGRAM_TOKEN)
+    checkpoints = CheckpointStore(homework.CHECKPOINT_PATH)
+    engine = homework.build_engine(tenants, bot, checkpoints)
+    engine.send_rate = send_rate
+    stop = threading.Event()
+    threading.Thread(
+        target=_reporter, args=(log_queue, engine.metrics, stop),
+        daemon=True).start()
+    try:
+        asyncio.run(engine.run())
+    finally:
+        stop.set()
+        report_metrics(log_queue, engine.metrics)
+        checkpoints.close()
+
+
+class Supervisor:
+    """Пул процессов-воркеров опроса.
+
+    Каждому слоту достается своя доля аккаунтов. Если воркер
+    завершился, он перезапускается с той же долей после паузы,
+    которая растет при частых падениях. Лимит отправки сообщений
+    делится между воркерами поровну.
+    """
+
+    def __init__(self, tenants, workers=None, target=worker_main,
+                 restart_delay=RESTART_DELAY,
+                 max_restart_delay=MAX_RESTART_DELAY, metrics=None):
+        """Без workers воркеров столько же, сколько ядер."""
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = partition(tenants, self.workers)
+        self.target = target
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.metrics = Metrics() if metrics is None else metrics
+        self.metrics.add_gauge(
+            'workers_alive', 'Работающих процессов-воркеров.',
+            lambda: sum(p.is_alive() for p in self.processes.values()))
+        self.metrics.add_gauge(
+            'worker_restarts', 'Перезапусков воркеров.',
+            lambda: self.restarts)
+        self.restarts = 0
+        self.processes = {}
+        self._context = multiprocessing.get_context('spawn')
+        self.queue = self._context.Queue()
+        self._started_at = {}
+        self._crashes = {}
+        self._restart_at = {}
+        self._stop = threading.Event()
+        self._collector = None
+
+    def _start_worker(self, slot):
+        process = self._context.Process(
+            target=self.target, name=f'worker-{slot}',
+            args=(slot, self.slots[slot], self.queue,
+                  GLOBAL_RATE / self.workers),
+            daemon=True)
+        process.start()
+        self.processes[slot] = process
+        self._started_at[slot] = time.monotonic()
+        logger.info(
+            f'Запущен воркер {slot} (pid {process.pid}), '
+            f'аккаунтов: {len(self.slots[slot])}')
+
+    def _collect(self):
+        """Разбираем очередь: записи логов и метрики воркеров."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if isinstance(item, logging.LogRecord):
+                logging.getLogger(item.name).handle(item)
+            else:
+                _, source, histograms, last_success = item
+                self.metrics.set_source(source, histograms, last_success)
+
+    def check_workers(self):
+        """Перезапускаем завершившиеся воркеры, когда пройдет пауза."""
+        now = time.monotonic()
+        for slot, process in self.processes.items():
+            if process.is_alive():
+                continue
+            if slot not in self._restart_at:
+                uptime = now - self._started_at[slot]
+                # Долго проработавший воркер начинает отсчет падений заново.
+                crashes = 1 if uptime > self.max_restart_delay else (
+                    self._crashes.get(slot, 0) + 1)
+                self._crashes[slot] = crashes
+                delay = min(
+                    self.restart_delay * 2 ** (crashes - 1),
+                    self.max_restart_delay)
+                self._restart_at[slot] = now + delay
+                logger.error(
+                    f'Воркер {slot} завершился с кодом {process.exitcode}, '
+                    f'перезапуск через {delay:.0f} с')
+            if now >= self._restart_at[slot]:
+                del self._restart_at[slot]
+                self.restarts += 1
+                self._start_worker(slot)
+
+    def stop(self):
+        """Просим run() завершиться."""
+        self._stop.set()
+
+    def run(self):
+        """Запускаем воркеры и следим за ними до stop() или Ctrl+C."""
+        self._collector = threading.Thread(
+            target=self._collect, name='collector', daemon=True)
+        self._collector.start()
+        for slot in range(self.workers):
+            self._start_worker(slot)
+        try:
+            while not self._stop.wait(CHECK_INTERVAL):
+                self.check_workers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop_workers()
+
+    def _stop_workers(self):
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.queue.put(None)
+        self._collector.join()
+
+
+def main():
+    """Запуск бота на всех ядрах."""
+    import homework
+
+    homework.load_environment()
+    homework.configure_logging()
+    tenants = homework.get_tenants()
+    supervisor = Supervisor(tenants, workers=int(os.getenv('WORKERS', 0)))
+    metrics_server = None
+    if os.getenv('METRICS_PORT'):
+        from metrics import MetricsServer
+
+        metrics_server = MetricsServer(
+            supervisor.metrics, max_age=homework.health_max_age(),
+            host=os.getenv('METRICS_HOST', '127.0.0.1'),
+            port=int(os.getenv('METRICS_PORT'))).start()
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stop())
+    try:
+        supervisor.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import json
+import math
+from array import array
+from collections import deque
+
+from records import status_code, status_name
+from state import HomeworkIndex
+
+# Сколько последних смен статусов хранится для команды /history.
+HISTORY_SIZE = 20
+
+
+class Tenant:
+    """Аккаунт студента, статусы которого опрашивает бот.
+
+    Хранит токен Практикума и список чатов телеграма,
+    в которые нужно отправлять уведомления.
+    """
+
+    def __init__(self, name, practicum_token, chat_ids):
+        """chat_ids сохраняются кортежем."""
+        self.name = name
+        self.practicum_token = practicum_token
+        self.chat_ids = tuple(chat_ids)
+
+    def __repr__(self):
+        """Только имя: токен не должен попадать в логи."""
+        return f'Tenant({self.name!r})'
+
+
+def _column(name, kind):
+    """Свойство представления, читающее ячейку колонки таблицы.
+
+    В числовых колонках нет None, вместо него хранится NaN или -1.
+    """
+    def get(self):
+        value = getattr(self._table, name)[self._row]
+        if kind == 'code':
+            return status_name(value) if value >= 0 else None
+        if kind == 'float' and math.isnan(value):
+            return None
+        return value
+
+    def set(self, value):
+        if kind == 'code':
+            value = -1 if value is None else status_code(value)
+        elif kind == 'float' and value is None:
+            value = math.nan
+        elif kind == 'int':
+            value = int(value)
+        getattr(self._table, name)[self._row] = value
+
+    return property(get, set)
+
+
+def _lazy(name, factory):
+    """Свойство с объектом, который создается при первом обращении."""
+    def get(self):
+        column = getattr(self._table, name)
+        value = column[self._row]
+        if value is None:
+            value = column[self._row] = factory()
+        return value
+
+    def set(self, value):
+        getattr(self._table, name)[self._row] = value
+
+    return property(get, set)
+
+
+class TenantState:
+    """Изменяемое состояние опроса одного аккаунта.
+
+    Это легкое представление строки TenantTable: сами значения
+    лежат в колонках таблицы. Представление нельзя хранить после
+    удаления аккаунта из таблицы, его строка достанется другому.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        """Представление строки row таблицы table."""
+        self._table = table
+        self._row = row
+
+    from_date = _column('_from_date', 'int')
+    last_change_at = _column('_last_change_at', 'float')
+    interval = _column('_interval', 'float')
+    # Время последнего ответа API и то, что из него известно,
+    # для ответов на команды без нового запроса.
+    checked_at = _column('_checked_at', 'float')
+    last_status = _column('_last_status', 'code')
+    homeworks = _lazy('_homeworks', HomeworkIndex)
+    names = _lazy('_names', dict)
+    history = _lazy('_history', lambda: deque(maxlen=HISTORY_SIZE))
+
+    @property
+    def has_history(self):
+        """Были ли у аккаунта смены статусов, без создания истории."""
+        return bool(self._table._history[self._row])
+
+
+class TenantTable:
+    """Состояние всех аккаунтов в колонках.
+
+    Числа хранятся в array по 8 байт вместо отдельных объектов,
+    индекс работ, имена и история создаются, только когда нужны.
+    Освободившиеся строки переиспользуются. По интерфейсу таблица -
+    словарь {имя аккаунта: TenantState}.
+    """
+
+    def __init__(self):
+        """Пустая таблица."""
+        self._rows = {}
+        self._free = []
+        self._from_date = array('q')
+        self._last_change_at = array('d')
+        self._interval = array('d')
+        self._checked_at = array('d')
+        self._last_status = array('h')
+        self._homeworks = []
+        self._names = []
+        self._history = []
+
+    def __len__(self):
+        """Число аккаунтов."""
+        return len(self._rows)
+
+    def __contains__(self, name):
+        """Есть ли состояние аккаунта name."""
+        return name in self._rows
+
+    def __iter__(self):
+        """Имена аккаунтов."""
+        return iter(self._rows)
+
+    def __getitem__(self, name):
+        """Состояние аккаунта name или KeyError."""
+        return TenantState(self, self._rows[name])
+
+    def get(self, name, default=None):
+        """Состояние аккаунта или default."""
+        row = self._rows.get(name)
+        if row is None:
+            return default
+        return TenantState(self, row)
+
+    def add(self, name, from_date):
+        """Новая строка для аккаунта, возвращаем ее представление."""
+        if name in self._rows:
+            raise KeyError(f'Аккаунт {name} уже есть в таблице')
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = len(self._homeworks)
+            for column in (self._from_date, self._last_change_at,
+                           self._interval, self._checked_at,
+                           self._last_status):
+                column.append(0)
+            for column in (self._homeworks, self._names, self._history):
+                column.append(None)
+        self._rows[name] = row
+        state = TenantState(self, row)
+        state.from_date = from_date
+        state.last_change_at = state.interval = state.checked_at = None
+        state.last_status = None
+        for column in (self._homeworks, self._names, self._history):
+            column[row] = None
+        return state
+
+    def discard(self, name):
+        """Удаляем аккаунт, если он есть; строка будет переиспользована."""
+        row = self._rows.pop(name, None)
+        if row is None:
+            return
+        for column in (self._homeworks, self._names, self._history):
+            column[row] = None
+        self._free.append(row)
+
+
+def load_tenants(path):
+    """Загружаем список аккаунтов из JSON-файла.
+
+    Файл содержит список объектов с ключами
+    "name", "practicum_token" и "chat_ids".
+    """
+    with open(path, encoding='utf-8') as file:
+        items = json.load(file)
+    if not isinstance(items, list):
+        raise TypeError(f'Файл {path} должен содержать список аккаунтов.')
+    tenants = []
+    for item in items:
+        for key in ('name', 'practicum_token', 'chat_ids'):
+            if key not in item:
+                raise KeyError(f'Нет ключа "{key}" в описании аккаунта')
+        tenants.append(
+            Tenant(item['name'], item['practicum_token'], item['chat_ids']))
+    return tenants
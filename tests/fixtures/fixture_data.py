@@ -3,6 +3,8 @@ from datetime import datetime
 
 import pytest
 
+import transport
+
 
 @pytest.fixture
 def random_timestamp():
@@ -19,3 +21,10 @@ def current_timestamp():
 @pytest.fixture
 def api_url():
     return 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+
+
+@pytest.fixture
+def fresh_transport(monkeypatch):
+    monkeypatch.setattr(transport, '_transport', transport.HttpTransport())
+    yield
+    transport.get_transport().close()
@@ -0,0 +1,146 @@
+import asyncio
+import math
+import threading
+
+import homework
+from backfill import Backfill
+from checkpoint import CheckpointStore
+from clock import VirtualClock
+from engine import PollingEngine
+from tenants import Tenant
+from utils import FakeBot
+
+HOUR = 3600
+
+
+def checkpoints(path, cursors):
+    """Хранилище с курсорами и статусом reviewing у каждой работы."""
+    store = CheckpointStore(path)
+    for name, from_date in cursors.items():
+        store.save_cursor(name, from_date)
+        store.save_status(name, 1, 'reviewing')
+    store.flush()
+    return store
+
+
+class TestBackfill:
+
+    def test_catches_up_lagging_tenants(self, tmp_path):
+        clock = VirtualClock()
+        now = int(clock.time())
+        store = checkpoints(str(tmp_path / 'state.sqlite3'), {
+            'old': now - 2 * 24 * HOUR, 'older': now - 3 * 24 * HOUR,
+            'fresh': now - 60})
+        requested = []
+
+        def request(token, from_date, cache=None):
+            requested.append(token)
+            # За простой работа дважды сменила статус: берем последнюю.
+            return {'homeworks': [
+                {'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'},
+                {'id': 1, 'homework_name': 'hw.zip', 'status': 'rejected'},
+            ], 'current_date': now}
+
+        bot = FakeBot()
+        engine = PollingEngine(
+            [Tenant(name, name, [name]) for name in ('fresh', 'old', 'older')],
+            bot, retry_time=600, checkpoints=store, chat_rate=math.inf,
+            clock=clock)
+        engine.request = request
+        backfill = Backfill(parallel=2)
+
+        async def main():
+            async with engine.started():
+                return await backfill.run(engine)
+
+        report = clock.run(main())
+        assert requested == ['older', 'old']
+        assert report.lagging == report.polled == report.changed == 2
+        assert report.failed == 0
+        assert sorted(chat for chat, _ in bot.messages) == ['old', 'older']
+        assert all(homework.HOMEWORK_VERDICTS['approved'] in text
+                   for _, text in bot.messages)
+        saved = CheckpointStore(str(tmp_path / 'state.sqlite3')).load()
+        assert saved['old'] == (now, {1: 'approved'})
+        assert saved['fresh'][0] == now - 60
+        store.close()
+
+    def test_deadline_bounds_catch_up(self, tmp_path):
+        clock = VirtualClock()
+        now = int(clock.time())
+        names = [f't{i}' for i in range(5)]
+        store = checkpoints(
+            str(tmp_path / 'state.sqlite3'),
+            {name: now - 24 * HOUR for name in names})
+
+        def request(token, from_date, cache=None):
+            clock.advance(10)
+            return {'homeworks': [], 'current_date': int(clock.time())}
+
+        engine = PollingEngine(
+            [Tenant(name, name, [1]) for name in names], FakeBot(),
+            retry_time=600, checkpoints=store, clock=clock)
+        engine.request = request
+        backfill = Backfill(deadline=25, parallel=1)
+
+        async def main():
+            async with engine.started():
+                return await backfill.run(engine)
+
+        report = clock.run(main())
+        assert report.lagging == 5
+        assert report.polled == 3
+        assert report.elapsed == 30
+        # Остальных догонит обычный опрос с их курсоров.
+        assert engine.states['t4'].from_date == now - 24 * HOUR
+        store.close()
+
+    def test_engine_runs_backfill_first(self, tmp_path, monkeypatch):
+        store = checkpoints(str(tmp_path / 'state.sqlite3'), {'a': 500})
+        requested = []
+
+        def fake_request(token, from_date, cache=None):
+            requested.append(from_date)
+            return {'homeworks': [], 'current_date': 1000}
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        engine = PollingEngine(
+            [Tenant('a', 'x', [1])], FakeBot(), retry_time=0,
+            checkpoints=store)
+        engine.backfill = Backfill()
+        asyncio.run(engine.run(cycles=1))
+        assert requested == [500, 1000]
+        assert engine.backfill.report.polled == 1
+        store.close()
+
+    def test_removal_waits_for_backfill_poll(self, tmp_path):
+        store = checkpoints(str(tmp_path / 'state.sqlite3'), {'a': 500})
+        started, release = threading.Event(), threading.Event()
+
+        def request(token, from_date, cache=None):
+            started.set()
+            release.wait(5)
+            return {'homeworks': [], 'current_date': 1000}
+
+        engine = PollingEngine(
+            [Tenant('a', 'a', [1])], FakeBot(), retry_time=600,
+            checkpoints=store)
+        engine.request = request
+        backfill = Backfill()
+
+        async def main():
+            async with engine.started():
+                task = asyncio.ensure_future(backfill.run(engine))
+                while not started.is_set():
+                    await asyncio.sleep(0.01)
+                removal = asyncio.ensure_future(engine.remove_tenants(['a']))
+                await asyncio.sleep(0.05)
+                assert not removal.done()
+                release.set()
+                await removal
+                return await task
+
+        report = asyncio.run(main())
+        assert report.polled == 1 and report.failed == 0
+        assert 'a' not in engine.states
+        store.close()
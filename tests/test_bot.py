@@ -1,3 +1,4 @@
+import json
 import os
 from http import HTTPStatus
 
@@ -6,6 +7,14 @@ import telegram
 import utils
 
 
+def patch_session_get(monkeypatch, mock_get):
+    """Подменяем GET общей сессии транспорта."""
+    def session_get(self, *args, **kwargs):
+        return mock_get(*args, **kwargs)
+
+    monkeypatch.setattr(requests.Session, 'get', session_get)
+
+
 class MockResponseGET:
 
     def __init__(self, url, params=None, random_timestamp=None,
@@ -52,6 +61,14 @@ class MockResponseGET:
         }
         return data
 
+    @property
+    def text(self):
+        return json.dumps(self.json())
+
+    @property
+    def content(self):
+        return self.text.encode()
+
 
 class MockTelegramBot:
 
@@ -186,7 +203,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -232,7 +249,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
+        patch_session_get(monkeypatch, mock_500_response_get)
 
         import homework
 
@@ -315,7 +332,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -352,7 +369,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -400,7 +417,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -448,7 +465,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -484,7 +501,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
+        patch_session_get(monkeypatch, mock_no_homeworks_response_get)
 
         import homework
 
@@ -525,7 +542,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -565,7 +582,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -599,7 +616,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
+        patch_session_get(monkeypatch, mock_empty_response_get)
 
         import homework
 
@@ -626,7 +643,7 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
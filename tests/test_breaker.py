@@ -0,0 +1,69 @@
+import asyncio
+
+import homework
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from engine import PollingEngine
+from fake_api import FakePracticumAPI
+from tenants import Tenant
+from transport import RequestTiming
+from utils import FakeBot, FakeClock
+
+
+def timing(status_code=200, error=None):
+    return RequestTiming(homework.ENDPOINT, status_code, 0, 0.1, error)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, clock=FakeClock())
+        breaker.observe(timing(500))
+        breaker.observe(timing(None, error='ReadTimeout'))
+        # Ошибка одного аккаунта не сбой API и сбрасывает счетчик.
+        breaker.observe(timing(401))
+        breaker.observe(timing(502))
+        breaker.observe(timing(503))
+        assert breaker.state == CLOSED
+        breaker.observe(timing(None, error='ConnectionError'))
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.rejected == 1
+
+    def test_half_open_probes(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=30, probes=2, clock=clock)
+        breaker.observe(timing(500))
+        clock.now = 30
+        assert [breaker.allow() for _ in range(3)] == [True, True, False]
+        assert breaker.state == HALF_OPEN
+
+        # Неудачная проба размыкает цепь с удвоенной паузой.
+        breaker.observe(timing(500))
+        assert breaker.state == OPEN
+        clock.now = 89
+        assert not breaker.allow()
+        clock.now = 90
+        assert breaker.allow()
+        breaker.observe(timing(200))
+        assert breaker.state == CLOSED
+        assert breaker.reset_timeout == 30
+
+    def test_engine_sheds_polls_during_outage(self, monkeypatch,
+                                              fresh_transport):
+        tenants = [Tenant(f't{i}', f'token{i}', [i]) for i in range(50)]
+        bot = FakeBot()
+        with FakePracticumAPI(error_rate=1.0) as api:
+            monkeypatch.setattr(homework, 'ENDPOINT', api.endpoint)
+            engine = PollingEngine(
+                tenants, bot, retry_time=0, max_in_flight=2,
+                breaker=CircuitBreaker(failure_threshold=5))
+            asyncio.run(engine.run(cycles=1))
+
+        # Кроме порога, до API доходят только уже начатые запросы.
+        assert api.requests <= 5 + 2
+        assert engine.breaker.state == OPEN
+        assert engine.breaker.rejected >= 50 - api.requests
+        assert len(bot.messages) == api.requests
+        stages = engine.metrics.snapshot()
+        assert ('poll', 'shed') in stages
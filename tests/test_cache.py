@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import homework
+import transport
+from cache import NOT_MODIFIED, ResponseCache
+from engine import PollingEngine
+from intervals import AdaptivePolicy
+from tenants import Tenant
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    body = b''
+    etags = True
+    requests_seen = []
+
+    def do_GET(self):
+        ETagHandler.requests_seen.append(dict(self.headers))
+        etag = '"' + hashlib.md5(self.body).hexdigest() + '"'
+        if self.etags and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.etags:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    ETagHandler.requests_seen = []
+    ETagHandler.etags = True
+    ETagHandler.body = json.dumps(
+        {'homeworks': [], 'current_date': 1}).encode()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ETagHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        homework, 'ENDPOINT', f'http://127.0.0.1:{server.server_port}/')
+    monkeypatch.setattr(transport, '_transport', transport.HttpTransport())
+    yield ETagHandler
+    transport.get_transport().close()
+    server.shutdown()
+    server.server_close()
+
+
+class TestResponseCache:
+
+    def test_etag_revalidation(self, api):
+        cache = ResponseCache()
+        first = homework.request_api_answer('token', 0, cache)
+        assert first == {'homeworks': [], 'current_date': 1}
+        assert homework.request_api_answer('token', 0, cache) is NOT_MODIFIED
+        assert 'If-None-Match' in api.requests_seen[1]
+
+        api.body = json.dumps({'homeworks': [
+            {'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'}],
+            'current_date': 2}).encode()
+        changed = homework.request_api_answer('token', 0, cache)
+        assert changed['current_date'] == 2
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 2
+
+    def test_same_body_without_etag(self, api):
+        api.etags = False
+        cache = ResponseCache()
+        homework.request_api_answer('token', 0, cache)
+        assert homework.request_api_answer('token', 0, cache) is NOT_MODIFIED
+        assert 'If-None-Match' not in api.requests_seen[1]
+        assert cache.hits == 1
+
+    def test_current_date_is_not_hashed(self, api):
+        api.etags = False
+        cache = ResponseCache()
+        homework.request_api_answer('token', 0, cache)
+        api.body = json.dumps({'homeworks': [], 'current_date': 2}).encode()
+        assert homework.request_api_answer('token', 0, cache) is NOT_MODIFIED
+
+    def test_undelivered_change_is_fetched_again(self, api):
+        api.body = json.dumps({'homeworks': [
+            {'id': 1, 'homework_name': 'hw.zip', 'status': 'approved'}],
+            'current_date': 1}).encode()
+        bot = FailingOnceBot()
+        engine = PollingEngine(
+            [Tenant('a', 'token', [1])], bot, retry_time=0,
+            policy=AdaptivePolicy(600), cache=ResponseCache(),
+            chat_rate=math.inf)
+        engine.policy.min_interval = engine.policy.max_interval = 0
+        asyncio.run(engine.run(cycles=4))
+        assert bot.calls == 2
+        assert engine.states['a'].homeworks.get(1) == 'approved'
+        # После доставки ответ снова запоминается в кэше.
+        assert 'If-None-Match' in api.requests_seen[-1]
+
+
+class FailingOnceBot:
+    """Бот, у которого не проходит первая отправка."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id, text):
+        from telegram.error import TelegramError
+
+        self.calls += 1
+        if self.calls == 1:
+            raise TelegramError('Timed out')
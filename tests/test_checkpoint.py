@@ -0,0 +1,60 @@
+import asyncio
+
+import homework
+from checkpoint import CheckpointStore
+from engine import PollingEngine
+from tenants import Tenant
+from utils import FakeBot
+
+
+class TestCheckpointStore:
+
+    def test_roundtrip(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = CheckpointStore(path, flush_interval=3600)
+        store.save_cursor('a', 100)
+        store.save_status('a', 7, 'approved')
+        store.save_status('a', 'hw', 'reviewing')
+        assert store.pending == 3
+        store.close()
+
+        states = CheckpointStore(path).load()
+        assert states == {'a': (100, {7: 'approved', 'hw': 'reviewing'})}
+
+    def test_batches_until_max_pending(self, tmp_path):
+        path = str(tmp_path / 'state.sqlite3')
+        store = CheckpointStore(path, flush_interval=3600, max_pending=3)
+        store.save_cursor('a', 1)
+        store.save_cursor('b', 1)
+        assert CheckpointStore(path).load() == {}
+        store.save_cursor('c', 1)
+        assert len(CheckpointStore(path).load()) == 3
+
+    def test_engine_resumes_from_checkpoint(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'state.sqlite3')
+        store = CheckpointStore(path)
+        store.save_cursor('a', 500)
+        store.save_status('a', 1, 'reviewing')
+        store.close()
+
+        requested = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            requested.append(current_timestamp)
+            return {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}
+                ],
+                'current_date': 600,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        store = CheckpointStore(path)
+        engine = PollingEngine(
+            [Tenant('a', 'x', [1])], FakeBot(), retry_time=0,
+            checkpoints=store)
+        asyncio.run(engine.run(cycles=1))
+        store.close()
+
+        assert requested == [500]
+        assert CheckpointStore(path).load()['a'][0] == 600
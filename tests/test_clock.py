@@ -0,0 +1,86 @@
+import asyncio
+import math
+
+import pytest
+
+import homework
+from clock import VIRTUAL_EPOCH, VirtualClock
+from engine import PollingEngine
+from intervals import AdaptivePolicy
+from tenants import Tenant
+
+HOUR = 3600
+
+
+class StatusBot:
+    """Бот, запоминающий время отправки каждого сообщения."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((self.clock.time(), text))
+
+
+class TestVirtualClock:
+
+    def test_sleep_is_instant(self):
+        clock = VirtualClock()
+
+        async def main():
+            await asyncio.sleep(HOUR)
+            return clock.monotonic()
+
+        assert clock.run(main()) == HOUR
+        assert clock.time() == VIRTUAL_EPOCH + HOUR
+
+    def test_wait_for_times_out(self):
+        clock = VirtualClock()
+
+        async def main():
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.Event().wait(), 30)
+            return clock.monotonic()
+
+        assert clock.run(main()) == 30
+
+    def test_executor_calls_do_not_advance(self):
+        clock = VirtualClock()
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, sum, [1, 2])
+            return clock.monotonic()
+
+        assert clock.run(main()) == 0
+
+    def test_engine_over_virtual_days(self):
+        clock = VirtualClock()
+        changed_at = VIRTUAL_EPOCH + 30 * HOUR
+
+        def request(token, from_date, cache=None):
+            status = (
+                'approved' if clock.time() >= changed_at else 'reviewing')
+            return {'homeworks': [{
+                'id': 1, 'homework_name': 'hw.zip', 'status': status}],
+                'current_date': int(clock.time())}
+
+        bot = StatusBot(clock)
+        engine = PollingEngine(
+            [Tenant('a', 'token-a', [1])], bot, retry_time=600,
+            policy=AdaptivePolicy(600), chat_rate=math.inf, clock=clock)
+        engine.request = request
+
+        async def main():
+            task = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(2 * 24 * HOUR)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        clock.run(main())
+        assert engine.polls > 10
+        assert len(bot.sent) == 2
+        sent_at, text = bot.sent[1]
+        assert homework.HOMEWORK_VERDICTS['approved'] in text
+        assert changed_at <= sent_at < changed_at + 6 * HOUR
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+import telegram
+
+import homework
+from commands import HELP, UNKNOWN_CHAT, CommandResponder, UpdatePoller
+from engine import PollingEngine
+from fake_api import FakePracticumAPI, FakeTelegramAPI
+from intervals import AdaptivePolicy
+from records import StatusRecord
+from state import StatusChange
+from tenants import Tenant
+from utils import FakeBot
+
+
+@pytest.fixture
+def engine():
+    tenants = [Tenant('ivanov', 'x', ['100']), Tenant('petrov', 'y', [200])]
+    engine = PollingEngine(tenants, FakeBot(), retry_time=0)
+    state = engine.state_for(engine.tenants['ivanov'])
+    change = StatusChange(
+        7, {'homework_name': 'hw7.zip', 'status': 'reviewing'},
+        None, 'reviewing')
+    state.homeworks.commit(change)
+    state.names[7] = 'hw7.zip'
+    state.history.append(
+        StatusRecord(time.time() - 300, 'hw7.zip', 'reviewing'))
+    state.checked_at = time.time() - 125
+    return engine
+
+
+class TestCommands:
+
+    def test_status_from_cached_state(self, engine):
+        reply = CommandResponder(engine).reply(100, '/status')
+        assert 'Данные обновлены 2 мин. назад.' in reply
+        assert '"hw7.zip": Работа взята на проверку ревьюером.' in reply
+
+    def test_history(self, engine):
+        reply = CommandResponder(engine).reply('100', '/history@hw_bot')
+        assert reply.splitlines()[1].endswith(
+            '"hw7.zip": Работа взята на проверку ревьюером.')
+
+    def test_not_polled_yet(self, engine):
+        reply = CommandResponder(engine).reply(200, '/status')
+        assert 'Бот еще не получил ответ от API.' in reply
+
+    def test_other_messages(self, engine):
+        responder = CommandResponder(engine)
+        assert responder.reply(100, 'привет') is None
+        assert responder.reply(100, '/start') == HELP
+        assert responder.reply(300, '/status') == UNKNOWN_CHAT
+
+    def test_status_over_get_updates(self, monkeypatch, fresh_transport):
+        events = {'token': [(0, 1, 'reviewing')]}
+        with FakePracticumAPI(events=events) as api, FakeTelegramAPI() as tg:
+            monkeypatch.setattr(homework, 'ENDPOINT', api.endpoint)
+            bot = telegram.Bot('123456:fake', base_url=tg.base_url)
+            tenant = Tenant('student', 'token', [42])
+            # Первый опрос сразу, следующий не раньше чем через 10 минут.
+            engine = PollingEngine(
+                [tenant], bot, retry_time=0, policy=AdaptivePolicy(600))
+            engine.state_for(tenant).from_date = 0
+            engine.commands = UpdatePoller(
+                bot, CommandResponder(engine), timeout=1)
+
+            async def scenario():
+                task = asyncio.ensure_future(engine.run())
+                while engine.states['student'].checked_at is None:
+                    await asyncio.sleep(0.01)
+                requests = api.requests
+                tg.push_message(42, '/status')
+                while engine.commands.answered == 0 or len(tg.messages) < 2:
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return requests
+
+            requests = asyncio.run(asyncio.wait_for(scenario(), 10))
+
+        # Ответ на команду не делает нового запроса к API.
+        assert api.requests == requests == 1
+        chat_id, text = tg.messages[-1]
+        assert int(chat_id) == 42
+        assert '"hw1.zip": Работа взята на проверку ревьюером.' in text
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from decoder import StreamingDecoder, make_decoder
+
+ANSWER = {
+    'extra': {'nested': [1, 2, {'deep': '}]'}]},
+    'homeworks': [
+        {
+            'id': 1,
+            'status': 'approved',
+            'homework_name': 'hw "one"',
+            'reviewer_comment': 'Всё нравится, \\ спасибо',
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': 'Итоговый проект',
+        },
+        {'id': 2, 'status': 'reviewing', 'homework_name': 'hw2'},
+    ],
+    'current_date': 1581604970,
+}
+
+
+class TestDecoder:
+
+    def test_auto_backend_matches_stdlib(self):
+        body = json.dumps(ANSWER)
+        assert make_decoder('auto').loads(body) == ANSWER
+
+    def test_streaming_keeps_only_needed_keys(self):
+        body = json.dumps(ANSWER, ensure_ascii=False, indent=2).encode()
+        answer = StreamingDecoder().loads(body)
+        assert answer == {
+            'homeworks': [
+                {
+                    'id': 1,
+                    'homework_name': 'hw "one"',
+                    'status': 'approved',
+                    'date_updated': '2020-02-13T14:40:57Z',
+                },
+                {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'},
+            ],
+            'current_date': 1581604970,
+        }
+
+    @pytest.mark.parametrize('body', ['{}', '[]', '{"homeworks": []}'])
+    def test_streaming_edge_cases(self, body):
+        assert StreamingDecoder().loads(body) == json.loads(body)
+
+    def test_unknown_backend(self):
+        with pytest.raises(KeyError):
+            make_decoder('yaml')
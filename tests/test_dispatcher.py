@@ -0,0 +1,76 @@
+import asyncio
+
+from dispatcher import MessageDispatcher, TokenBucket
+from utils import FakeBot
+
+
+async def direct_call(func, *args):
+    return func(*args)
+
+
+class BrokenBot:
+
+    def send_message(self, chat_id, text):
+        raise RuntimeError('cannot schedule new futures after shutdown')
+
+
+class TestTokenBucket:
+
+    def test_rate_is_limited(self):
+        now = [0.0]
+        bucket = TokenBucket(2, clock=lambda: now[0])
+        assert bucket.take() and bucket.take()
+        assert not bucket.take()
+        assert bucket.delay() == 0.5
+        now[0] = 0.5
+        assert bucket.take()
+
+
+class TestMessageDispatcher:
+
+    def test_messages_to_one_chat_are_coalesced(self):
+        bot = FakeBot()
+
+        async def scenario():
+            dispatcher = MessageDispatcher(bot, direct_call)
+            task = asyncio.ensure_future(dispatcher.run())
+            results = await asyncio.gather(
+                dispatcher.send(1, 'a'),
+                dispatcher.send(1, 'b'),
+                dispatcher.send(2, 'c'),
+            )
+            task.cancel()
+            return results, dispatcher
+
+        results, dispatcher = asyncio.run(scenario())
+        assert results == [True, True, True]
+        assert sorted(bot.messages) == [(1, 'a\n\nb'), (2, 'c')]
+        assert dispatcher.coalesced == 1
+
+    def test_chat_rate_is_respected(self):
+        bot = FakeBot()
+
+        async def scenario():
+            dispatcher = MessageDispatcher(bot, direct_call, chat_rate=20)
+            task = asyncio.ensure_future(dispatcher.run())
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            for text in ('a', 'b', 'c'):
+                await dispatcher.send(1, text)
+            task.cancel()
+            return loop.time() - started
+
+        elapsed = asyncio.run(scenario())
+        assert len(bot.messages) == 3
+        assert elapsed >= 0.09, 'В один чат не чаще chat_rate сообщений'
+
+    def test_unexpected_error_resolves_batch(self):
+        async def scenario():
+            dispatcher = MessageDispatcher(BrokenBot(), direct_call)
+            task = asyncio.ensure_future(dispatcher.run())
+            results = await asyncio.wait_for(asyncio.gather(
+                dispatcher.send(1, 'a'), dispatcher.send(1, 'b')), 5)
+            task.cancel()
+            return results
+
+        assert asyncio.run(scenario()) == [False, False]
@@ -0,0 +1,121 @@
+import asyncio
+
+import homework
+from engine import PollingEngine
+from intervals import AdaptivePolicy
+from tenants import Tenant
+from utils import FakeBot
+
+
+class TestPollingEngine:
+
+    def test_polls_all_tenants(self, monkeypatch, random_timestamp):
+        requested = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            requested.append(token)
+            return {
+                'homeworks': [
+                    {'homework_name': f'hw_{token}', 'status': 'approved'}
+                ],
+                'current_date': random_timestamp,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        tenants = [Tenant(f't{i}', f'token{i}', [i]) for i in range(10)]
+        bot = FakeBot()
+        engine = PollingEngine(tenants, bot, retry_time=0, max_in_flight=3)
+        asyncio.run(engine.run(cycles=2))
+
+        assert sorted(requested) == sorted(
+            f'token{i}' for i in range(10) for _ in range(2))
+        # Повторный одинаковый статус не отправляется второй раз.
+        assert len(bot.messages) == 10
+        assert engine.states['t0'].from_date == random_timestamp
+
+    def test_all_changed_homeworks_are_sent(self, monkeypatch):
+        def fake_request(token, current_timestamp, cache=None):
+            return {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+                ],
+                'current_date': 1,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        bot = FakeBot()
+        engine = PollingEngine([Tenant('a', 'x', [1])], bot, retry_time=0)
+        asyncio.run(engine.run(cycles=2))
+
+        # Оба изменения склеены в одно сообщение в чат.
+        assert len(bot.messages) == 1
+        text = bot.messages[0][1]
+        assert text.index('"hw2"') < text.index('"hw1"')
+
+    def test_error_is_sent_to_tenant_chats(self, monkeypatch):
+        def fake_request(token, current_timestamp, cache=None):
+            return {'current_date': 1}
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        bot = FakeBot()
+        engine = PollingEngine([Tenant('a', 'x', [1, 2])], bot, retry_time=0)
+        asyncio.run(engine.run(cycles=1))
+
+        assert [chat for chat, _ in bot.messages] == [1, 2]
+        assert bot.messages[0][1].startswith('Сбой в работе программы')
+
+    def test_unrenderable_homework_does_not_block_tenant(self, monkeypatch):
+        requested = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            requested.append(current_timestamp)
+            return {
+                'homeworks': [
+                    {'id': 2, 'homework_name': 'hw2', 'status': 'unknown'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                ],
+                'current_date': 5,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        bot = FakeBot()
+        engine = PollingEngine([Tenant('a', 'x', [1])], bot, retry_time=0)
+        start = engine.state_for(engine.tenants['a']).from_date
+        asyncio.run(engine.run(cycles=3))
+
+        assert requested == [start, 5, 5]
+        assert len(bot.messages) == 1
+        assert '"hw1"' in bot.messages[0][1]
+
+    def test_keyless_homework_does_not_block_tenant(self, monkeypatch):
+        requested = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            requested.append(current_timestamp)
+            return {
+                'homeworks': [
+                    {'status': 'approved'},
+                    {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+                ],
+                'current_date': 5,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        bot = FakeBot()
+        engine = PollingEngine([Tenant('a', 'x', [1])], bot, retry_time=0)
+        start = engine.state_for(engine.tenants['a']).from_date
+        asyncio.run(engine.run(cycles=3))
+
+        assert requested == [start, 5, 5]
+        assert len(bot.messages) == 1
+        assert '"hw1"' in bot.messages[0][1]
+
+    def test_set_retry_time_keeps_policy_bounds(self):
+        engine = PollingEngine(
+            [], FakeBot(), retry_time=600,
+            policy=AdaptivePolicy(600, min_interval=60, idle_ratio=0.25))
+        engine.set_retry_time(1200)
+        assert engine.policy.base_interval == 1200
+        assert engine.policy.min_interval == 120
+        assert engine.policy.idle_ratio == 0.25
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+import telegram
+
+import homework
+from engine import PollingEngine
+from fake_api import FakePracticumAPI, FakeTelegramAPI
+from tenants import Tenant
+
+
+class TestFakeServers:
+
+    def test_full_pipeline(self, monkeypatch, fresh_transport):
+        events = {'token': [(0, 1, 'reviewing'), (0, 2, 'approved')]}
+        with FakePracticumAPI(events=events) as api, FakeTelegramAPI() as tg:
+            monkeypatch.setattr(homework, 'ENDPOINT', api.endpoint)
+            bot = telegram.Bot('123456:fake', base_url=tg.base_url)
+            tenant = Tenant('student', 'token', [42])
+            engine = PollingEngine([tenant], bot, retry_time=0)
+            engine.state_for(tenant).from_date = 0
+            asyncio.run(engine.run(cycles=2))
+
+        assert api.requests == 2
+        assert len(tg.messages) == 1
+        chat_id, text = tg.messages[0]
+        assert int(chat_id) == 42
+        assert '"hw1.zip"' in text and '"hw2.zip"' in text
+
+    def test_error_rate(self, monkeypatch, fresh_transport):
+        with FakePracticumAPI(error_rate=1.0) as api:
+            monkeypatch.setattr(homework, 'ENDPOINT', api.endpoint)
+            with pytest.raises(homework.RequestAPIException):
+                homework.request_api_answer('token', 0)
+        assert api.errors == 1
@@ -0,0 +1,68 @@
+import asyncio
+
+import homework
+from engine import PollingEngine
+from exceptions import RequestAPIException
+from incidents import ErrorSuppressor, fingerprint
+from tenants import Tenant
+from utils import FakeBot, FakeClock
+
+
+class TestErrorSuppressor:
+
+    def test_fingerprint_ignores_volatile_numbers(self):
+        first = RequestAPIException('Нет ответа на from_date=1650000000')
+        second = RequestAPIException('Нет ответа на from_date=1650000600')
+        assert fingerprint(first) == fingerprint(second)
+        assert fingerprint(KeyError('homeworks')) != fingerprint(
+            TypeError('homeworks'))
+
+    def test_repeats_are_suppressed_until_window(self):
+        clock = FakeClock()
+        errors = ErrorSuppressor(window=3600, clock=clock)
+        assert errors.record('a', KeyError('x')).startswith(
+            'Сбой в работе программы')
+        for _ in range(5):
+            clock.now += 600
+            assert errors.record('a', KeyError('x')) is None
+        assert errors.suppressed == 5
+        clock.now += 600
+        summary = errors.record('a', KeyError('x'))
+        assert 'продолжается' in summary and 'Повторов за 60 мин.: 6' \
+            in summary
+        # Другая ошибка и другой аккаунт объявляются отдельно.
+        assert errors.record('a', TypeError('x')) is not None
+        assert errors.record('b', KeyError('x')) is not None
+
+    def test_resolve_sends_summary_once(self):
+        clock = FakeClock()
+        errors = ErrorSuppressor(clock=clock)
+        errors.record('a', KeyError('x'))
+        errors.record('a', KeyError('x'))
+        clock.now = 1200
+        summaries = errors.resolve('a')
+        assert len(summaries) == 1
+        assert 'Сбой устранен' in summaries[0]
+        assert 'Длился 20 мин.' in summaries[0]
+        assert errors.resolve('a') == []
+        assert len(errors) == 0
+
+    def test_engine_announces_outage_once(self, monkeypatch):
+        calls = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            calls.append(current_timestamp)
+            if len(calls) <= 3:
+                raise RequestAPIException('Код ответа: 503')
+            return {'homeworks': [], 'current_date': 1}
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        bot = FakeBot()
+        engine = PollingEngine([Tenant('a', 'x', [1])], bot, retry_time=0)
+        asyncio.run(engine.run(cycles=4))
+
+        texts = [text for _, text in bot.messages]
+        assert len(texts) == 2
+        assert texts[0].startswith('Сбой в работе программы')
+        assert texts[1].startswith('Сбой устранен')
+        assert engine.errors.suppressed == 2
@@ -0,0 +1,31 @@
+import pytest
+
+from intervals import AdaptivePolicy
+
+
+class TestAdaptivePolicy:
+
+    def test_reviewing_is_polled_often(self):
+        policy = AdaptivePolicy(600)
+        assert policy.next_interval('reviewing', 10 ** 6) == 120
+
+    def test_idle_backs_off_to_max(self):
+        policy = AdaptivePolicy(600, max_interval=3 * 3600)
+        assert policy.next_interval('approved', 60) == 600
+        assert policy.next_interval('approved', 3600) == 1800
+        assert policy.next_interval('approved', 10 ** 6) == 3 * 3600
+        assert policy.next_interval(None, None) == 600
+
+    def test_bounds_are_checked(self):
+        with pytest.raises(ValueError):
+            AdaptivePolicy(600, min_interval=100, max_interval=50)
+
+    def test_rescaled_keeps_custom_bounds(self):
+        policy = AdaptivePolicy(
+            600, min_interval=60, max_interval=3600, idle_ratio=0.25,
+            active_statuses={'reviewing', 'queued'})
+        rescaled = policy.rescaled(300)
+        assert (rescaled.min_interval, rescaled.max_interval) == (30, 1800)
+        assert rescaled.idle_ratio == 0.25
+        assert rescaled.active_statuses == {'reviewing', 'queued'}
+        assert AdaptivePolicy(0).rescaled(600).max_interval == 1800
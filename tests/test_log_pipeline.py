@@ -0,0 +1,45 @@
+import gzip
+import logging
+import time
+
+from log_pipeline import JsonFormatter, SamplingFilter, make_file_handler
+
+
+def make_record(message, level=logging.INFO, sampled=False):
+    record = logging.LogRecord(
+        'test', level, __file__, 1, message, None, None)
+    if sampled:
+        record.sampled = True
+    return record
+
+
+class TestLogPipeline:
+
+    def test_sampling_filter(self):
+        sampler = SamplingFilter({logging.INFO: 0.1})
+        passed = sum(
+            sampler.filter(make_record('x', sampled=True))
+            for _ in range(100))
+        assert passed == 10
+        assert sampler.filter(make_record('x'))
+        assert sampler.filter(make_record('x', logging.ERROR, sampled=True))
+
+    def test_json_formatter(self):
+        line = JsonFormatter().format(make_record('Статус'))
+        assert '"message": "Статус"' in line
+
+    def test_rotated_files_are_compressed(self, tmp_path):
+        path = str(tmp_path / 'program.log')
+        handler = make_file_handler(path)
+        handler.maxBytes = 200
+        for i in range(10):
+            handler.emit(make_record(f'line {i} ' + 'x' * 50))
+        handler.close()
+
+        archive = tmp_path / 'program.log.1.gz'
+        for _ in range(100):
+            if archive.exists() and not list(tmp_path.glob('*.tmp')):
+                break
+            time.sleep(0.01)
+        with gzip.open(archive, 'rt', encoding='utf-8') as file:
+            assert 'line' in file.read()
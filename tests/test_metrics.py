@@ -0,0 +1,74 @@
+import asyncio
+import urllib.error
+import urllib.request
+
+import pytest
+
+import homework
+from engine import PollingEngine
+from metrics import Metrics, MetricsServer
+from tenants import Tenant
+from utils import FakeBot
+
+
+def fetch(server, path):
+    url = f'http://127.0.0.1:{server.port}{path}'
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read().decode()
+
+
+class TestMetrics:
+
+    def test_histogram_render(self):
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.observe('request', 'ok', 0.05)
+        metrics.observe('request', 'ok', 0.5)
+        metrics.observe('request', 'error', 5)
+        text = metrics.render()
+        name = 'homework_bot_stage_duration_seconds'
+        assert f'{name}_bucket{{stage="request",outcome="ok",le="0.1"}} 1' \
+            in text
+        assert f'{name}_bucket{{stage="request",outcome="ok",le="+Inf"}} 2' \
+            in text
+        assert f'{name}_count{{stage="request",outcome="error"}} 1' in text
+
+    def test_engine_records_stages(self, monkeypatch):
+        def fake_request(token, current_timestamp, cache=None):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 1,
+            }
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        engine = PollingEngine([Tenant('a', 'x', [1])], FakeBot(),
+                               retry_time=0)
+        asyncio.run(engine.run(cycles=1))
+        stages = engine.metrics.snapshot()
+        for key in (('request', 'ok'), ('check', 'ok'), ('parse', 'ok'),
+                    ('send', 'ok'), ('poll', 'changed')):
+            assert key in stages
+        assert engine.metrics.last_success is not None
+
+    @pytest.mark.parametrize('age, status', [(10, 200), (1000, 503)])
+    def test_healthz(self, age, status):
+        metrics = Metrics()
+        server = MetricsServer(metrics, max_age=60, port=0).start()
+        try:
+            metrics.poll_succeeded()
+            metrics.last_success -= age
+            assert fetch(server, '/healthz')[0] == status
+            code, body = fetch(server, '/metrics')
+            assert code == 200
+            assert 'homework_bot_last_success_timestamp_seconds' in body
+        finally:
+            server.stop()
+
+    def test_health_max_age_follows_retry_time(self, monkeypatch):
+        monkeypatch.delenv('HEALTH_MAX_AGE', raising=False)
+        monkeypatch.setattr(homework, 'RETRY_TIME', 600)
+        assert homework.health_max_age() == 2400
+        monkeypatch.setenv('HEALTH_MAX_AGE', '90')
+        assert homework.health_max_age() == 90
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import math
+
+import homework
+from engine import PollingEngine
+from exceptions import RequestAPIException
+from intervals import AdaptivePolicy
+from recording import Recorder, Replayer, read_events
+from tenants import Tenant
+
+
+class FlakyBot:
+    """Бот, у которого не проходит одна отправка."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id, text):
+        from telegram.error import TelegramError
+
+        self.calls += 1
+        if self.calls == 2:
+            raise TelegramError('Timed out')
+
+
+def answers():
+    """Ответы API по опросам каждого аккаунта."""
+    def homeworks(*statuses):
+        return {'homeworks': [
+            {'id': number, 'homework_name': f'hw{number}.zip',
+             'status': status} for number, status in enumerate(statuses)],
+            'current_date': 1650000000}
+
+    return {
+        'token-a': [homeworks('reviewing'), homeworks('approved'),
+                    homeworks('approved', 'reviewing')],
+        'token-b': [RequestAPIException('Ошибка при получении ответа.',
+                                        'Код ответа: 500'),
+                    RequestAPIException('Ошибка при получении ответа.',
+                                        'Код ответа: 500'),
+                    homeworks('rejected')],
+    }
+
+
+class StatusCommand:
+    """Вместо UpdatePoller: один ответ на /status в чат 1."""
+
+    async def run(self, send):
+        await send(1, 'Статус работ: hw0.zip - на ревью')
+
+
+class TestRecording:
+
+    def record(self, monkeypatch, path, commands=None):
+        script = answers()
+
+        def fake_request(token, current_timestamp, cache=None):
+            answer = script[token].pop(0)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        tenants = [Tenant('a', 'token-a', [1]), Tenant('b', 'token-b', [1])]
+        engine = PollingEngine(
+            tenants, None, retry_time=0, policy=AdaptivePolicy(600),
+            chat_rate=math.inf)
+        engine.recorder = Recorder(str(path))
+        engine.bot = engine.recorder.wrap_bot(FlakyBot())
+        engine.policy.min_interval = engine.policy.max_interval = 0
+        engine.commands = commands
+        asyncio.run(engine.run(cycles=3))
+        engine.recorder.close()
+
+    def test_recording_format(self, monkeypatch, tmp_path):
+        path = tmp_path / 'traffic.ndjson'
+        self.record(monkeypatch, path)
+        events = read_events(str(path))
+        assert [e['type'] for e in events].count('api') == 6
+        assert {e['tenant'] for e in events if e['type'] == 'tenant'} == {
+            'a', 'b'}
+        assert all('token' not in json.dumps(e) for e in events)
+        errors = [e for e in events if 'error' in e]
+        assert errors[0]['error'] == 'RequestAPIException'
+        assert [e['ok'] for e in events if e['type'] == 'send'].count(
+            False) == 1
+
+    def test_replay_matches_recording(self, monkeypatch, tmp_path):
+        path = tmp_path / 'traffic.ndjson'
+        self.record(monkeypatch, path)
+        for _ in range(2):
+            result = asyncio.run(Replayer(str(path)).run())
+            assert result.polls == 6
+            assert result.actual == result.expected
+            assert any('Сбой' in m for m in result.actual['1'])
+
+    def test_command_replies_are_not_replayed(self, monkeypatch, tmp_path):
+        path = tmp_path / 'traffic.ndjson'
+        self.record(monkeypatch, path, commands=StatusCommand())
+        events = read_events(str(path))
+        assert [e['type'] for e in events].count('reply') == 1
+        assert any('Статус работ' in e['text'] for e in events
+                   if e['type'] == 'send')
+        result = asyncio.run(Replayer(str(path)).run())
+        assert result.actual == result.expected
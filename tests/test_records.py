@@ -0,0 +1,66 @@
+import homework
+from records import StatusRecord, status_code, status_name, verdict
+from state import HomeworkIndex
+from tenants import TenantTable
+
+
+class TestRecords:
+
+    def test_known_statuses_follow_verdicts(self):
+        for code, status in enumerate(homework.HOMEWORK_VERDICTS):
+            assert status_code(status) == code
+            assert status_name(code) == status
+        assert status_code(None) is None
+        assert verdict('approved') == homework.HOMEWORK_VERDICTS['approved']
+
+    def test_unknown_status_is_interned_once(self):
+        # Строка склеивается на ходу, чтобы это был отдельный объект.
+        status = ''.join(['on_', 'hold'])
+        code = status_code(status)
+        assert code >= len(homework.HOMEWORK_VERDICTS)
+        assert status_code('on_hold') == code
+        assert status_name(code) == 'on_hold'
+        assert verdict('on_hold') == 'on_hold'
+
+    def test_status_record(self):
+        record = StatusRecord(1.0, 'hw.zip', 'rejected')
+        assert record.status == 'rejected'
+        assert not hasattr(record, '__dict__')
+
+    def test_index_stores_codes(self):
+        index = HomeworkIndex({1: 'approved', 2: 'reviewing'})
+        assert index.get(1) == 'approved'
+        assert sorted(index.statuses()) == ['approved', 'reviewing']
+        changes = index.diff([{'id': 2, 'status': 'approved'}])
+        assert [(c.old_status, c.new_status) for c in changes] == [
+            ('reviewing', 'approved')]
+
+
+class TestTenantTable:
+
+    def test_state_view(self):
+        table = TenantTable()
+        state = table.add('a', 100)
+        assert state.from_date == 100
+        assert state.last_status is None and state.interval is None
+        state.last_status = 'reviewing'
+        state.interval = 120.0
+        state.homeworks.commit(
+            HomeworkIndex().diff([{'id': 1, 'status': 'approved'}])[0])
+        again = table['a']
+        assert again.last_status == 'reviewing'
+        assert again.interval == 120.0
+        assert again.homeworks.get(1) == 'approved'
+        assert not again.has_history
+        assert 'a' in table and len(table) == 1
+
+    def test_rows_are_reused(self):
+        table = TenantTable()
+        table.add('a', 1).names[1] = 'hw.zip'
+        table.add('b', 2)
+        table.discard('a')
+        assert table.get('a') is None
+        state = table.add('c', 3)
+        assert state.names == {}
+        assert len(table._homeworks) == 2
+        assert sorted(table) == ['b', 'c']
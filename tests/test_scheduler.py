@@ -0,0 +1,42 @@
+from scheduler import PollScheduler
+
+
+class TestPollScheduler:
+
+    def test_initial_polls_are_spread(self):
+        scheduler = PollScheduler(600, clock=lambda: 0)
+        for i in range(1000):
+            scheduler.add(f'tenant{i}')
+        buckets = [0] * 10
+        for second in range(620):
+            bucket = min(second // 60, 9)
+            buckets[bucket] += len(scheduler.pop_due(second))
+        assert sum(buckets) == 1000
+        assert max(buckets) < 2 * min(buckets), (
+            'Первые опросы должны быть равномерно распределены по периоду')
+
+    def test_deadlines_do_not_drift(self):
+        scheduler = PollScheduler(600, jitter=0, clock=lambda: 0)
+        scheduler.add('a', start=0)
+        first = scheduler.next_due()
+        assert scheduler.pop_due(first + 7) == ['a']
+        # Опрос занял 30 секунд, но следующий срок считается от прошлого.
+        scheduler.reschedule('a', now=first + 37)
+        assert scheduler.next_due() == first + 600
+        assert scheduler.stats()['last_lateness'] == 7
+
+    def test_missed_deadlines_are_skipped(self):
+        scheduler = PollScheduler(10, jitter=0, clock=lambda: 0)
+        scheduler.add('a', start=0)
+        first = scheduler.next_due()
+        scheduler.pop_due(first)
+        scheduler.reschedule('a', now=first + 35)
+        assert scheduler.next_due() == first + 40
+
+    def test_remove(self):
+        scheduler = PollScheduler(10, clock=lambda: 0)
+        scheduler.add('a')
+        scheduler.add('b')
+        scheduler.remove('a')
+        assert scheduler.depth == 1
+        assert scheduler.pop_due(100) == ['b']
@@ -0,0 +1,60 @@
+import pytest
+
+import homework
+from exceptions import ResponseSchemaError
+from schema import Array, Int, Object, Str, compile_schema
+from state import HomeworkIndex
+
+
+class TestSchema:
+
+    def test_all_violations_with_paths(self):
+        validate = compile_schema(homework.RESPONSE_SCHEMA)
+        _, errors, warnings = validate({
+            'homeworks': [
+                {'id': 1, 'homework_name': 'a.zip', 'status': 'approved'},
+                {'id': 'x', 'homework_name': 'b.zip', 'status': 'on_hold'},
+                [],
+                {'id': 3, 'status': 'rejected'},
+            ],
+            'current_date': '1650000000',
+        })
+        assert [tuple(error) for error in errors] == [
+            ('homeworks[1].id', 'ожидалось целое число'),
+            ('homeworks[2]', 'ожидался объект'),
+            ('current_date', 'ожидалось целое число'),
+        ]
+        assert [tuple(warning) for warning in warnings] == [
+            ('homeworks[1].status', "неизвестное значение 'on_hold'"),
+            ('homeworks[3].homework_name', 'нет ключа'),
+        ]
+
+    def test_records_are_built_in_the_same_pass(self):
+        validate = compile_schema(Object({
+            'items': Array(Object(
+                {'id': Int(), 'name': Str()}, record=True)),
+        }))
+        first, second = {'id': 7, 'name': 'a.zip'}, {'name': 'b.zip'}
+        records, errors, warnings = validate({'items': [first, second]})
+        assert not errors and not warnings
+        assert records == [(first, 7, 'a.zip'), (second, None, 'b.zip')]
+
+    def test_check_response_raises_one_error_type(self):
+        for response in ([], {}, {'homeworks': {}, 'current_date': 1},
+                         {'homeworks': []}):
+            with pytest.raises(ResponseSchemaError) as error:
+                homework.check_response(response)
+            assert isinstance(error.value, TypeError)
+            assert error.value.violations
+        with pytest.raises(ResponseSchemaError, match='homeworks: нет ключа'):
+            homework.check_response({'current_date': 1})
+
+    def test_records_feed_index_and_parse_status(self):
+        item = {'id': 1, 'homework_name': 'a.zip', 'status': 'approved'}
+        homeworks = homework.check_response(
+            {'homeworks': [item], 'current_date': 1})
+        assert homeworks == [item]
+        assert homeworks.rows == [(item, 1, 'a.zip', 'approved')]
+        changes = HomeworkIndex().diff(homeworks)
+        assert [(c.key, c.new_status) for c in changes] == [(1, 'approved')]
+        assert 'a.zip' in homework.parse_status(changes[0].homework)
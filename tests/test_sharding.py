@@ -0,0 +1,95 @@
+import asyncio
+
+import homework
+from engine import PollingEngine
+from sharding import HashRing, LeaseRegistry, ShardCoordinator
+from tenants import Tenant
+from utils import FakeBot, FakeClock
+
+
+NAMES = [f'tenant{i}' for i in range(200)]
+
+
+class TestSharding:
+
+    def test_ring_moves_only_new_members_share(self):
+        keys = [f'key{i}' for i in range(2000)]
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in keys if before.owner(key) != after.owner(key)]
+        assert all(after.owner(key) == 'd' for key in moved)
+        assert 0.15 < len(moved) / len(keys) < 0.35
+
+    def test_leases_hand_over_without_overlap(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        clock = FakeClock(1000.0)
+        first = LeaseRegistry(path, 'w1', ttl=30, clock=clock)
+        second = LeaseRegistry(path, 'w2', ttl=30, clock=clock)
+
+        held, moved = first.rebalance(NAMES)
+        assert held == set(NAMES) and not moved
+
+        # Второй воркер не может забрать аккаунты, пока их держит первый.
+        held2, _ = second.rebalance(NAMES)
+        assert not held2
+        held1, moved1 = first.rebalance(NAMES)
+        assert moved1 and moved1 < held1
+        first.release(moved1)
+        held2, _ = second.rebalance(NAMES)
+        assert held2 == moved1
+        held1, _ = first.rebalance(NAMES)
+        assert held1 == set(NAMES) - held2
+        assert first.workers() == ['w1', 'w2']
+
+        # Аренды упавшего воркера переходят к оставшемуся после ttl.
+        clock.now += 31
+        held2, _ = second.rebalance(NAMES)
+        assert held2 == set(NAMES)
+        assert second.workers() == ['w2']
+
+    def test_leave_releases_everything(self, tmp_path):
+        path = str(tmp_path / 'shards.sqlite3')
+        first = LeaseRegistry(path, 'w1')
+        second = LeaseRegistry(path, 'w2')
+        first.rebalance(NAMES)
+        first.leave()
+        held, _ = second.rebalance(NAMES)
+        assert held == set(NAMES)
+
+    def test_engines_split_tenants(self, monkeypatch, tmp_path):
+        def fake_request(token, current_timestamp, cache=None):
+            return {'homeworks': [], 'current_date': current_timestamp}
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        path = str(tmp_path / 'shards.sqlite3')
+        tenants = [Tenant(name, name, [name]) for name in NAMES]
+        engines = []
+        for worker in ('w1', 'w2', 'w3'):
+            engine = PollingEngine([], FakeBot(), retry_time=600)
+            engine.shard = ShardCoordinator(
+                LeaseRegistry(path, worker), tenants, interval=0.01)
+            engines.append(engine)
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(engine.run()) for engine in engines]
+            while any(engine.shard.rebalances < 10 for engine in engines):
+                await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(asyncio.wait_for(scenario(), 10))
+
+        owned = [set(engine.tenants) for engine in engines]
+        assert set().union(*owned) == set(NAMES)
+        assert sum(map(len, owned)) == len(NAMES)
+        assert all(owned)
+
+    def test_shard_workers_do_not_poll_commands(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('SHARD_DB', str(tmp_path / 'shards.sqlite3'))
+        monkeypatch.setenv('WORKER_ID', 'w1')
+        engine = homework.build_engine(
+            [Tenant('a', 'x', [1])], FakeBot(), None)
+        assert engine.shard is not None
+        assert engine.commands is None
+        engine.shard.registry.close()
@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('telegram', 'requests', 'dotenv', 'asyncio', 'log_pipeline')
+
+
+def test_import_is_lazy(tmp_path):
+    code = (
+        'import sys\n'
+        f'sys.path.insert(0, {ROOT!r})\n'
+        'import homework\n'
+        f'print([m for m in {HEAVY_MODULES!r} if m in sys.modules])\n'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=tmp_path,
+        capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]', (
+        'Импорт homework не должен подключать тяжелые зависимости')
+    assert not (tmp_path / 'program.log').exists(), (
+        'Файл логов должен создаваться только при запуске бота')
@@ -0,0 +1,32 @@
+from state import HomeworkIndex
+
+
+class TestHomeworkIndex:
+
+    def test_diff_reports_every_changed_homework(self):
+        index = HomeworkIndex({1: 'reviewing', 2: 'reviewing'})
+        changes = index.diff([
+            {'id': 1, 'homework_name': 'a', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'b', 'status': 'reviewing'},
+            {'id': 3, 'homework_name': 'c', 'status': 'rejected'},
+        ])
+        assert [(c.key, c.old_status, c.new_status) for c in changes] == [
+            (1, 'reviewing', 'approved'),
+            (3, None, 'rejected'),
+        ]
+
+    def test_commit_updates_index(self):
+        index = HomeworkIndex()
+        homework = {'homework_name': 'a', 'status': 'approved'}
+        change, = index.diff([homework])
+        assert index.get('a') is None
+        index.commit(change)
+        assert index.get('a') == 'approved'
+        assert index.diff([homework]) == []
+
+    def test_diff_skips_homework_without_key(self):
+        changes = HomeworkIndex().diff([
+            {'status': 'approved'},
+            {'id': 1, 'homework_name': 'a', 'status': 'approved'},
+        ])
+        assert [change.key for change in changes] == [1]
@@ -0,0 +1,73 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from metrics import Metrics
+from supervisor import (Supervisor, partition, report_metrics,
+                        setup_worker_logging)
+from tenants import Tenant
+
+
+def flaky_worker(slot, tenants, log_queue, send_rate):
+    """Воркер, который падает при первом запуске."""
+    setup_worker_logging(log_queue)
+    logging.getLogger('worker').info(
+        f'slot {slot}: {len(tenants)} tenants, rate {send_rate}')
+    metrics = Metrics()
+    metrics.observe('poll', 'unchanged', 0.01)
+    metrics.poll_succeeded()
+    report_metrics(log_queue, metrics)
+    marker = os.path.join(os.environ['SUPERVISOR_TEST_DIR'], str(slot))
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        sys.exit(1)
+    time.sleep(60)
+
+
+class Records(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestSupervisor:
+
+    def test_partition_covers_every_tenant_once(self):
+        tenants = [Tenant(f't{i}', 'x', [i]) for i in range(1000)]
+        slots = partition(tenants, 4)
+        names = [tenant.name for slot in slots for tenant in slot]
+        assert sorted(names) == sorted(tenant.name for tenant in tenants)
+        assert all(150 < len(slot) < 350 for slot in slots)
+
+    def test_crashed_workers_are_restarted(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('SUPERVISOR_TEST_DIR', str(tmp_path))
+        records = Records()
+        logging.getLogger('worker').addHandler(records)
+        tenants = [Tenant(f't{i}', 'x', [i]) for i in range(10)]
+        supervisor = Supervisor(
+            tenants, workers=2, target=flaky_worker, restart_delay=0.1)
+        thread = threading.Thread(target=supervisor.run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 30
+            while (len(records.messages) < 4
+                   and time.monotonic() < deadline):
+                time.sleep(0.05)
+        finally:
+            supervisor.stop()
+            thread.join()
+            logging.getLogger('worker').removeHandler(records)
+
+        assert supervisor.restarts == 2
+        assert len(records.messages) == 4
+        assert all('rate 15.0' in message for message in records.messages)
+        # Метрики упавших воркеров не теряются при перезапуске.
+        counts, _ = supervisor.metrics.snapshot()[('poll', 'unchanged')]
+        assert sum(counts) == 4
+        assert supervisor.metrics.last_success is not None
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import pstats
+
+import pytest
+import telegram
+
+import homework
+from engine import PollingEngine
+from fake_api import FakePracticumAPI, FakeTelegramAPI
+from tenants import Tenant
+from tracing import CycleProfiler, Tracer, span
+
+
+def run_engine(monkeypatch, **kwargs):
+    events = {'token': [(0, 1, 'reviewing')]}
+    with FakePracticumAPI(events=events) as api, FakeTelegramAPI() as tg:
+        monkeypatch.setattr(homework, 'ENDPOINT', api.endpoint)
+        bot = telegram.Bot('123456:fake', base_url=tg.base_url)
+        tenant = Tenant('student', 'token', [42])
+        engine = PollingEngine([tenant], bot, retry_time=0, **kwargs)
+        engine.state_for(tenant).from_date = 0
+        asyncio.run(engine.run(cycles=2))
+    return engine
+
+
+class TestTracing:
+
+    def test_span_outside_trace_is_noop(self):
+        with span('request') as result:
+            assert result is None
+        tracer = Tracer(sample_rate=0)
+        with tracer.trace('poll') as trace:
+            assert trace is None
+        assert not tracer.finished
+
+    def test_poll_stages_are_traced(self, monkeypatch, fresh_transport,
+                                    tmp_path):
+        path = tmp_path / 'traces.ndjson'
+        tracer = Tracer(sample_rate=1.0, path=str(path))
+        run_engine(monkeypatch, tracer=tracer)
+
+        assert len(tracer.finished) == 2
+        first = tracer.finished[0]
+        assert first.attributes == {'tenant': 'student', 'outcome': 'changed'}
+        names = {name for name, _, _ in first.spans}
+        assert {'request', 'http', 'http.connect', 'http.headers',
+                'http.body', 'decode', 'check', 'parse', 'send'} <= names
+        # Второй опрос идет по уже открытому keep-alive соединению.
+        second = {name for name, _, _ in tracer.finished[1].spans}
+        assert 'http.connect' not in second
+
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])['spans'][0]['name'] == 'request'
+
+    @pytest.mark.parametrize('mode', ['collapsed', 'pstats'])
+    def test_profiler_writes_output(self, monkeypatch, fresh_transport,
+                                    tmp_path, mode):
+        path = tmp_path / 'profile.out'
+        profiler = CycleProfiler(mode, cycles=1, path=str(path))
+        run_engine(monkeypatch, profiler=profiler)
+
+        assert not profiler.active
+        if mode == 'pstats':
+            assert pstats.Stats(str(path)).total_calls > 0
+        else:
+            assert path.exists()
+
+    def test_unknown_profiler_mode(self):
+        with pytest.raises(ValueError):
+            CycleProfiler('perf', cycles=1, path='profile.out')
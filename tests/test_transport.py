@@ -0,0 +1,69 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from transport import HttpTransport
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    ports = set()
+
+    def do_GET(self):
+        KeepAliveHandler.ports.add(self.client_address[1])
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиент с таймаутом закрывает соединение раньше ответа.
+        pass
+
+
+@pytest.fixture
+def server():
+    KeepAliveHandler.ports = set()
+    httpd = QuietServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestHttpTransport:
+
+    def test_connection_is_reused(self, server):
+        transport = HttpTransport(pool_size=1)
+        for _ in range(5):
+            assert transport.get(server + '/').status_code == 200
+        transport.close()
+
+        assert len(KeepAliveHandler.ports) == 1, (
+            'Запросы должны идти через одно keep-alive соединение')
+        assert len(transport.timings) == 5
+        assert all(t.status_code == 200 for t in transport.timings)
+
+    def test_read_timeout(self, server):
+        transport = HttpTransport(read_timeout=0.1)
+        seen = []
+        transport.add_listener(seen.append)
+        with pytest.raises(requests.exceptions.Timeout):
+            transport.get(server + '/slow')
+        transport.close()
+
+        assert seen[0].error == 'ReadTimeout'
+        assert seen[0].status_code is None
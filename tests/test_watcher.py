@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import homework
+from engine import PollingEngine
+from intervals import AdaptivePolicy
+from tenants import Tenant, load_tenants
+from utils import FakeBot
+from watcher import Config, ConfigWatcher
+
+
+class SpyCache:
+
+    def __init__(self):
+        self.forgotten = []
+
+    def headers_for(self, key):
+        return {}
+
+    def forget(self, key):
+        self.forgotten.append(key)
+
+
+class TestConfigWatcher:
+
+    def test_detects_changed_files(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text('[]')
+        watcher = ConfigWatcher([str(path), None], load=None)
+        assert not watcher.changed()
+        path.write_text('[{}]')
+        assert watcher.changed()
+        assert not watcher.changed()
+        path.unlink()
+        assert watcher.changed()
+
+    def test_changes_are_applied_incrementally(self):
+        cache = SpyCache()
+        engine = PollingEngine(
+            [Tenant('a', 'token-a', [1]), Tenant('b', 'token-b', [2]),
+             Tenant('c', 'token-c', [3])],
+            FakeBot(), retry_time=600, cache=cache)
+        for name in 'abc':
+            engine.state_for(engine.tenants[name]).from_date = 100
+        unchanged = engine.tenants['c']
+        config = Config([
+            Tenant('a', 'token-a2', [1]), unchanged,
+            Tenant('d', 'token-d', [4])], 60)
+        watcher = ConfigWatcher([], lambda: config)
+
+        asyncio.run(watcher.reload(engine))
+
+        assert sorted(engine.tenants) == ['a', 'c', 'd']
+        assert engine.tenants['a'].practicum_token == 'token-a2'
+        assert engine.tenants['c'] is unchanged
+        assert cache.forgotten == ['token-a']
+        assert 'b' not in engine.states and 'b' not in engine.scheduler
+        assert 'd' in engine.scheduler
+        # Состояние оставшихся аккаунтов не сбрасывается.
+        assert engine.states['a'].from_date == 100
+        assert engine.retry_time == engine.scheduler.period == 60
+        assert engine.policy.base_interval == 60
+        assert [t.name for t in engine.tenants_for_chat(4)] == ['d']
+
+    def test_verdicts_are_never_empty(self):
+        verdicts = {'approved': 'Принята.', 'rejected': 'Возвращена.'}
+        seen = []
+
+        class Spy(dict):
+            def __delitem__(self, key):
+                seen.append(dict(self))
+                super().__delitem__(key)
+
+        spy = Spy(verdicts)
+        saved = homework.HOMEWORK_VERDICTS
+        homework.HOMEWORK_VERDICTS = spy
+        try:
+            homework.apply_settings(600, {'approved': 'Зачтена.'})
+        finally:
+            homework.HOMEWORK_VERDICTS = saved
+        assert spy == {'approved': 'Зачтена.'}
+        assert seen and all(seen)
+
+    def test_broken_file_keeps_old_config(self):
+        def load():
+            raise ValueError('файл сохранен не полностью')
+
+        engine = PollingEngine([Tenant('a', 'x', [1])], FakeBot())
+        watcher = ConfigWatcher([], load)
+        asyncio.run(watcher.reload(engine))
+        assert list(engine.tenants) == ['a'] and watcher.reloads == 0
+
+    def test_load_config(self, monkeypatch, tmp_path):
+        env_file = tmp_path / '.env'
+        env_file.write_text('PRACTICUM_TOKEN=old\nTELEGRAM_TOKEN=bot\n')
+        monkeypatch.setenv('PRACTICUM_TOKEN', 'old')
+        monkeypatch.setenv('TELEGRAM_TOKEN', 'bot')
+        monkeypatch.setenv('TELEGRAM_CHAT_ID', 'from-process')
+        monkeypatch.delenv('TENANTS_FILE', raising=False)
+        config_file = tmp_path / 'config.json'
+        verdicts = dict(homework.HOMEWORK_VERDICTS, on_hold='Отложена.')
+        config_file.write_text(json.dumps(
+            {'retry_time': 300, 'homework_verdicts': verdicts}))
+        monkeypatch.setenv('CONFIG_FILE', str(config_file))
+        monkeypatch.setattr(homework, 'ENV_FILE', str(env_file))
+        monkeypatch.setattr(homework, 'RETRY_TIME', 600)
+        monkeypatch.setattr(homework, '_env_values', {
+            'PRACTICUM_TOKEN': 'old', 'TELEGRAM_TOKEN': 'bot'})
+        saved = dict(homework.HOMEWORK_VERDICTS)
+        env_file.write_text('PRACTICUM_TOKEN=new\nTELEGRAM_TOKEN=bot\n')
+        try:
+            config = homework.load_config()
+            # Чтение в пуле потоков ничего не меняет.
+            assert 'on_hold' not in homework.HOMEWORK_VERDICTS
+            assert homework.RETRY_TIME == 600
+            config.apply()
+            assert homework.HOMEWORK_VERDICTS['on_hold'] == 'Отложена.'
+            assert homework.RETRY_TIME == 300
+            assert homework.PRACTICUM_TOKEN == 'new'
+        finally:
+            homework.HOMEWORK_VERDICTS.clear()
+            homework.HOMEWORK_VERDICTS.update(saved)
+        assert config.retry_time == 300
+        [tenant] = config.tenants
+        assert tenant.practicum_token == 'new'
+        assert tenant.chat_ids == ('from-process',)
+
+    def test_running_engine_picks_up_tenants_file(self, tmp_path, monkeypatch):
+        path = tmp_path / 'tenants.json'
+
+        def write(*tenants):
+            path.write_text(json.dumps([
+                {'name': name, 'practicum_token': token, 'chat_ids': [1]}
+                for name, token in tenants]))
+
+        requested = []
+
+        def fake_request(token, current_timestamp, cache=None):
+            requested.append(token)
+            return {'homeworks': [], 'current_date': 1}
+
+        async def scenario(engine):
+            task = asyncio.ensure_future(engine.run())
+            try:
+                while 'token-a' not in requested:
+                    await asyncio.sleep(0.01)
+                write(('a', 'token-a'), ('b', 'token-b'))
+                while 'token-b' not in requested:
+                    await asyncio.sleep(0.01)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        monkeypatch.setattr(homework, 'request_api_answer', fake_request)
+        write(('a', 'token-a'))
+        engine = PollingEngine(
+            [Tenant('a', 'token-a', [1])], FakeBot(), retry_time=0,
+            policy=AdaptivePolicy(600))
+        engine.watcher = ConfigWatcher(
+            [str(path)], lambda: Config(
+                load_tenants(str(path)), 0), interval=0.01)
+        asyncio.run(asyncio.wait_for(scenario(engine), 10))
+        assert sorted(engine.tenants) == ['a', 'b']
+        assert requested.count('token-a') == 1
@@ -0,0 +1,231 @@
+"""Трассировка этапов опроса и профилировщик по запросу.
+
+Пока трассировка не включена, span() возвращает общий пустой
+контекстный менеджер, и вся цена - одно чтение ContextVar.
+"""
+import contextvars
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+TRACES_KEPT = 1000
+PROFILE_INTERVAL = 0.005
+
+_current = contextvars.ContextVar('trace', default=None)
+_NOOP = nullcontext()
+
+
+class Trace:
+    """Одна трасса: итерация опроса и ее вложенные этапы."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, attributes):
+        """Начинаем отсчет span с именем name."""
+        self.id = next(self._ids)
+        self.name = name
+        self.attributes = attributes
+        self.started = time.time()
+        self._origin = time.perf_counter()
+        self.duration = None
+        self.spans = []
+
+    def add(self, name, offset, duration):
+        """Добавляем этап; offset считается от начала трассы."""
+        # list.append атомарен, этапы могут прийти из пула потоков.
+        self.spans.append((name, offset, duration))
+
+    def as_dict(self):
+        """Трасса в виде словаря для JSON."""
+        return {
+            'trace_id': self.id,
+            'name': self.name,
+            'started': self.started,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'spans': [
+                {'name': name, 'offset': offset, 'duration': duration}
+                for name, offset, duration in sorted(
+                    self.spans, key=lambda span: span[1])],
+        }
+
+
+@contextmanager
+def _record(trace, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(
+            name, started - trace._origin, time.perf_counter() - started)
+
+
+def current_trace():
+    """Текущая трасса или None, если опрос не попал в выборку."""
+    return _current.get()
+
+
+def span(name):
+    """Этап текущей трассы; вне трассы ничего не делает."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _record(trace, name)
+
+
+def add_span(name, offset_from_now, duration):
+    """Этап, длительность которого уже известна.
+
+    Нужен для этапов, замеренных не нами, например время до
+    заголовков ответа из response.elapsed.
+    """
+    trace = _current.get()
+    if trace is not None:
+        started = time.perf_counter() - offset_from_now
+        trace.add(name, started - trace._origin, duration)
+
+
+class Tracer:
+    """Создает трассы для доли sample_rate итераций.
+
+    Завершенные трассы хранятся в кольцевом буфере и, если задан
+    path, дописываются в файл построчно в формате JSON.
+    """
+
+    def __init__(self, sample_rate=0.0, path=None, seed=None):
+        """В трассу попадает доля циклов sample_rate, seed - для тестов."""
+        self.sample_rate = sample_rate
+        self.path = path
+        self.finished = deque(maxlen=TRACES_KEPT)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def trace(self, name, **attributes):
+        """Трасса вокруг блока, если он попал в выборку."""
+        if not self.sample_rate or self._random.random() >= self.sample_rate:
+            return _NOOP
+        return self._traced(name, attributes)
+
+    @contextmanager
+    def _traced(self, name, attributes):
+        current = Trace(name, attributes)
+        token = _current.set(current)
+        try:
+            yield current
+        finally:
+            _current.reset(token)
+            current.duration = time.perf_counter() - current._origin
+            self.finished.append(current)
+            if self.path:
+                self._write(current)
+
+    def _write(self, trace):
+        line = json.dumps(trace.as_dict(), ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+
+
+class SamplingProfiler:
+    """Сэмплирующий профилировщик всех потоков процесса.
+
+    Раз в interval секунд снимает стеки всех потоков и считает
+    одинаковые стеки. Результат пишется в формате collapsed stacks,
+    который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        """Стек снимается раз в interval секунд."""
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(
+                        f'{code.co_name} ({code.co_filename}:'
+                        f'{code.co_firstlineno})')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self):
+        """Начинаем снимать стеки."""
+        self._thread = threading.Thread(
+            target=self._sample, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливаем сбор стеков."""
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        """Пишем стеки в файл."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class CycleProfiler:
+    """Профилирует первые cycles итераций опроса.
+
+    mode='collapsed' - сэмплирующий профилировщик всех потоков,
+    mode='pstats' - cProfile, который видит только поток цикла
+    событий. После нужного числа итераций результат пишется в path.
+    """
+
+    def __init__(self, mode, cycles, path):
+        """Режим mode - collapsed или pstats, запись после cycles циклов."""
+        if mode not in ('collapsed', 'pstats'):
+            raise ValueError(f'Неизвестный режим профилирования: {mode}')
+        self.mode = mode
+        self.cycles = cycles
+        self.path = path
+        self.done = 0
+        self._profiler = None
+
+    @property
+    def active(self):
+        """Профилирование еще идет."""
+        return self.done < self.cycles
+
+    def start(self):
+        """Включаем профилировщик."""
+        if self.mode == 'pstats':
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler()
+            self._profiler.start()
+
+    def cycle_finished(self):
+        """Отмечаем итерацию; после последней пишем результат."""
+        self.done += 1
+        if not self.active:
+            self.finish()
+
+    def finish(self):
+        """Останавливаем профилировщик и пишем собранное в path."""
+        if self._profiler is None:
+            return
+        profiler, self._profiler = self._profiler, None
+        if self.mode == 'pstats':
+            profiler.disable()
+            profiler.dump_stats(self.path)
+        else:
+            profiler.stop()
+            profiler.dump(self.path)
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+from tracing import add_span, current_trace, span
+
+# Параметры пула соединений и таймауты по умолчанию, в секундах.
+POOL_SIZE = 32
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+TIMINGS_KEPT = 1000
+
+RequestTiming = namedtuple(
+    'RequestTiming', ['url', 'status_code', 'started', 'elapsed', 'error'])
+
+
+class HttpTransport:
+    """Общий HTTP-транспорт с пулом keep-alive соединений.
+
+    Одна сессия requests используется всеми потоками, поэтому
+    соединения с сервером переиспользуются между опросами.
+    Для каждого запроса сохраняется время выполнения.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT):
+        """Сессия создается при первом запросе."""
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.timings = deque(maxlen=TIMINGS_KEPT)
+        self.listeners = []
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Сессия создается при первом запросе."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._make_session()
+        return self._session
+
+    def _make_session(self):
+        # requests импортируется только при первом запросе.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=True)
+        adapter.poolmanager.pool_classes_by_scheme = _timed_pool_classes()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def add_listener(self, listener):
+        """Подписываемся на RequestTiming каждого запроса."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Отписываемся от RequestTiming."""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def get(self, url, headers=None, params=None):
+        """GET-запрос через общий пул с таймаутами."""
+        from requests.exceptions import RequestException
+
+        started = time.time()
+        perf_started = time.perf_counter()
+        status_code = None
+        error = None
+        try:
+            with span('http'):
+                response = self.session.get(
+                    url, headers=headers, params=params, timeout=self.timeout)
+            status_code = response.status_code
+            if current_trace() is not None:
+                _add_http_spans(response, time.perf_counter() - perf_started)
+            return response
+        except RequestException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            timing = RequestTiming(
+                url, status_code, started,
+                time.perf_counter() - perf_started, error)
+            self.timings.append(timing)
+            for listener in self.listeners:
+                listener(timing)
+
+    def close(self):
+        """Закрываем все соединения пула."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def _add_http_spans(response, total):
+    """Делим запрос на ожидание заголовков и загрузку тела.
+
+    response.elapsed - время от отправки запроса до разбора
+    заголовков, остальное ушло на чтение тела.
+    """
+    headers = response.elapsed.total_seconds()
+    add_span('http.headers', total, headers)
+    add_span('http.body', total - headers, max(0.0, total - headers))
+
+
+def _timed_pool_classes():
+    """Пулы urllib3, замеряющие установку соединения.
+
+    connect() включает DNS, TCP и для https рукопожатие TLS, так что
+    в трассе видно, сколько стоит новое соединение вместо keep-alive.
+    """
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import (HTTPConnectionPool,
+                                        HTTPSConnectionPool)
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            with span('http.connect'):
+                super().connect()
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            with span('http.connect'):
+                super().connect()
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {
+        'http': TimedHTTPConnectionPool,
+        'https': TimedHTTPSConnectionPool,
+    }
+
+
+_transport = None
+
+
+def get_transport():
+    """Возвращаем общий для процесса транспорт."""
+    global _transport
+    if _transport is None:
+        _transport = HttpTransport()
+    return _transport
+
+
+def configure_transport(**kwargs):
+    """Пересоздаем общий транспорт с новыми параметрами."""
+    global _transport
+    if _transport is not None:
+        _transport.close()
+    _transport = HttpTransport(**kwargs)
+    return _transport
@@ -0,0 +1,115 @@
+"""Перечитывание настроек и списка аккаунтов без перезапуска.
+
+ConfigWatcher раз в interval секунд сверяет время изменения
+и размер файлов настроек (.env, TENANTS_FILE, CONFIG_FILE). Если
+какой-то файл изменился, настройки перечитываются функцией load,
+и изменения применяются к работающему движку по отдельности:
+новые аккаунты ставятся в расписание, удаленные снимаются с опроса
+после уже начатых опросов, у остальных подменяются токен и чаты.
+Состояние аккаунтов, которых изменения не касаются, не трогается.
+"""
+import asyncio
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Как часто проверяются файлы настроек, секунды.
+RELOAD_INTERVAL = 5.0
+
+# Результат load(): список аккаунтов, базовый интервал опроса
+# и функция, применяющая остальные настройки, или None.
+Config = namedtuple(
+    'Config', ['tenants', 'retry_time', 'apply'], defaults=(None,))
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigWatcher:
+    """Следит за файлами настроек опросом времени изменения.
+
+    load - функция без аргументов, возвращающая Config. Она
+    выполняется в пуле потоков и только читает файлы; Config.apply
+    вызывается уже в потоке цикла событий, где настройки читают
+    опросы. Если load выбросила исключение (например, файл сохранен
+    наполовину), работа продолжается со старыми настройками
+    до следующего изменения файлов.
+    """
+
+    def __init__(self, paths, load, interval=RELOAD_INTERVAL):
+        """Пустые пути из paths не отслеживаются."""
+        self.paths = [path for path in paths if path]
+        self.load = load
+        self.interval = interval
+        self.reloads = 0
+        self._signatures = self._read_signatures()
+
+    def _read_signatures(self):
+        return {path: _signature(path) for path in self.paths}
+
+    def changed(self):
+        """Изменился ли какой-нибудь файл с прошлой проверки."""
+        signatures = self._read_signatures()
+        if signatures == self._signatures:
+            return False
+        self._signatures = signatures
+        return True
+
+    async def reload(self, engine):
+        """Перечитываем настройки и применяем их к движку."""
+        loop = asyncio.get_running_loop()
+        try:
+            config = await loop.run_in_executor(None, self.load)
+        except Exception as error:
+            logger.error(f'Настройки не перечитаны: {error}')
+            return
+        if config.apply is not None:
+            config.apply()
+        if config.retry_time != engine.retry_time:
+            engine.set_retry_time(config.retry_time)
+            logger.info(f'Новый интервал опроса: {config.retry_time} с')
+        await self.apply_tenants(engine, config.tenants)
+        self.reloads += 1
+
+    async def apply_tenants(self, engine, tenants):
+        """Приводим набор аккаунтов движка к новому списку."""
+        tenants = {tenant.name: tenant for tenant in tenants}
+        if engine.shard is not None:
+            # Добавлением и удалением займется перебалансировка шарда.
+            current = engine.shard.tenants
+            engine.shard.tenants = tenants
+        else:
+            current = dict(engine.tenants)
+        removed = [name for name in current if name not in tenants]
+        added = [
+            tenant for name, tenant in tenants.items() if name not in current]
+        updated = [
+            tenant for name, tenant in tenants.items()
+            if name in current and (
+                tenant.practicum_token != current[name].practicum_token
+                or tenant.chat_ids != current[name].chat_ids)]
+        if engine.shard is None:
+            if removed:
+                await engine.remove_tenants(removed)
+            if added:
+                engine.add_tenants(added)
+        if updated:
+            engine.update_tenants(updated)
+        if removed or added or updated:
+            logger.info(
+                f'Аккаунты перечитаны: +{len(added)}, -{len(removed)}, '
+                f'изменено {len(updated)}')
+
+    async def run(self, engine):
+        """Цикл проверки файлов, работает до отмены задачи."""
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                await self.reload(engine)